@@ -0,0 +1,427 @@
+"""Benchmarks for JARVIS subsystems
+
+Usage:
+    python jarvis_bench.py storage [--sizes 10000 100000 1000000]
+    python jarvis_bench.py asr --data recordings/ [--backends google vosk]
+    python jarvis_bench.py dispatch [--iterations 100000]
+    python jarvis_bench.py ttfa [--token-delay 0.03]
+    python jarvis_bench.py recall [--sizes 10000 100000]
+    python jarvis_bench.py pipeline [--rounds 20] [--llm-delay 0.2] [--script commands.txt]
+    python jarvis_bench.py telemetry [--seconds 60] [--interval 2]
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import glob
+import http.server
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+import ollama
+import speech_recognition as sr
+
+from main import (JarvisAssistant, JarvisStore, ModelManager, HashingEmbedder, SemanticIndex, TelemetrySampler,
+                  create_recognizer_backend, split_sentences)
+from jarvis_sim import DEFAULT_SCRIPT, Simulation, load_script
+
+
+class _QuietLogger:
+    def error(self, msg, exc_info=True):
+        print(f"ERROR: {msg}")
+
+    def info(self, msg):
+        pass
+
+
+def _fake_turn(i):
+    return {
+        "speaker": "user" if i % 2 else "jarvis",
+        "text": f"Turn {i}: run the thrust to weight calculations for Mark 1 again",
+        "timestamp": str(datetime.datetime.now())
+    }
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def bench_storage(args):
+    """Per-turn write latency of a full JSON rewrite vs. the SQLite store at various history sizes"""
+    print(f"{'turns':>10} {'rewrite p50':>14} {'sqlite p50':>12} {'sqlite p95':>12} {'batched':>14}")
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='jarvis_bench_')
+        try:
+            snapshot_file = os.path.join(workdir, 'memory.json')
+            memory = {"conversations": [_fake_turn(i) for i in range(size)], "last_active": ""}
+
+            # Old behaviour: append, then rewrite the whole file with indent=2
+            rewrite = []
+            for i in range(args.rewrite_samples):
+                start = time.perf_counter()
+                memory["conversations"].append(_fake_turn(size + i))
+                with open(snapshot_file, 'w') as f:
+                    json.dump(memory, f, indent=2)
+                rewrite.append(time.perf_counter() - start)
+
+            store = JarvisStore(os.path.join(workdir, 'jarvis.db'))
+            with store.transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO conversations (speaker, text, timestamp) VALUES (?, ?, ?)",
+                    ((turn["speaker"], turn["text"], turn["timestamp"]) for turn in memory["conversations"])
+                )
+            del memory
+
+            single = []
+            for i in range(args.turns):
+                start = time.perf_counter()
+                store.add_turn(_fake_turn(size + i))
+                single.append(time.perf_counter() - start)
+
+            # Many turns in one transaction, as the importer writes them
+            batch = [_fake_turn(size + i) for i in range(args.turns)]
+            start = time.perf_counter()
+            with store.transaction():
+                for turn in batch:
+                    store.add_turn(turn)
+            batched = args.turns / (time.perf_counter() - start)
+            store.close()
+
+            print(f"{size:>10} {statistics.median(rewrite) * 1000:>12.2f}ms "
+                  f"{statistics.median(single) * 1e6:>10.1f}us {_percentile(single, 95) * 1e6:>10.1f}us "
+                  f"{batched:>9.0f} /s")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def bench_asr(args):
+    """Replay recorded WAV files through each recognizer backend
+
+    Every foo.wav in the data directory needs a foo.txt reference
+    transcript. Streaming backends are fed the audio in microphone-sized
+    chunks first, so the latency reported is the time from the end of the
+    audio to the final transcript - what the user waits for.
+    """
+    recordings = sorted(glob.glob(os.path.join(args.data, "*.wav")))
+    if not recordings:
+        print(f"No WAV files found in {args.data}")
+        return
+
+    recognizer = sr.Recognizer()
+    settings = {"vosk_model_path": args.vosk_model}
+    print(f"{'backend':>8} {'files':>6} {'WER':>7} {'p50':>9} {'p95':>9} {'failures':>9}")
+    for name in args.backends:
+        backend = create_recognizer_backend(name, recognizer, settings, _QuietLogger())
+        if backend.name != name:
+            print(f"{name:>8} unavailable")
+            continue
+
+        errors, latencies, failures = [], [], 0
+        for path in recordings:
+            with open(os.path.splitext(path)[0] + ".txt") as f:
+                reference = f.read().strip()
+            with sr.AudioFile(path) as source:
+                audio = recognizer.record(source)
+
+            try:
+                if backend.streaming:
+                    stream = backend.start_stream(audio.sample_rate, 2)
+                    raw = audio.get_raw_data(convert_width=2)
+                    for offset in range(0, len(raw), args.chunk * 2):
+                        stream.feed(raw[offset:offset + args.chunk * 2])
+                    start = time.perf_counter()
+                    hypothesis = stream.finish()
+                else:
+                    start = time.perf_counter()
+                    hypothesis = backend.transcribe(audio)
+                latencies.append(time.perf_counter() - start)
+            except (sr.UnknownValueError, sr.RequestError):
+                hypothesis = ""
+                failures += 1
+            errors.append(word_error_rate(reference, hypothesis))
+
+        if latencies:
+            p50 = f"{statistics.median(latencies) * 1000:.0f}ms"
+            p95 = f"{_percentile(latencies, 95) * 1000:.0f}ms"
+        else:
+            p50 = p95 = "-"
+        print(f"{name:>8} {len(recordings):>6} {statistics.mean(errors):>7.1%} {p50:>9} {p95:>9} {failures:>9}")
+
+
+class _NoopAssistant:
+    """Stands in for JarvisAssistant so every handler is a no-op"""
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def bench_dispatch(args):
+    """Lookup + parameter coercion cost for every registered intent"""
+    registry = JarvisAssistant.build_intent_registry(_NoopAssistant())
+    for spec in registry.intents.values():
+        # Measure dispatch itself, not thread start-up
+        spec.run_async = False
+
+    print(f"{'intent':>12} {'ns/dispatch':>12}")
+    timings = []
+    for name, spec in registry.intents.items():
+        intent_data = {"intent": name, "params": dict(spec.example)}
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            registry.dispatch(intent_data, "benchmark command", workshop_mode=True)
+        elapsed = (time.perf_counter() - start) / args.iterations
+        timings.append(elapsed)
+        print(f"{name:>12} {elapsed * 1e9:>12.0f}")
+    print(f"{'mean':>12} {statistics.mean(timings) * 1e9:>12.0f}")
+
+
+STUB_REPLY = ("Certainly, boss. The Mark 1 thrusters are running at eighty percent efficiency. "
+              "I'd recommend recalibrating the stabilizers before the next flight test. "
+              "Shall I schedule that for tomorrow morning?")
+
+
+def _stub_ollama_server(token_delay):
+    """Local stand-in for the Ollama /api/chat endpoint that 'generates' one word per token_delay"""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            tokens = [word + " " for word in STUB_REPLY.split(" ")]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+            if not request.get('stream', True):
+                time.sleep(token_delay * len(tokens))
+                message = {"role": "assistant", "content": "".join(tokens)}
+                self.wfile.write(json.dumps({"message": message, "done": True}).encode())
+                return
+            for token in tokens:
+                time.sleep(token_delay)
+                message = {"role": "assistant", "content": token}
+                self.wfile.write((json.dumps({"message": message, "done": False}) + "\n").encode())
+                self.wfile.flush()
+            self.wfile.write((json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n").encode())
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_ttfa(args):
+    """Time until the first sentence can be handed to speech: blocking vs. streamed chat"""
+    server = _stub_ollama_server(args.token_delay)
+    client = ollama.Client(host=f"http://127.0.0.1:{server.server_address[1]}")
+    messages = [{'role': 'user', 'content': 'How are the thrusters?'}]
+    blocking, streamed, streamed_total = [], [], []
+    try:
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            response = client.chat(model=ModelManager.DEFAULT_MODELS['chat'], messages=messages)
+            next(split_sentences([response['message']['content']]))
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            stream = client.chat(model=ModelManager.DEFAULT_MODELS['chat'], messages=messages, stream=True)
+            sentences = split_sentences(chunk['message']['content'] for chunk in stream)
+            next(sentences)
+            streamed.append(time.perf_counter() - start)
+            for _ in sentences:
+                pass
+            streamed_total.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+
+    print(f"{'path':>10} {'first audio p50':>16} {'total p50':>10}")
+    print(f"{'blocking':>10} {statistics.median(blocking) * 1000:>14.0f}ms {statistics.median(blocking) * 1000:>8.0f}ms")
+    print(f"{'streamed':>10} {statistics.median(streamed) * 1000:>14.0f}ms {statistics.median(streamed_total) * 1000:>8.0f}ms")
+
+
+RECALL_TOPICS = ["thrusters", "repulsor calibration", "arc reactor output", "flight stabilizers",
+                 "suit paint job", "jarvis voice settings", "workshop lights", "coffee supply",
+                 "titanium alloy order", "helmet display"]
+
+
+def bench_recall(args):
+    """Semantic index query latency (query embedding + top-k) at various sizes"""
+    print(f"{'entries':>10} {'build':>8} {'p50':>9} {'p95':>9} {'p50 last week':>14}")
+    rng = random.Random(0)
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='jarvis_bench_')
+        try:
+            index = SemanticIndex(_QuietLogger(), workdir, [HashingEmbedder(args.dim)])
+            index.start()
+            now = time.time()
+            start = time.perf_counter()
+            index.extend(
+                ("conversation", f"{_fake_turn(i)['text']} and the {rng.choice(RECALL_TOPICS)}",
+                 now - rng.uniform(0, 90 * 86400), {"speaker": "user"})
+                for i in range(size)
+            )
+            while len(index) < size:
+                time.sleep(0.01)
+            build = time.perf_counter() - start
+
+            latencies, filtered = [], []
+            for i in range(args.queries):
+                query = f"what did I say about the {RECALL_TOPICS[i % len(RECALL_TOPICS)]}"
+                start = time.perf_counter()
+                index.search(query, k=5)
+                latencies.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                index.search(query, k=5, since=now - 7 * 86400)
+                filtered.append(time.perf_counter() - start)
+            index.stop()
+
+            print(f"{size:>10} {build:>7.1f}s {statistics.median(latencies) * 1000:>7.2f}ms "
+                  f"{_percentile(latencies, 95) * 1000:>7.2f}ms {statistics.median(filtered) * 1000:>12.2f}ms")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_pipeline(args):
+    """End-to-end latency per intent and throughput of process_command on the simulated drivers"""
+    commands = load_script(args.script) if args.script else DEFAULT_SCRIPT
+    latencies = collections.defaultdict(list)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation = Simulation(args.llm_delay, args.token_delay, args.http_delay, args.speech_delay)
+        try:
+            for _ in range(args.warmup):
+                simulation.run(commands)
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                for command, intent, seconds, _ in simulation.run(commands):
+                    latencies[intent].append(seconds)
+            elapsed = time.perf_counter() - start
+        finally:
+            simulation.close()
+
+    print(f"{'intent':>12} {'count':>6} {'p50':>9} {'p95':>9}")
+    for intent, samples in sorted(latencies.items()):
+        print(f"{intent:>12} {len(samples):>6} {statistics.median(samples) * 1000:>7.2f}ms "
+              f"{_percentile(samples, 95) * 1000:>7.2f}ms")
+    everything = [seconds for samples in latencies.values() for seconds in samples]
+    print(f"{'all':>12} {len(everything):>6} {statistics.median(everything) * 1000:>7.2f}ms "
+          f"{_percentile(everything, 95) * 1000:>7.2f}ms")
+    print(f"throughput: {len(everything) / elapsed:.1f} commands/s")
+
+
+def bench_telemetry(args):
+    """Telemetry sampler cost per sample and per process walk, query latency and CPU overhead while running"""
+    sampler = TelemetrySampler(_QuietLogger(), interval=args.interval, history=args.history)
+    sampler.start()
+    sampler.stop()  # only primed; samples below are taken directly
+
+    sample_costs, walk_costs = [], []
+    for _ in range(args.history):
+        sampler.next_top_walk = float("inf")
+        started = time.thread_time()
+        sampler.sample()
+        sample_costs.append(time.thread_time() - started)
+    for _ in range(args.walks):
+        started = time.thread_time()
+        sampler._walk_processes()
+        walk_costs.append(time.thread_time() - started)
+    print(f"sample:       mean {statistics.mean(sample_costs) * 1000:.3f}ms  "
+          f"p95 {_percentile(sample_costs, 95) * 1000:.3f}ms CPU")
+    print(f"process walk: mean {statistics.mean(walk_costs) * 1000:.2f}ms  "
+          f"p95 {_percentile(walk_costs, 95) * 1000:.2f}ms CPU, {len(sampler.top_processes())} top processes")
+
+    # Queries over a full ring buffer, spread out in time as if sampled at the interval
+    sampler.times[:] = time.time() - args.interval * np.arange(len(sampler.times))[::-1]
+    sampler.head = 0
+    for name, query in (("stats", lambda: sampler.stats("cpu", None)), ("trend", lambda: sampler.trend("memory", None))):
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            query()
+        print(f"{name} over {sampler.count} samples: {(time.perf_counter() - started) / args.queries * 1e6:.0f}us")
+
+    running = TelemetrySampler(_QuietLogger(), interval=args.interval, history=args.history,
+                               max_overhead=args.max_overhead)
+    running.start()
+    time.sleep(args.seconds)
+    running.stop()
+    print(f"running {args.seconds}s at {args.interval}s: {running.count} samples, "
+          f"overhead {running.overhead():.3%} of a CPU (budget {args.max_overhead:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JARVIS benchmarks")
+    subparsers = parser.add_subparsers(dest="bench", required=True)
+
+    storage = subparsers.add_parser("storage", help="SQLite store vs. full JSON rewrite per turn")
+    storage.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    storage.add_argument("--turns", type=int, default=2000, help="stored turns per size")
+    storage.add_argument("--rewrite-samples", type=int, default=5, help="full rewrites per size")
+    storage.set_defaults(func=bench_storage)
+
+    asr = subparsers.add_parser("asr", help="word-error rate and latency per recognizer backend")
+    asr.add_argument("--data", required=True, help="directory of foo.wav + foo.txt pairs")
+    asr.add_argument("--backends", nargs="+", default=["google", "vosk"])
+    asr.add_argument("--vosk-model", default="models/vosk-model-small-en-us-0.15")
+    asr.add_argument("--chunk", type=int, default=1024, help="frames per streamed chunk")
+    asr.set_defaults(func=bench_asr)
+
+    dispatch = subparsers.add_parser("dispatch", help="intent registry dispatch cost per intent")
+    dispatch.add_argument("--iterations", type=int, default=100_000)
+    dispatch.set_defaults(func=bench_dispatch)
+
+    ttfa = subparsers.add_parser("ttfa", help="time to first audio, blocking vs. streamed Ollama replies")
+    ttfa.add_argument("--token-delay", type=float, default=0.03, help="stub server seconds per token")
+    ttfa.add_argument("--runs", type=int, default=5)
+    ttfa.set_defaults(func=bench_ttfa)
+
+    recall = subparsers.add_parser("recall", help="semantic recall query latency per index size")
+    recall.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    recall.add_argument("--dim", type=int, default=384, help="hashing embedder dimensions")
+    recall.add_argument("--queries", type=int, default=200)
+    recall.set_defaults(func=bench_recall)
+
+    pipeline = subparsers.add_parser("pipeline", help="end-to-end latency per intent on simulated devices")
+    pipeline.add_argument("--script", help="one command per line (default: jarvis_sim.DEFAULT_SCRIPT)")
+    pipeline.add_argument("--rounds", type=int, default=20, help="timed passes over the script")
+    pipeline.add_argument("--warmup", type=int, default=1, help="untimed passes first")
+    pipeline.add_argument("--llm-delay", type=float, default=0.0, help="fake Ollama seconds before the first token")
+    pipeline.add_argument("--token-delay", type=float, default=0.0, help="fake Ollama seconds per token")
+    pipeline.add_argument("--http-delay", type=float, default=0.0, help="fake HTTP seconds per request")
+    pipeline.add_argument("--speech-delay", type=float, default=0.0, help="fake speech seconds per word")
+    pipeline.set_defaults(func=bench_pipeline)
+
+    telemetry = subparsers.add_parser("telemetry", help="telemetry sampler cost and CPU overhead")
+    telemetry.add_argument("--seconds", type=float, default=60, help="how long to run the sampler thread")
+    telemetry.add_argument("--interval", type=float, default=2.0)
+    telemetry.add_argument("--history", type=int, default=1800, help="ring buffer size, and samples timed")
+    telemetry.add_argument("--walks", type=int, default=20, help="process table walks timed")
+    telemetry.add_argument("--queries", type=int, default=1000)
+    telemetry.add_argument("--max-overhead", type=float, default=0.005)
+    telemetry.set_defaults(func=bench_telemetry)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Headless JARVIS: a scripted conversation against fake devices and services
+
+Every device and external service goes through main.Drivers; this module
+supplies fakes for all of them, so process_command runs on Linux CI with
+no microphone, speakers, Windows volume API, Ollama or internet access.
+Spoken replies are captured instead of played.
+
+Usage:
+    python jarvis_sim.py [script.txt] [--llm-delay 0.2] [--token-delay 0.03]
+
+A script has one command per line, as if recognized from speech; blank
+lines and lines starting with # are skipped. Without a script the
+built-in DEFAULT_SCRIPT runs.
+
+The tests in tests/ drive the same Simulation under pytest and check
+what is spoken:
+    python -m pytest -q tests
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import requests
+import speech_recognition as sr
+import yaml
+
+from main import Drivers, HashingEmbedder, JarvisAssistant, JarvisLogger, WeatherProvider
+
+DEFAULT_SCRIPT = [
+    "hello jarvis",
+    "what time is it",
+    "what's the date today",
+    "volume 40",
+    "volume up",
+    "mute",
+    "unmute",
+    "pause the music",
+    "next track",
+    "add note check the thruster alignment",
+    "read notes",
+    "list projects",
+    "weather in malibu",
+    "news",
+    "what's trending",
+    "search the web for arc reactor designs",
+    "what did I say about the thrusters",
+    "system status",
+    "motivate me",
+    "how are the repulsors holding up",
+    "diagnostics",
+]
+
+# Intents the fake intent model returns for commands the local classifier misses
+DEFAULT_INTENTS = {
+    "search the web for arc reactor designs": {"intent": "search", "params": {"query": "arc reactor designs"}},
+}
+
+CHAT_REPLY = ("Certainly, boss. The Mark 1 thrusters are running at eighty percent efficiency. "
+              "I'd recommend recalibrating the stabilizers before the next flight test.")
+
+
+class FakeSpeechEngine:
+    """pyttsx3 engine that records what it says instead of speaking"""
+    def __init__(self, spoken, word_delay=0.0):
+        self.spoken = spoken
+        self.word_delay = word_delay
+        self.properties = {'voice': 'simulated', 'rate': 180, 'volume': 1.0}
+        self.pending = []
+        self.stopped = threading.Event()
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def say(self, text):
+        self.pending.append(text)
+
+    def save_to_file(self, text, path):
+        self.pending.append((text, path))
+
+    def runAndWait(self):
+        pending, self.pending = self.pending, []
+        self.stopped.clear()
+        for item in pending:
+            if isinstance(item, tuple):
+                _write_silence(item[1], 0.1)
+                continue
+            self.spoken.append(item)
+            if self.word_delay:
+                self.stopped.wait(self.word_delay * len(item.split()))
+
+    def stop(self):
+        self.stopped.set()
+
+
+def _write_silence(path, seconds, rate=16000):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack('<h', 0) * int(rate * seconds))
+
+
+class FakeChannel:
+    def get_busy(self):
+        return False
+
+    def stop(self):
+        pass
+
+
+class FakeAudio:
+    """PygameAudio stand-in; cached phrases count as spoken when played"""
+    def __init__(self, spoken, phrase_texts):
+        self.spoken = spoken
+        self.phrase_texts = phrase_texts
+        self.music = None
+
+    def init(self):
+        pass
+
+    def play(self, path):
+        text = self.phrase_texts(path)
+        if text:
+            self.spoken.append(text)
+        return FakeChannel()
+
+    def play_music(self, path):
+        self.music = path
+
+    def music_busy(self):
+        return self.music is not None
+
+    def stop_music(self):
+        self.music = None
+
+    def quit(self):
+        self.music = None
+
+
+class SilentMicrophone(sr.AudioSource):
+    """Microphone that delivers silence in real time, so no phrase ever starts"""
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+    CHUNK = 1024
+
+    def __init__(self):
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+    def read(self, size):
+        time.sleep(size / self.SAMPLE_RATE)
+        return b'\x00' * size * self.SAMPLE_WIDTH
+
+
+class FakeVolume:
+    """pycaw IAudioEndpointVolume stand-in"""
+    def __init__(self, level=0.5):
+        self.level = level
+        self.muted = False
+
+    def GetMasterVolumeLevelScalar(self):
+        return self.level
+
+    def SetMasterVolumeLevelScalar(self, level, context):
+        self.level = level
+
+    def GetMute(self):
+        return self.muted
+
+    def SetMute(self, muted, context):
+        self.muted = bool(muted)
+
+
+class FakeMediaKeys:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, key):
+        self.sent.append(key)
+
+
+class FakeBrowser:
+    """webbrowser stand-in; get() returns itself for every browser name"""
+    def __init__(self):
+        self.opened = []
+
+    def open(self, url, *args, **kwargs):
+        self.opened.append(url)
+        return True
+
+    open_new = open
+    open_new_tab = open
+
+    def get(self, name=None):
+        return self
+
+
+class FakeOllamaClient:
+    """ollama.Client stand-in
+
+    Intent prompts ("Interpret this command: ...") are answered from
+    intents, or as general conversation; every other chat gets CHAT_REPLY.
+    llm_delay is paid before the first token and token_delay per word.
+    """
+    def __init__(self, intents=None, llm_delay=0.0, token_delay=0.0, dim=384):
+        self.intents = {**DEFAULT_INTENTS, **(intents or {})}
+        self.llm_delay = llm_delay
+        self.token_delay = token_delay
+        self.embedder = HashingEmbedder(dim)
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        prompt = messages[-1]['content']
+        if prompt.startswith("Interpret this command: "):
+            command = prompt[len("Interpret this command: "):]
+            intent = self.intents.get(command.lower(), {"intent": "ollama", "params": {"query": command}})
+            tokens = [json.dumps(intent)]
+        else:
+            tokens = [word + " " for word in CHAT_REPLY.split(" ")]
+        time.sleep(self.llm_delay)
+        if stream:
+            return self._stream(tokens)
+        time.sleep(self.token_delay * len(tokens))
+        return {"message": {"role": "assistant", "content": "".join(tokens)}, "done": True}
+
+    def _stream(self, tokens):
+        for token in tokens:
+            time.sleep(self.token_delay)
+            yield {"message": {"role": "assistant", "content": token}, "done": False}
+        yield {"message": {"role": "assistant", "content": ""}, "done": True}
+
+    def generate(self, model, prompt='', **kwargs):
+        return {"response": "", "done": True}
+
+    def embeddings(self, model, prompt, **kwargs):
+        return {"embedding": self.embedder.embed(prompt).tolist()}
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = payload if isinstance(payload, str) else ""
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeHTTP:
+    """requests.Session stand-in with canned news and trending pages
+
+    Hosts listed in down refuse every connection.
+    """
+    ROUTES = {
+        "newsapi.org": {"status": "ok", "articles": [{"title": f"Headline {i}"} for i in range(1, 6)]},
+        "nitter.net/trending": "".join(f'<div class="trending-card">#Topic{i}</div>' for i in range(1, 6)),
+    }
+
+    def __init__(self, delay=0.0, routes=None, down=()):
+        self.delay = delay
+        self.routes = {**self.ROUTES, **(routes or {})}
+        self.down = set(down)
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append(url)
+        time.sleep(self.delay)
+        if any(host in url for host in self.down):
+            raise requests.exceptions.ConnectionError(f"simulated outage: {url}")
+        for prefix, payload in self.routes.items():
+            if prefix in url:
+                return FakeResponse(payload)
+        return FakeResponse({"error": "not found"}, status_code=404)
+
+
+class FakeWeather(WeatherProvider):
+    """Weather provider with canned conditions for a few cities; any other city doesn't exist"""
+    name = "fake"
+    PLACES = {
+        "malibu": {"name": "Malibu", "lat": 34.03, "lon": -118.78},
+        "new york": {"name": "New York", "lat": 40.71, "lon": -74.01},
+        "geneva": {"name": "Geneva", "lat": 46.2, "lon": 6.15},
+    }
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+
+    def geocode(self, city):
+        self.requests.append(("geocode", city))
+        time.sleep(self.delay)
+        return self.PLACES.get(city.lower().strip())
+
+    def current(self, lat, lon):
+        self.requests.append(("current", lat, lon))
+        time.sleep(self.delay)
+        return {"temp": 21.5, "description": "clear sky"}
+
+
+class Simulation:
+    """A JarvisAssistant on fake drivers, in a scratch directory
+
+    With synchronous set, intents that normally run on their own thread
+    run inline, so a command's latency covers all of its work. say()
+    returns (intent, seconds, replies) for one command, timed from the
+    command arriving until everything it queued has been spoken.
+    """
+    def __init__(self, llm_delay=0.0, token_delay=0.0, http_delay=0.0, speech_delay=0.0,
+                 intents=None, synchronous=True, quiet=True):
+        self.workdir = tempfile.mkdtemp(prefix='jarvis_sim_')
+        self.previous_cwd = os.getcwd()
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jarvis_config.yaml')) as f:
+            config = yaml.safe_load(f) or {}
+        config.setdefault('news_api', {})['api_key'] = 'simulated'
+        # Recall scores calibrated for the offline embedder, not ones passed through the fake Ollama
+        config.setdefault('recall', {})['embedding'] = 'hashing'
+        if quiet:
+            config.setdefault('logging', {})['console_level'] = 'WARNING'
+        with open(os.path.join(self.workdir, 'jarvis_config.yaml'), 'w') as f:
+            yaml.safe_dump(config, f)
+
+        self.spoken = []
+        self.volume = FakeVolume()
+        self.media_keys = FakeMediaKeys()
+        self.browser = FakeBrowser()
+        self.http = FakeHTTP(http_delay)
+        self.weather = FakeWeather(http_delay)
+        self.launched = []
+        self.llm = FakeOllamaClient(intents, llm_delay, token_delay)
+        self.audio = FakeAudio(self.spoken, self._phrase_text)
+        drivers = Drivers(
+            speech_engine=lambda: FakeSpeechEngine(self.spoken, speech_delay),
+            microphone=SilentMicrophone,
+            audio=self.audio,
+            volume=lambda: self.volume,
+            media_keys=self.media_keys,
+            llm=lambda settings: self.llm,
+            http=self.http,
+            browser=self.browser,
+            weather=self.weather,
+            launcher=self.launched.append,
+        )
+
+        os.chdir(self.workdir)
+        self.jarvis = JarvisAssistant(drivers)
+
+        registry = self.jarvis.intent_registry
+        if synchronous:
+            for spec in registry.intents.values():
+                spec.run_async = False
+        self.last_intent = None
+        dispatch = registry.dispatch
+
+        def recording_dispatch(intent_data, command, workshop_mode=False):
+            self.last_intent = dispatch(intent_data, command, workshop_mode)
+            return self.last_intent
+        registry.dispatch = recording_dispatch
+
+        # Let start-up finish and its announcements drain
+        self.jarvis.startup.result("ollama")
+        self.jarvis.semantic_index.ready.wait(5)
+        self.jarvis.speech.wait_idle(5)
+        del self.spoken[:]
+
+    def _phrase_text(self, path):
+        # Cached phrases are played back by file name; map them back to their text
+        jarvis = getattr(self, 'jarvis', None)
+        if jarvis is None:
+            return None
+        entry = jarvis.phrase_cache.entries.get(os.path.splitext(os.path.basename(path))[0])
+        return entry and entry["text"]
+
+    def say(self, command):
+        """Run one command; returns (intent, seconds, replies)"""
+        self.last_intent = None
+        first = len(self.spoken)
+        start = time.perf_counter()
+        self.jarvis.process_command(command)
+        self.jarvis.speech.wait_idle(30)
+        elapsed = time.perf_counter() - start
+        return self.last_intent or "unknown", elapsed, self.spoken[first:]
+
+    def run(self, commands):
+        return [(command, *self.say(command)) for command in commands]
+
+    def close(self):
+        jarvis = self.jarvis
+        # Calibration must finish before the microphone can be closed
+        jarvis.startup.result("microphone")
+        jarvis.shutdown()
+        JarvisLogger.shutdown()
+        os.chdir(self.previous_cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def load_script(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a scripted conversation against a headless JARVIS")
+    parser.add_argument("script", nargs="?", help="one command per line (default: built-in script)")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="fake Ollama seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake Ollama seconds per token")
+    parser.add_argument("--http-delay", type=float, default=0.0, help="fake HTTP seconds per request")
+    args = parser.parse_args()
+    commands = load_script(args.script) if args.script else DEFAULT_SCRIPT
+
+    out = sys.stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation = Simulation(args.llm_delay, args.token_delay, args.http_delay)
+        try:
+            for command in commands:
+                intent, seconds, replies = simulation.say(command)
+                print(f"> {command}  [{intent}, {seconds * 1000:.1f}ms]", file=out)
+                for reply in replies:
+                    print(f"  {reply}", file=out)
+        finally:
+            simulation.close()
+
+
+if __name__ == "__main__":
+    main()
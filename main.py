@@ -1,84 +1,3711 @@
-import ollama
+import time
+_import_started = time.perf_counter()  # Start of the startup report's clock
 import speech_recognition as sr
-import pyttsx3
 import datetime
 import webbrowser
 import os
-import pygame
-import requests
+import urllib.parse
 import json
 import psutil
 from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume  # For volume control
-import keyboard  # For media controls
-import spotify_local  # For Spotify integration
-import wikipedia  # For quick research
-import numpy as np  # For workshop calculations
-import cv2  # For workshop camera feed
-import pynput
 import random
 import threading
 import difflib
 import logging
-import time
-from apscheduler.schedulers.background import BackgroundScheduler
+import logging.handlers
+import atexit
+import importlib
+import queue
+import collections
+import gzip
+import sqlite3
+import contextlib
+import heapq
+import itertools
+import concurrent.futures
+import hashlib
+import zlib
+import math
+import re
+import inspect
 import shutil
-from bs4 import BeautifulSoup
-import yaml
+import bisect
+import sys
+import argparse
+import contextvars
+
+
+class LazyModule:
+    """Stand-in for a heavy or optional module that imports it on first use
+
+    Most sessions never touch the camera or Wikipedia, so their import cost
+    is only paid when a command needs them. A missing module fails inside
+    the handler's own error handling instead of stopping JARVIS at startup.
+    """
+    # (module, seconds, thread) for every lazy import so far, for the startup report
+    loaded = []
+    _lock = threading.RLock()
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        with LazyModule._lock:
+            if self._module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                LazyModule.loaded.append((self._name, time.perf_counter() - start, threading.current_thread().name))
+                self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+
+ollama = LazyModule('ollama')
+httpx = LazyModule('httpx')  # ollama's HTTP transport
+pyttsx3 = LazyModule('pyttsx3')
+pygame = LazyModule('pygame')
+comtypes = LazyModule('comtypes')
+pycaw = LazyModule('pycaw.pycaw')  # For volume control
+keyboard = LazyModule('keyboard')  # For media controls
+wikipedia = LazyModule('wikipedia')  # For quick research
+cv2 = LazyModule('cv2')  # For workshop camera feed
+apscheduler = LazyModule('apscheduler.schedulers.background')  # For timers and reminders
+apscheduler_jobstores = LazyModule('apscheduler.jobstores.base')
+np = LazyModule('numpy')  # For workshop calculations and microphone levels; preloaded at startup
+requests = LazyModule('requests')  # Only imported by the first web request
+yaml = LazyModule('yaml')  # Config file
+_import_seconds = time.perf_counter() - _import_started
+
+
+class DebugSampler(logging.Filter):
+    """Passes every INFO and above record, and a bounded sample of DEBUG ones
+
+    rate keeps that fraction of DEBUG records, evenly spaced rather than
+    at random; max_per_second caps whatever is left.
+    """
+    def __init__(self, rate=1.0, max_per_second=None):
+        super().__init__()
+        self.rate = rate
+        self.max_per_second = max_per_second
+        self.credit = 0.0
+        self.second = 0
+        self.in_second = 0
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        self.credit += self.rate
+        if self.credit < 1.0:
+            self.dropped += 1
+            return False
+        self.credit -= 1.0
+        if self.max_per_second is not None:
+            second = int(record.created)
+            if second != self.second:
+                self.second, self.in_second = second, 0
+            if self.in_second >= self.max_per_second:
+                self.dropped += 1
+                return False
+            self.in_second += 1
+        return True
+
+
+class JarvisLogger:
+    """Advanced logging system for JARVIS
+
+    Log calls only put the record on a queue; one listener thread writes
+    the debug log and the console, so the voice path never waits on disk.
+    The debug log rotates by size and rotated files are gzipped. The
+    handlers are shared by every JarvisLogger on the 'JARVIS' logger and
+    set up once; configure() swaps them only when the settings change.
+    """
+    _lock = threading.Lock()
+    _settings = None
+    _queue_handler = None
+    _listener = None
+    _sampler = None
+    _exit_hook = False
+
+    def __init__(self, settings=None):
+        self.logger = logging.getLogger('JARVIS')
+        self.logger.setLevel(logging.DEBUG)
+        with JarvisLogger._lock:
+            if JarvisLogger._listener is None or settings is not None:
+                self._setup(settings or {})
+
+    def configure(self, settings):
+        """Apply the logging section of the config"""
+        with JarvisLogger._lock:
+            self._setup(settings or {})
+
+    def dropped_debug(self):
+        """DEBUG records left out by sampling so far"""
+        sampler = JarvisLogger._sampler
+        return sampler.dropped if sampler is not None else 0
+
+    @classmethod
+    def _setup(cls, settings):
+        resolved = {
+            "path": settings.get('path', 'jarvis_debug.log'),
+            "max_bytes": int(settings.get('max_mb', 10) * 1024 * 1024),
+            "backups": settings.get('backups', 5),
+            "console_level": str(settings.get('console_level', 'INFO')).upper(),
+            "debug_sample_rate": settings.get('debug_sample_rate', 1.0),
+            "debug_max_per_second": settings.get('debug_max_per_second', 50),
+        }
+        if resolved == cls._settings:
+            return
+        cls._stop()
+
+        # File handler for detailed logs, gzipped as it rotates
+        fh = logging.handlers.RotatingFileHandler(
+            resolved["path"], maxBytes=resolved["max_bytes"], backupCount=resolved["backups"], encoding='utf-8'
+        )
+        fh.namer = lambda name: name + '.gz'
+        fh.rotator = cls._gzip_rotator
+        fh.setLevel(logging.DEBUG)
+
+        # Console handler for important messages
+        ch = logging.StreamHandler()
+        ch.setLevel(resolved["console_level"])
+
+        # Formatting
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        fh.setFormatter(formatter)
+        ch.setFormatter(formatter)
+
+        records = queue.SimpleQueue()
+        cls._sampler = DebugSampler(resolved["debug_sample_rate"], resolved["debug_max_per_second"])
+        cls._queue_handler = logging.handlers.QueueHandler(records)
+        cls._queue_handler.addFilter(cls._sampler)
+        cls._listener = logging.handlers.QueueListener(records, fh, ch, respect_handler_level=True)
+        cls._listener.start()
+        logging.getLogger('JARVIS').addHandler(cls._queue_handler)
+        cls._settings = resolved
+        if not cls._exit_hook:
+            # The listener thread is a daemon; flush what is queued on exit
+            atexit.register(cls.shutdown)
+            cls._exit_hook = True
+
+    @classmethod
+    def shutdown(cls):
+        """Write out queued records and close the log files"""
+        with cls._lock:
+            cls._stop()
+
+    @classmethod
+    def _stop(cls):
+        if cls._listener is None:
+            return
+        logging.getLogger('JARVIS').removeHandler(cls._queue_handler)
+        cls._listener.stop()
+        for handler in cls._listener.handlers:
+            handler.close()
+        cls._queue_handler = cls._listener = cls._settings = None
+
+    @staticmethod
+    def _gzip_rotator(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def debug(self, msg):
+        self.logger.debug(msg)
+
+    def info(self, msg):
+        self.logger.info(msg)
+
+    def error(self, msg, exc_info=True):
+        self.logger.error(msg, exc_info=exc_info)
+
+class StartupReport:
+    """Where startup time goes, per component, like python -X importtime
+
+    Slow devices and clients start on a small thread pool while the main
+    thread carries on; result(name) waits for one of them only when it is
+    actually needed. Background components overlap with the main thread,
+    so the report shows both when the main thread was ready and when the
+    last background component finished.
+    """
+    def __init__(self, logger, started=None):
+        self.logger = logger
+        self.started = started or time.perf_counter()
+        self.lock = threading.Lock()
+        self.timings = [("imports", _import_seconds, "MainThread")]
+        self.tasks = {}
+        self.ready_at = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup")
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """Time a block of startup work"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.timings.append((name, seconds, threading.current_thread().name))
+
+    def preload(self, *modules):
+        """Import lazy modules on the startup pool, ahead of the first component that uses them"""
+        for module in modules:
+            # An import error is raised again, and handled, where the module is used
+            self.executor.submit(module._load)
+
+    def run_in_background(self, name, function):
+        """Start a component on the startup pool"""
+        def task():
+            with self.measure(name):
+                try:
+                    return function()
+                except Exception as e:
+                    self.logger.error(f"{name} initialization failed: {e}")
+                    raise
+        self.tasks[name] = self.executor.submit(task)
+
+    def result(self, name, timeout=None):
+        """Wait for a background component; its return value, or None if it failed"""
+        future = self.tasks.get(name)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except Exception:
+            return None
+
+    def finish(self):
+        """Mark the main thread ready and log the report once the background work is done"""
+        self.ready_at = time.perf_counter() - self.started
+
+        def report():
+            concurrent.futures.wait(self.tasks.values())
+            self.logger.info(self.describe())
+        threading.Thread(target=report, name="startup-report", daemon=True).start()
+        self.executor.shutdown(wait=False)
+
+    def describe(self):
+        done_at = time.perf_counter() - self.started
+        with self.lock:
+            timings = list(self.timings)
+        timings += [(f"import {name}", seconds, thread) for name, seconds, thread in LazyModule.loaded]
+        lines = [f"Startup: main thread ready after {self.ready_at * 1000:.0f}ms, "
+                 f"background done after {done_at * 1000:.0f}ms"]
+        lines += [f"{seconds * 1000:>9.1f}ms  {name:<24} {thread}"
+                  for name, seconds, thread in sorted(timings, key=lambda timing: -timing[1])]
+        return "\n".join(lines)
+
+class Tracer:
+    """Per-stage latency spans for every command
+
+    A command gets a trace id when it is heard; each stage it passes
+    through (recognition, intent tiers, handler, speech queueing, synthesis
+    and playback) records a span against it. Spans are appended to a JSON
+    lines file by a writer thread, off the voice path, and the stage times
+    of the last window commands are kept in memory for diagnostics. The
+    current trace travels with the command through contextvars; work
+    handed to another thread has to carry it along explicitly.
+    """
+    # Histogram bucket upper bounds in seconds
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+    STAGE_NAMES = {
+        "recognition": "speech recognition",
+        "intent.local": "local intent matching",
+        "intent.cache": "the intent cache",
+        "intent.llm": "the intent model",
+        "intent.fallback": "keyword intent fallback",
+        "handler": "the command handler",
+        "speech.queue": "waiting to speak",
+        "speech.live": "live speech",
+        "speech.synthesis": "speech synthesis",
+        "speech.playback": "phrase playback",
+        "mic.open": "opening the microphone",
+        "mic.calibrate": "microphone calibration",
+    }
+
+    def __init__(self, logger=None, path=None, window=200, max_bytes=10 * 1024 * 1024):
+        self.logger = logger
+        self.path = path
+        self.window = window
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.traces = collections.OrderedDict()  # trace id -> {"command": ..., "stages": {stage: seconds}}
+        self.ids = itertools.count(1)
+        self.prefix = f"{int(time.time()):x}"
+        self.current = contextvars.ContextVar('jarvis_trace', default=None)
+        self.lines = queue.Queue()
+        self.writer = None
+        if path:
+            self.writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+            self.writer.start()
+
+    def begin(self, command=None, trace=None):
+        """Make a trace current, starting a new one unless given; returns its id"""
+        trace = trace or f"{self.prefix}-{next(self.ids)}"
+        self.current.set(trace)
+        with self.lock:
+            entry = self._entry(trace)
+            if command is not None:
+                entry["command"] = command
+        if command is not None:
+            self._emit({"trace": trace, "time": time.time(), "command": command})
+        return trace
+
+    def record(self, stage, seconds, trace=None, **attrs):
+        """Record a finished span; without a trace it goes to the current one"""
+        trace = trace or self.current.get()
+        with self.lock:
+            entry = self.traces.get(trace)
+            if entry is not None:
+                entry["stages"][stage] += seconds
+        self._emit({"trace": trace, "span": stage, "time": time.time() - seconds,
+                    "ms": round(seconds * 1000, 3), **attrs})
+
+    @contextlib.contextmanager
+    def span(self, stage, trace=None, **attrs):
+        """Time a block as a span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, trace, **attrs)
+
+    def wrap(self, stage, function, **attrs):
+        """function, timed as a span of whichever trace is current when it runs"""
+        def traced(*args, **kwargs):
+            with self.span(stage, **attrs):
+                return function(*args, **kwargs)
+        return traced
+
+    def samples(self, last=None):
+        """{stage: [seconds per command]} over the last commands (all kept if None)"""
+        current = self.current.get()
+        with self.lock:
+            # Leave out the command asking, if any
+            traces = [entry for trace, entry in self.traces.items()
+                      if entry["command"] is not None and trace != current]
+            traces = traces[-last:] if last else traces
+            samples = collections.defaultdict(list)
+            for entry in traces:
+                for stage, seconds in entry["stages"].items():
+                    samples[stage].append(seconds)
+        return samples, len(traces)
+
+    def histogram(self, stage, last=None):
+        """Counts per BUCKETS bucket for one stage over the last commands"""
+        counts = [0] * len(self.BUCKETS)
+        for seconds in self.samples(last)[0].get(stage, []):
+            counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        return counts
+
+    def summary(self, last=None):
+        """Per-stage count, mean, p50, p95 and max in seconds, slowest p95 first"""
+        samples, commands = self.samples(last)
+        stats = {}
+        for stage, values in samples.items():
+            values.sort()
+            stats[stage] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+            }
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["p95"])), commands
+
+    def describe_slowest(self, last=20):
+        """A spoken sentence about the slowest stage over the last commands"""
+        stats, commands = self.summary(last)
+        if not stats:
+            return "I haven't timed any commands yet, boss."
+        ranked = list(stats.items())
+        stage, slowest = ranked[0]
+        text = (f"Over the last {commands} commands, the slowest stage was {self._stage_name(stage)}: "
+                f"{self._spoken_ms(slowest['p95'])} at the 95th percentile, "
+                f"{self._spoken_ms(slowest['mean'])} on average.")
+        if len(ranked) > 1:
+            stage, runner_up = ranked[1]
+            text += f" Next was {self._stage_name(stage)} at {self._spoken_ms(runner_up['p95'])}."
+        return text
+
+    def describe(self, last=None):
+        """Per-stage table with histograms for logs"""
+        stats, commands = self.summary(last)
+        lines = [f"Stage latency over {commands} commands (p50 / p95 / max, histogram up to "
+                 f"{', '.join(f'{bound * 1000:g}ms' for bound in self.BUCKETS[:-1])}, more):"]
+        for stage, stage_stats in stats.items():
+            counts = " ".join(str(count) for count in self.histogram(stage, last))
+            lines.append(f"  {stage:<18} {stage_stats['p50'] * 1000:>8.1f} {stage_stats['p95'] * 1000:>8.1f} "
+                         f"{stage_stats['max'] * 1000:>8.1f}ms  [{counts}]")
+        return "\n".join(lines)
+
+    def close(self):
+        if self.writer is not None:
+            self.lines.put(None)
+            self.writer.join(timeout=5)
+            self.writer = None
+
+    @classmethod
+    def load(cls, path, window=200):
+        """Rebuild the rolling window from a trace file
+
+        A command's recognition span is written before its command
+        record, so entries are created by whichever comes first. No
+        trace is made current, so samples() leaves none out.
+        """
+        tracer = cls(window=window)
+        for name in (path + '.1', path):
+            try:
+                with open(name, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("trace") is None:
+                    continue
+                with tracer.lock:
+                    entry = tracer._entry(record["trace"])
+                    if "command" in record:
+                        entry["command"] = record["command"]
+                    elif "span" in record:
+                        entry["stages"][record["span"]] += record["ms"] / 1000
+        return tracer
+
+    def _entry(self, trace):
+        # Caller holds the lock
+        entry = self.traces.get(trace)
+        if entry is None:
+            entry = self.traces[trace] = {"command": None, "stages": collections.defaultdict(float)}
+            while len(self.traces) > self.window:
+                self.traces.popitem(last=False)
+        return entry
+
+    def _stage_name(self, stage):
+        return self.STAGE_NAMES.get(stage, stage)
+
+    def _spoken_ms(self, seconds):
+        return f"{seconds:.1f} seconds" if seconds >= 1 else f"{seconds * 1000:.0f} milliseconds"
+
+    def _emit(self, record):
+        if self.writer is not None:
+            self.lines.put(record)
+
+    def _write_loop(self):
+        while True:
+            records = [self.lines.get()]
+            # Write whatever else has piled up in the same call
+            while not self.lines.empty() and len(records) < 1000:
+                records.append(self.lines.get_nowait())
+            done = records[-1] is None
+            records = [record for record in records if record is not None]
+            try:
+                if records:
+                    if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                        os.replace(self.path, self.path + '.1')
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(''.join(json.dumps(record) + '\n' for record in records))
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Failed to write trace spans: {e}", exc_info=False)
+            if done:
+                return
+
+class TelemetrySampler:
+    """Workshop telemetry from one sampler thread, kept in NumPy ring buffers
+
+    Every interval seconds one sample of CPU (total and per core), memory,
+    disk and network throughput is written into fixed-size arrays holding
+    the last history samples, so memory use never grows. CPU is read
+    without an interval, as the change since the previous sample, so the
+    thread never blocks on it. Sampling and walking the process table
+    for the top processes each get half of max_overhead (a fraction of
+    one CPU): the walk costs far more than a sample, so it runs less
+    often, and too short an interval is stretched to fit.
+
+    stats() and trend() summarize a metric over a time window; after
+    each sample check_alerts() compares them with the thresholds and
+    calls on_alert, at most once per cooldown for each kind of alert,
+    while alerts_enabled is set.
+    """
+    METRICS = ("cpu", "memory", "disk_read", "disk_write", "net_sent", "net_recv")
+
+    def __init__(self, logger, interval=2.0, history=1800, top_count=3, max_overhead=0.005,
+                 thresholds=None, on_alert=None, cooldown=300):
+        self.logger = logger
+        self.interval = interval
+        self.top_count = top_count
+        self.max_overhead = max_overhead
+        self.thresholds = thresholds or {}
+        self.on_alert = on_alert
+        self.cooldown = cooldown
+        self.alerts_enabled = False
+        self.lock = threading.Lock()
+        self.times = np.zeros(history, dtype=np.float64)
+        self.values = np.full((history, len(self.METRICS)), np.nan, dtype=np.float64)
+        self.cores = None  # allocated on the first sample, once the core count is known
+        self.count = 0
+        self.head = 0
+        self.top = []
+        self.next_top_walk = 0.0
+        self.last_alerts = {}
+        self.previous_io = None
+        self.busy_seconds = 0.0
+        self.sample_cost = 0.0
+        self.started = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        # Prime cpu_percent so the first real sample covers one interval
+        psutil.cpu_percent(percpu=True)
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def sample(self):
+        """Take one sample now"""
+        started = time.thread_time()
+        now = time.time()
+        per_core = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory().percent
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        io_counters = (now,
+                       disk.read_bytes if disk else np.nan, disk.write_bytes if disk else np.nan,
+                       net.bytes_sent if net else np.nan, net.bytes_recv if net else np.nan)
+        rates = [np.nan] * 4
+        if self.previous_io is not None and now > self.previous_io[0]:
+            elapsed = now - self.previous_io[0]
+            rates = [(current - previous) / elapsed
+                     for current, previous in zip(io_counters[1:], self.previous_io[1:])]
+        self.previous_io = io_counters
+
+        with self.lock:
+            if self.cores is None or self.cores.shape[1] != len(per_core):
+                self.cores = np.full((len(self.times), len(per_core)), np.nan, dtype=np.float32)
+            self.times[self.head] = now
+            self.values[self.head] = [sum(per_core) / len(per_core), memory, *rates]
+            self.cores[self.head] = per_core
+            self.head = (self.head + 1) % len(self.times)
+            self.count = min(self.count + 1, len(self.times))
+        self.sample_cost = time.thread_time() - started
+        self.busy_seconds += self.sample_cost
+
+        if time.monotonic() >= self.next_top_walk:
+            self._walk_processes()
+
+    def window(self, seconds=None):
+        """(times, values, cores) of the samples in the last seconds, oldest first"""
+        with self.lock:
+            order = (self.head - self.count + np.arange(self.count)) % len(self.times)
+            times, values = self.times[order], self.values[order]
+            cores = self.cores[order] if self.cores is not None else np.zeros((0, 0), dtype=np.float32)
+        if seconds is not None:
+            start = np.searchsorted(times, time.time() - seconds)
+            times, values, cores = times[start:], values[start:], cores[start:]
+        return times, values, cores
+
+    def stats(self, metric, seconds=60):
+        """min, avg, max, p95 and last of a metric over the window, or None without samples"""
+        _, values, _ = self.window(seconds)
+        column = values[:, self.METRICS.index(metric)]
+        column = column[~np.isnan(column)]
+        if not column.size:
+            return None
+        return {"min": float(column.min()), "avg": float(column.mean()), "max": float(column.max()),
+                "p95": float(np.percentile(column, 95)), "last": float(column[-1])}
+
+    def trend(self, metric, seconds=300):
+        """Least-squares slope of a metric in units per minute over the window, or None"""
+        times, values, _ = self.window(seconds)
+        column = values[:, self.METRICS.index(metric)]
+        keep = ~np.isnan(column)
+        times, column = times[keep], column[keep]
+        # Too short a span and the slope is mostly noise
+        if column.size < 5 or times[-1] - times[0] < (60 if seconds is None else min(seconds / 2, 60)):
+            return None
+        return float(np.polyfit((times - times[0]) / 60, column, 1)[0])
+
+    def busiest_cores(self, seconds=60):
+        """(core, average percent) pairs, busiest first"""
+        _, _, cores = self.window(seconds)
+        if not cores.size:
+            return []
+        averages = np.nanmean(cores, axis=0)
+        return [(int(core), float(averages[core])) for core in np.argsort(-averages)]
+
+    def top_processes(self):
+        """(name, cpu percent) of the busiest processes at the last process walk"""
+        return list(self.top)
+
+    def overhead(self):
+        """CPU time the sampler has used, as a fraction of the wall time it has run"""
+        if self.started is None:
+            return 0.0
+        return self.busy_seconds / max(time.monotonic() - self.started, 1e-9)
+
+    def check_alerts(self):
+        """Call on_alert for every threshold crossed, at most once per cooldown per kind"""
+        alerts = []
+        cpu = self.stats("cpu", 60)
+        if cpu and cpu["avg"] > self.thresholds.get("cpu", 101):
+            alerts.append(("cpu", f"CPU has averaged {cpu['avg']:.0f}% over the last minute"))
+        memory = self.stats("memory", 60)
+        if memory and memory["last"] > self.thresholds.get("memory", 101):
+            alerts.append(("memory", f"Memory is at {memory['last']:.0f}%"))
+        climb = self.thresholds.get("memory_trend")
+        slope = self.trend("memory", self.thresholds.get("trend_window", 300)) if climb else None
+        if slope is not None and slope >= climb:
+            alerts.append(("memory_trend", f"Memory is climbing {slope:.1f}% a minute"))
+
+        now = time.monotonic()
+        for kind, message in alerts:
+            if now - self.last_alerts.get(kind, -self.cooldown) >= self.cooldown:
+                self.last_alerts[kind] = now
+                if self.on_alert:
+                    self.on_alert(kind, message)
+        return [message for _, message in alerts]
+
+    def _walk_processes(self):
+        started = time.thread_time()
+        processes = []
+        for process in psutil.process_iter(['name', 'cpu_percent']):
+            # psutil keeps the Process objects between calls, so cpu_percent is the change since the last walk
+            processes.append((process.info['cpu_percent'] or 0.0, process.info['name'] or "?"))
+        self.top = [(name, cpu) for cpu, name in heapq.nlargest(self.top_count, processes)]
+        cost = time.thread_time() - started
+        self.busy_seconds += cost
+        self.next_top_walk = time.monotonic() + max(self.interval, cost / (self.max_overhead / 2))
+
+    def _run(self):
+        while not self.stopped.wait(max(self.interval, self.sample_cost / (self.max_overhead / 2))):
+            try:
+                self.sample()
+                if self.alerts_enabled:
+                    self.check_alerts()
+            except Exception as e:
+                self.logger.error(f"Telemetry sample failed: {e}", exc_info=False)
+
+
+class JarvisStore:
+    """SQLite storage for conversations, notes, projects, reminders and settings
+
+    One database in WAL mode replaces the JSON files that used to be read
+    and rewritten whole. Every write is a short transaction on a shared
+    connection behind a lock, so the voice loop, timers and monitor threads
+    can all write without clobbering each other. With synchronous=NORMAL a
+    commit is an append to the WAL without an fsync: it survives a crash of
+    JARVIS, and only a power cut can lose the last few transactions.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY,
+            speaker TEXT NOT NULL,
+            text TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            tokens INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS conversations_timestamp ON conversations (timestamp);
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            note TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS notes_timestamp ON notes (timestamp);
+        CREATE TABLE IF NOT EXISTS projects (
+            name TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            created TEXT NOT NULL,
+            last_updated TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY,
+            message TEXT NOT NULL,
+            due TEXT NOT NULL,
+            created TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            kind TEXT NOT NULL DEFAULT 'reminder'
+        );
+        CREATE INDEX IF NOT EXISTS reminders_pending ON reminders (done, due);
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path='jarvis.db'):
+        self.path = path
+        self.lock = threading.RLock()
+        # Autocommit; multi-statement writes use transaction()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        # Databases from before timers were stored alongside reminders
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(reminders)")]
+        if "kind" not in columns:
+            self.conn.execute("ALTER TABLE reminders ADD COLUMN kind TEXT NOT NULL DEFAULT 'reminder'")
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run several statements atomically"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _execute(self, sql, args=()):
+        with self.lock:
+            return self.conn.execute(sql, args)
+
+    def _query(self, sql, args=()):
+        with self.lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    # Conversations
+
+    def add_turn(self, entry):
+        """Store a conversation turn; sets entry["id"]"""
+        entry["id"] = self._execute(
+            "INSERT INTO conversations (speaker, text, timestamp, tokens) VALUES (?, ?, ?, ?)",
+            (entry["speaker"], entry["text"], entry["timestamp"], entry.get("tokens"))
+        ).lastrowid
+        return entry["id"]
+
+    def turns(self, limit=None):
+        """The newest limit turns (all if None), oldest first"""
+        rows = self._query("SELECT id, speaker, text, timestamp, tokens FROM conversations "
+                           "ORDER BY id DESC LIMIT ?", (-1 if limit is None else limit,))
+        return [{key: row[key] for key in row.keys() if row[key] is not None} for row in reversed(rows)]
+
+    def delete_turns(self, through_id):
+        """Delete every turn up to and including through_id"""
+        self._execute("DELETE FROM conversations WHERE id <= ?", (through_id,))
+
+    # Notes
+
+    def add_note(self, note, timestamp=None):
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._execute("INSERT INTO notes (note, timestamp) VALUES (?, ?)", (note, timestamp))
+
+    def notes(self, limit=None):
+        """The newest limit notes (all if None), oldest first"""
+        rows = self._query("SELECT note, timestamp FROM notes ORDER BY id DESC LIMIT ?",
+                           (-1 if limit is None else limit,))
+        return [dict(row) for row in reversed(rows)]
+
+    # Projects
+
+    def save_project(self, name, status):
+        """Create a project, or reset the status of an existing one"""
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._execute(
+            "INSERT INTO projects (name, status, created, last_updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET status = excluded.status, last_updated = excluded.last_updated",
+            (name, status, now, now)
+        )
+
+    def update_project(self, name, status):
+        """Change a project's status; False if there is no such project"""
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor = self._execute("UPDATE projects SET status = ?, last_updated = ? WHERE name = ?", (status, now, name))
+        return cursor.rowcount > 0
+
+    def projects(self):
+        """All projects by name, in creation order"""
+        rows = self._query("SELECT name, status, created, last_updated FROM projects ORDER BY created, name")
+        return {row["name"]: {"status": row["status"], "created": row["created"], "last_updated": row["last_updated"]}
+                for row in rows}
+
+    # Reminders
+
+    def add_reminder(self, message, due, kind="reminder"):
+        """Store a reminder (or timer) due at a datetime; returns its id"""
+        now = str(datetime.datetime.now())
+        return self._execute("INSERT INTO reminders (message, due, created, kind) VALUES (?, ?, ?, ?)",
+                             (message, str(due), now, kind)).lastrowid
+
+    def reminders(self, include_done=False):
+        """Reminders ordered by due time"""
+        rows = self._query("SELECT id, message, due, created, done, kind FROM reminders "
+                           "WHERE done = 0 OR ? ORDER BY due", (include_done,))
+        return [dict(row) for row in rows]
+
+    def reminder(self, reminder_id):
+        """One reminder by id, or None"""
+        rows = self._query("SELECT id, message, due, created, done, kind FROM reminders WHERE id = ?", (reminder_id,))
+        return dict(rows[0]) if rows else None
+
+    def complete_reminder(self, reminder_id):
+        self._execute("UPDATE reminders SET done = 1 WHERE id = ?", (reminder_id,))
+
+    def reschedule_reminder(self, reminder_id, due):
+        """Move a reminder to a new due time, reopening it if it had fired; False if there is none"""
+        cursor = self._execute("UPDATE reminders SET due = ?, done = 0 WHERE id = ?", (str(due), reminder_id))
+        return cursor.rowcount > 0
+
+    def delete_reminder(self, reminder_id):
+        cursor = self._execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+        return cursor.rowcount > 0
+
+    # Settings
+
+    def get(self, key, default=None):
+        rows = self._query("SELECT value FROM settings WHERE key = ?", (key,))
+        return json.loads(rows[0]["value"]) if rows else default
+
+    def set(self, key, value):
+        self._execute("INSERT INTO settings (key, value) VALUES (?, ?) "
+                      "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, json.dumps(value)))
+
+    def checkpoint(self):
+        """Fold the WAL back into the database file"""
+        self._execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+
+    # One-shot import of the JSON files used before the database
+
+    def import_json(self, memory_file='jarvis_memory.json', journal_file='jarvis_memory.journal',
+                    notes_file='jarvis_notes.json', projects_file='jarvis_projects.json'):
+        """Copy the old JSON state into the database once; returns row counts or None if already done
+
+        The JSON files are left in place as a backup.
+        """
+        if self.get("json_imported_at") is not None:
+            return None
+        memory = self._read_legacy_memory(memory_file, journal_file)
+        notes = self._read_legacy_json(notes_file, [])
+        projects = self._read_legacy_json(projects_file, {})
+        reminders = [reminder for reminder in memory.get("reminders", [])
+                     if isinstance(reminder, dict) and reminder.get("message") and reminder.get("due")]
+
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO conversations (speaker, text, timestamp, tokens) VALUES (?, ?, ?, ?)",
+                [(entry.get("speaker", "user"), entry.get("text", ""), entry.get("timestamp", ""), entry.get("tokens"))
+                 for entry in memory.get("conversations", [])]
+            )
+            conn.executemany("INSERT INTO notes (note, timestamp) VALUES (?, ?)",
+                             [(note.get("note", ""), note.get("timestamp", "")) for note in notes])
+            conn.executemany(
+                "INSERT OR REPLACE INTO projects (name, status, created, last_updated) VALUES (?, ?, ?, ?)",
+                [(name, details.get("status", ""), details.get("created", ""), details.get("last_updated", ""))
+                 for name, details in projects.items()]
+            )
+            conn.executemany("INSERT INTO reminders (message, due, created) VALUES (?, ?, ?)",
+                             [(reminder["message"], str(reminder["due"]), str(reminder.get("created", "")))
+                              for reminder in reminders])
+            for key in ("user_preferences", "tasks", "last_active"):
+                if key in memory:
+                    conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                 (key, json.dumps(memory[key])))
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                         ("json_imported_at", json.dumps(str(datetime.datetime.now()))))
+        return {"conversations": len(memory.get("conversations", [])), "notes": len(notes),
+                "projects": len(projects), "reminders": len(reminders)}
+
+    def _read_legacy_json(self, path, default):
+        try:
+            with open(path, 'r') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return default
+        try:
+            # seek(0) + dump without truncate could leave the tail of a longer
+            # old version behind the document; only the first value is real
+            value, _ = json.JSONDecoder().raw_decode(text.lstrip())
+        except ValueError:
+            return default
+        return value if isinstance(value, type(default)) else default
+
+    def _read_legacy_memory(self, snapshot_file, journal_file):
+        # Snapshot plus the append/set/trim records journaled after it
+        memory = self._read_legacy_json(snapshot_file, {})
+        seq = memory.pop("_journal_seq", 0)
+        try:
+            with open(journal_file, 'r') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("seq", 0) <= seq:
+                continue
+            if record["op"] == "append":
+                memory.setdefault(record["key"], []).append(record["value"])
+            elif record["op"] == "set":
+                memory[record["key"]] = record["value"]
+            elif record["op"] == "trim":
+                del memory.get(record["key"], [])[:record["count"]]
+        return memory
+
+class ReminderScheduler:
+    """Timers and reminders on one scheduler thread, kept in the store
+
+    Each timer or reminder is a row in the reminders table plus a one-off
+    date job in an APScheduler BackgroundScheduler. Its job store keeps
+    jobs sorted by fire time, so adding one is a bisect and a single
+    thread sleeps until the earliest; hundreds of reminders cost no more
+    threads than one. At start() pending rows are scheduled again, and
+    any that came due while JARVIS was off fire straight away.
+
+    schedule() runs a function once at a given time without storing it,
+    for transient chains like pomodoro phases.
+    """
+    def __init__(self, store, logger, on_due, scheduler=None):
+        self.store = store
+        self.logger = logger
+        self.on_due = on_due
+        self.scheduler = scheduler or apscheduler.BackgroundScheduler(
+            executors={'default': {'type': 'threadpool', 'max_workers': 2}},
+            # A reminder that is late, even by hours, should still fire, once
+            job_defaults={'misfire_grace_time': None, 'coalesce': True}
+        )
+
+    def start(self):
+        """Start the scheduler thread and schedule every pending reminder; returns how many"""
+        self.scheduler.start()
+        pending = self.store.reminders()
+        for reminder in pending:
+            try:
+                self._add_job(reminder["id"], self._due(reminder))
+            except ValueError:
+                self.logger.error(f"Skipping reminder {reminder['id']} with bad due time {reminder['due']!r}",
+                                  exc_info=False)
+        return len(pending)
+
+    def add(self, message, due, kind="reminder"):
+        """Store and schedule a reminder due at a datetime; returns its id"""
+        reminder_id = self.store.add_reminder(message, due, kind=kind)
+        self._add_job(reminder_id, due)
+        return reminder_id
+
+    def pending(self):
+        """Pending reminders and timers, soonest first, with due parsed to a datetime"""
+        pending = []
+        for reminder in self.store.reminders():
+            try:
+                pending.append({**reminder, "due": self._due(reminder)})
+            except ValueError:
+                continue
+        return sorted(pending, key=lambda reminder: reminder["due"])
+
+    def cancel(self, reminder_id):
+        """Unschedule and delete a reminder; False if there is none"""
+        self.unschedule(self._job_id(reminder_id))
+        return self.store.delete_reminder(reminder_id)
+
+    def snooze(self, reminder_id, minutes):
+        """Fire a reminder again in minutes, even if it already has; returns the new due time or None"""
+        due = datetime.datetime.now() + datetime.timedelta(minutes=minutes)
+        if not self.store.reschedule_reminder(reminder_id, due):
+            return None
+        self._add_job(reminder_id, due)
+        return due
+
+    def schedule(self, job_id, when, function, *args):
+        """Run function(*args) once at a datetime, replacing any job with the same id"""
+        self.scheduler.add_job(function, 'date', run_date=when, args=args, id=job_id, replace_existing=True)
+
+    def unschedule(self, job_id):
+        """Remove a scheduled job; False if there was none"""
+        try:
+            self.scheduler.remove_job(job_id)
+            return True
+        except apscheduler_jobstores.JobLookupError:
+            return False
+
+    def stop(self):
+        """Stop the scheduler, waiting for any reminder that is firing right now"""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=True)
+
+    def _job_id(self, reminder_id):
+        return f"reminder-{reminder_id}"
+
+    def _due(self, reminder):
+        return datetime.datetime.fromisoformat(reminder["due"])
+
+    def _add_job(self, reminder_id, due):
+        self.schedule(self._job_id(reminder_id), due, self._fire, reminder_id)
+
+    def _fire(self, reminder_id):
+        reminder = self.store.reminder(reminder_id)
+        if reminder is None or reminder["done"]:
+            return
+        self.store.complete_reminder(reminder_id)
+        try:
+            self.on_due({**reminder, "due": self._due(reminder)})
+        except Exception as e:
+            self.logger.error(f"Reminder {reminder_id} failed: {e}")
+
+
+class ConversationRetention:
+    """Keeps memory["conversations"] bounded by count and age
+
+    Turns are held in a deque with a parallel deque of timestamps, so each
+    new turn only ever looks at the oldest entries: eviction is amortized
+    O(1). Evicted turns are appended to gzip-compressed, per-day archive
+    files instead of being dropped, and only deleted from the store once
+    they are archived.
+    """
+    def __init__(self, store, memory, logger, max_conversations=100, expiry_days=30, archive_dir='jarvis_archive'):
+        self.store = store
+        self.memory = memory
+        self.logger = logger
+        self.max_conversations = max_conversations
+        self.expiry = datetime.timedelta(days=expiry_days) if expiry_days else None
+        self.archive_dir = archive_dir
+        self.lock = threading.Lock()
+        self.timestamps = collections.deque()
+        # Archiving runs off the voice path
+        self.archiver = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def attach(self):
+        """Load the stored conversations and evict anything out of policy"""
+        conversations = self.memory["conversations"] = collections.deque(self.store.turns())
+        self.timestamps = collections.deque(self._parse_timestamp(entry) for entry in conversations)
+        self.enforce()
+
+    def add(self, entry):
+        """Store a new turn and evict whatever it pushes out of policy"""
+        with self.lock:
+            self.store.add_turn(entry)
+            self.memory["conversations"].append(entry)
+            self.timestamps.append(self._parse_timestamp(entry))
+        self.enforce()
+
+    def close(self):
+        """Wait for pending archive writes"""
+        self.archiver.shutdown(wait=True)
+
+    def enforce(self, now=None):
+        """Evict turns beyond max_conversations or older than the expiry"""
+        with self.lock:
+            count = max(0, len(self.timestamps) - self.max_conversations) if self.max_conversations else 0
+            if self.expiry is not None:
+                cutoff = ((now or datetime.datetime.now()) - self.expiry).timestamp()
+                while count < len(self.timestamps) and self.timestamps[count] < cutoff:
+                    count += 1
+            if not count:
+                return 0
+            conversations = self.memory["conversations"]
+            evicted = []
+            for _ in range(count):
+                self.timestamps.popleft()
+                evicted.append(conversations.popleft())
+            self.archiver.submit(self._evict, evicted)
+            return count
+
+    def _parse_timestamp(self, entry):
+        try:
+            return datetime.datetime.fromisoformat(entry["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            # Unreadable timestamps are treated as ancient and archived first
+            return 0.0
+
+    def _evict(self, entries):
+        # Archive first: a crash in between re-archives a turn rather than losing it
+        try:
+            self._archive(entries)
+            self.store.delete_turns(entries[-1]["id"])
+        except Exception as e:
+            self.logger.error(f"Failed to archive conversation turns: {e}")
+
+    def _archive(self, entries):
+        by_day = collections.defaultdict(list)
+        for entry in entries:
+            entry = {key: value for key, value in entry.items() if key != "id"}
+            by_day[str(entry.get("timestamp", ""))[:10] or "undated"].append(entry)
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for day, day_entries in by_day.items():
+            path = os.path.join(self.archive_dir, f"conversations-{day}.jsonl.gz")
+            with gzip.open(path, 'at', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in day_entries))
+        self.logger.debug(f"Archived {len(entries)} conversation turns")
+
+class ConversationContext:
+    """Chooses which remembered turns go into each Ollama chat request
+
+    The newest turns are always sent, followed by the older turns that
+    share the most keywords with the query, all within max_tokens. Every
+    turn carries its own "tokens" estimate, stored when it is remembered,
+    so building a request never re-measures the whole history.
+
+    Ollama reuses its KV cache for the longest prefix shared with the
+    previous request. The system prompt therefore always comes first, and
+    the first turn of the recent window stays put until the window fills
+    up, rather than sliding on every turn.
+    """
+    STOPWORDS = frozenset(
+        "a an and are as at be but by can do for from have how i in is it me my of on or "
+        "so that the this to was what when where which who why will with you your jarvis".split()
+    )
+
+    def __init__(self, retention, system_prompt, max_tokens=1024, recent_turns=8, relevant_turns=4):
+        self.retention = retention
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.relevant_turns = relevant_turns
+        self.system_tokens = self.estimate_tokens(system_prompt)
+        self.anchor = None
+
+    @staticmethod
+    def estimate_tokens(text):
+        # Llama tokenizers average roughly four characters per English token
+        return max(1, (len(text) + 3) // 4)
+
+    def tokens(self, entry):
+        """Token estimate of a turn, filled in for turns remembered before it was stored"""
+        count = entry.get("tokens")
+        if count is None:
+            count = entry["tokens"] = self.estimate_tokens(entry.get("text", ""))
+        return count
+
+    def build(self, query):
+        """Messages for a chat request: system prompt, history, then the query"""
+        with self.retention.lock:
+            conversations = list(self.retention.memory.get("conversations", ()))
+        # listen() has usually remembered the query already
+        if conversations and conversations[-1].get("speaker") == "user" and conversations[-1].get("text") == query:
+            conversations.pop()
+
+        budget = self.max_tokens - self.system_tokens - self.estimate_tokens(query)
+        recent_budget = budget * 3 // 4 if self.relevant_turns else budget
+        start = self._window_start(conversations, recent_budget)
+        recent = conversations[start:]
+        older = self._relevant(conversations[:start], query, budget - sum(self.tokens(entry) for entry in recent))
+
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        messages.extend(
+            {'role': 'user' if entry.get("speaker") == "user" else 'assistant', 'content': entry.get("text", "")}
+            for entry in recent
+        )
+        if older:
+            # After the recent turns so a change in relevant turns does not invalidate the cached prefix
+            lines = "\n".join(f"{entry.get('speaker', 'user')}: {entry.get('text', '')}" for entry in older)
+            messages.append({'role': 'system', 'content': f"Earlier in the conversation:\n{lines}"})
+        messages.append({'role': 'user', 'content': query})
+        return messages
+
+    def _window_start(self, conversations, budget):
+        used = 0
+        for start in range(len(conversations) - 1, -1, -1):
+            used += self.tokens(conversations[start])
+            if used > budget or len(conversations) - start > self.recent_turns:
+                break
+            if conversations[start] is self.anchor:
+                return start
+
+        # Anchor gone or the window is full: restart it at half size so it can grow again
+        used = 0
+        start = len(conversations)
+        while start > 0 and len(conversations) - start < max(1, self.recent_turns // 2):
+            cost = self.tokens(conversations[start - 1])
+            if used + cost > budget:
+                break
+            used += cost
+            start -= 1
+        self.anchor = conversations[start] if start < len(conversations) else None
+        return start
+
+    def _keywords(self, text):
+        return set(re.findall(r"[a-z0-9']+", text.lower())) - self.STOPWORDS
+
+    def _relevant(self, older, query, budget):
+        if not older or budget <= 0 or not self.relevant_turns:
+            return []
+        query_words = self._keywords(query)
+        if not query_words:
+            return []
+        scored = []
+        for i, entry in enumerate(older):
+            words = self._keywords(entry.get("text", ""))
+            overlap = len(query_words & words)
+            if overlap:
+                scored.append((overlap / math.sqrt(len(words)), i))
+
+        chosen = set()
+        for _, i in heapq.nlargest(self.relevant_turns, scored):
+            # A matching question is only useful together with its answer
+            turns = [i]
+            if older[i].get("speaker") == "user" and i + 1 < len(older):
+                turns.append(i + 1)
+            turns = [turn for turn in turns if turn not in chosen]
+            cost = sum(self.tokens(older[turn]) for turn in turns)
+            if cost <= budget:
+                chosen.update(turns)
+                budget -= cost
+        return [older[i] for i in sorted(chosen)]
+
+def singular(word):
+    """Crude English singular ("thrusters" -> "thruster"), enough to match plurals"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+class HashingEmbedder:
+    """Offline embeddings: signed feature hashing of words and word bigrams
+
+    Words are singularized, so a question about "the thrusters" finds a
+    note about "the thruster".
+    """
+    min_score = 0.15
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hashing-singular-{dim}"
+
+    def available(self):
+        return True
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = [singular(word) for word in re.findall(r"[a-z0-9']+", text.lower())
+                 if word not in ConversationContext.STOPWORDS]
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(token.encode('utf-8'))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vector
+
+
+class OllamaEmbedder:
+    """Embeddings from the local Ollama server's embedding model"""
+    min_score = 0.45
+
+    def __init__(self, models, role='embed'):
+        self.models = models
+        self.role = role
+        self.name = f"ollama-{models.model(role)}"
+
+    def available(self):
+        try:
+            self.embed("workshop")
+            return True
+        except Exception:
+            return False
+
+    def embed(self, text):
+        return np.asarray(self.models.embeddings(self.role, text)['embedding'], dtype=np.float32)
+
+
+class SemanticIndex:
+    """Embedding index over conversations, notes and projects for recall
+
+    Vectors are L2-normalized rows of one float32 matrix, so a query is a
+    single matrix-vector product plus argpartition for the top k. On disk
+    the index is append-only: raw rows in vectors.f32 and one line of
+    metadata per row in entries.jsonl, so adding an entry never rewrites
+    what is already there. Embedding runs on a worker thread, off the
+    voice path.
+
+    The first available embedder wins at start-up. If the stored index
+    was built with a different one, it is re-embedded from its entries.
+    """
+    def __init__(self, logger, directory='jarvis_semantic_index', embedders=()):
+        self.logger = logger
+        self.directory = directory
+        self.embedders = list(embedders) or [HashingEmbedder()]
+        self.embedder = None
+        self.vectors_file = os.path.join(directory, 'vectors.f32')
+        self.entries_file = os.path.join(directory, 'entries.jsonl')
+        self.meta_file = os.path.join(directory, 'meta.json')
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.queue = queue.Queue()
+        self.thread = None
+        self.entries = []
+        self.matrix = np.zeros((0, 1), dtype=np.float32)
+        self.times = np.zeros(0, dtype=np.float64)
+        self.count = 0
+
+    def start(self, backfill=None):
+        """Load the index in the background; backfill() seeds an empty one"""
+        self.thread = threading.Thread(target=self._run, args=(backfill,), name="semantic-index", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+
+    def add(self, kind, text, timestamp=None, **meta):
+        """Queue a text for indexing; timestamp is seconds since the epoch"""
+        if text and text.strip():
+            self.queue.put([self._entry(kind, text, timestamp, meta)])
+
+    def extend(self, items):
+        """Queue (kind, text, timestamp, meta) tuples for indexing as one batch"""
+        entries = [self._entry(kind, text, timestamp, meta) for kind, text, timestamp, meta in items if text]
+        if entries:
+            self.queue.put(entries)
+
+    def flush(self, timeout=2.0):
+        """Wait until everything queued so far is searchable; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline or not (self.thread and self.thread.is_alive()):
+                return False
+            time.sleep(0.005)
+        return True
+
+    def search(self, query, k=5, since=None, until=None, wait=5.0):
+        """Top k (score, entry) pairs by cosine similarity, best first"""
+        if not self.ready.wait(wait) or not self.embedder:
+            return []
+        vector = self._normalize(self.embedder.embed(query))
+        with self.lock:
+            count = self.count
+            if not count:
+                return []
+            scores = self.matrix[:count] @ vector
+            if since is not None:
+                scores[self.times[:count] < since] = -np.inf
+            if until is not None:
+                scores[self.times[:count] > until] = -np.inf
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.entries[i]) for i in top
+                    if scores[i] >= self.embedder.min_score]
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, kind, text, timestamp, meta):
+        return {"kind": kind, "text": text.strip(), "time": timestamp or time.time(), **meta}
+
+    def _normalize(self, vector):
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _run(self, backfill):
+        try:
+            self.embedder = next(embedder for embedder in self.embedders if embedder.available())
+            self._load()
+        except Exception as e:
+            self.logger.error(f"Semantic index unavailable: {e}")
+            self.ready.set()
+            return
+        self.ready.set()
+        if not self.count and backfill:
+            try:
+                self.extend(backfill())
+            except Exception as e:
+                self.logger.error(f"Semantic index backfill failed: {e}")
+
+        pending = collections.deque()
+        batches = 0  # queue items behind pending, marked done once they are searchable
+        while True:
+            try:
+                entries = self.queue.get(timeout=30 if pending else None)
+            except queue.Empty:
+                entries = []
+            if entries is None:
+                break
+            if entries:
+                batches += 1
+            pending.extend(entries)
+            try:
+                vectors = [self.embedder.embed(entry["text"]) for entry in pending]
+            except Exception as e:
+                # Embedding server went away; keep the batch and retry on the next wake-up
+                self.logger.error(f"Embedding {len(pending)} entries failed: {e}", exc_info=False)
+                continue
+            self._append(list(pending), vectors)
+            pending.clear()
+            for _ in range(batches):
+                self.queue.task_done()
+            batches = 0
+        if pending:
+            self.logger.error(f"Semantic index dropped {len(pending)} unembedded entries", exc_info=False)
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {}
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r') as f:
+                meta = json.load(f)
+        entries = []
+        if os.path.exists(self.entries_file):
+            with open(self.entries_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+
+        if meta.get("embedder") != self.embedder.name:
+            if entries:
+                self.logger.info(f"Re-embedding {len(entries)} recall entries with {self.embedder.name}")
+            for path in (self.vectors_file, self.entries_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            with open(self.meta_file, 'w') as f:
+                json.dump({"embedder": self.embedder.name, "dim": len(self.embedder.embed("workshop"))}, f)
+            self._append(entries, [self.embedder.embed(entry["text"]) for entry in entries])
+            return
+
+        dim = meta["dim"]
+        vectors = np.fromfile(self.vectors_file, dtype=np.float32) if os.path.exists(self.vectors_file) else np.zeros(0, np.float32)
+        # A crash between the two appends leaves one file a row ahead
+        count = min(vectors.size // dim, len(entries))
+        if vectors.size != count * dim:
+            os.truncate(self.vectors_file, count * dim * 4)
+        if len(entries) != count:
+            with open(self.entries_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in entries[:count]))
+        with self.lock:
+            self.matrix = vectors[:count * dim].reshape(count, dim)
+            self.times = np.array([entry["time"] for entry in entries[:count]], dtype=np.float64)
+            self.entries = entries[:count]
+            self.count = count
+
+    def _append(self, entries, vectors):
+        if not entries:
+            return
+        block = np.vstack([self._normalize(vector) for vector in vectors]).astype(np.float32)
+        with open(self.vectors_file, 'ab') as f:
+            f.write(block.tobytes())
+        with open(self.entries_file, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+
+        with self.lock:
+            needed = self.count + len(entries)
+            if needed > self.matrix.shape[0]:
+                # Grow geometrically so appends stay amortized O(1)
+                capacity = max(needed, 2 * self.matrix.shape[0], 1024)
+                matrix = np.zeros((capacity, block.shape[1]), dtype=np.float32)
+                times = np.zeros(capacity, dtype=np.float64)
+                if self.count:
+                    matrix[:self.count] = self.matrix[:self.count]
+                    times[:self.count] = self.times[:self.count]
+                self.matrix, self.times = matrix, times
+            self.matrix[self.count:needed] = block
+            self.times[self.count:needed] = [entry["time"] for entry in entries]
+            self.entries.extend(entries)
+            self.count = needed
+
+class PygameAudio:
+    """Sound output through pygame.mixer: phrase clips on channels, alerts on the music stream"""
+    def init(self):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    def play(self, path):
+        """Start a sound file; returns a channel with get_busy() and stop()"""
+        return pygame.mixer.Sound(path).play()
+
+    def play_music(self, path):
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play()
+
+    def music_busy(self):
+        return pygame.mixer.get_init() is not None and pygame.mixer.music.get_busy()
+
+    def stop_music(self):
+        pygame.mixer.music.stop()
+
+    def quit(self):
+        pygame.mixer.quit()
+
+
+def _pycaw_volume():
+    devices = pycaw.AudioUtilities.GetSpeakers()
+    interface = devices.Activate(pycaw.IAudioEndpointVolume._iid_, comtypes.CLSCTX_ALL, None)
+    return cast(interface, POINTER(pycaw.IAudioEndpointVolume))
+
+
+def _start_file(path):
+    os.startfile(path)  # Windows only
+
+
+class Drivers:
+    """Everything JARVIS drives outside its own process, in one replaceable bundle
+
+    The defaults are the real devices and services. jarvis_sim.py passes
+    fakes instead, so a scripted conversation runs headless on any OS.
+    Factories (speech_engine, microphone, volume, llm) are called when the
+    device is opened, on the thread that owns it; the rest are used as is.
+
+    speech_engine  () -> pyttsx3-style engine
+    microphone     () -> speech_recognition AudioSource
+    audio          PygameAudio-style sound output
+    volume         () -> pycaw IAudioEndpointVolume-style endpoint
+    media_keys     object with send(key name), like the keyboard module
+    llm            (settings) -> ollama.Client-style client, None for the real one
+    http           session with get(url, **kwargs) under HttpClient, None for a pooled requests.Session
+    weather        WeatherProvider, None for the configured one
+    browser        object with open(), open_new() and get(name), like webbrowser
+    launcher       (path) -> None, like os.startfile
+    """
+    def __init__(self, speech_engine=None, microphone=None, audio=None, volume=None, media_keys=None,
+                 llm=None, http=None, browser=None, launcher=None, weather=None):
+        self.speech_engine = speech_engine or (lambda: pyttsx3.init())
+        self.microphone = microphone or sr.Microphone
+        self.audio = audio or PygameAudio()
+        self.volume = volume or _pycaw_volume
+        self.media_keys = media_keys or keyboard
+        self.llm = llm
+        self.http = http
+        self.browser = browser or webbrowser
+        self.launcher = launcher or _start_file
+        self.weather = weather
+
+
+class CircuitOpenError(Exception):
+    """The host's circuit breaker is open; the request was not sent"""
+
+
+class PoolTimeoutError(Exception):
+    """Every connection to the host stayed busy for pool_timeout; the request was not sent"""
+
+
+class HttpClient:
+    """Pooled HTTP client shared by every web feature
+
+    One requests.Session keeps connections alive between calls, with at
+    most connections_per_host requests in flight per host; further callers
+    wait up to pool_timeout for one to finish, then fail with
+    PoolTimeoutError. Every request gets a (connect, read) timeout, so a
+    hung endpoint cannot freeze the voice loop.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with
+    full-jitter exponential backoff, but only while the host's retry
+    budget lasts: each request earns retry_ratio of a retry, so during an
+    outage retries stay a small fraction of traffic instead of
+    multiplying it. After failure_threshold consecutive failures the
+    host's circuit breaker opens and calls fail fast with
+    CircuitOpenError; after open_seconds one trial request is let through
+    to close it again.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, logger, settings=None, session=None):
+        settings = settings or {}
+        self.logger = logger
+        self.timeout = (settings.get('connect_timeout', 3.05), settings.get('read_timeout', 10))
+        self.max_retries = settings.get('max_retries', 2)
+        self.backoff = settings.get('backoff', 0.25)
+        self.max_backoff = settings.get('max_backoff', 4.0)
+        self.retry_ratio = settings.get('retry_ratio', 0.2)
+        self.failure_threshold = settings.get('failure_threshold', 5)
+        self.open_seconds = settings.get('open_seconds', 30)
+        self.connections_per_host = settings.get('connections_per_host', 4)
+        self.pool_timeout = settings.get('pool_timeout', 5)
+        self.settings = settings
+        self._session = session
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    @property
+    def session(self):
+        """The pooled session, created (and requests imported) on first use"""
+        with self.lock:
+            if self._session is None:
+                self._session = self._create_session(self.settings)
+            return self._session
+
+    @staticmethod
+    def _create_session(settings):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=settings.get('max_hosts', 10),
+            # Callers already wait, with a timeout, for one of the host's slots in get()
+            pool_maxsize=settings.get('connections_per_host', 4)
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        """session.get with timeouts, retries and the host's breaker
+
+        Returns the response, including a final 429/5xx one once retries
+        are used up; raises CircuitOpenError, PoolTimeoutError or the last
+        request error.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = self._host(url)
+        attempt = 0
+        while True:
+            self._admit(host)
+            start = time.perf_counter()
+            recorded = False
+            try:
+                try:
+                    response, error = self._send(host, url, kwargs), None
+                    failed = response.status_code in self.RETRY_STATUSES
+                except requests.exceptions.RequestException as e:
+                    response, error, failed = None, e, True
+                self._record(host, time.perf_counter() - start, failed)
+                recorded = True
+            finally:
+                if not recorded:
+                    # Any other error ends a trial too, or the host would stay rejected for good
+                    with self.lock:
+                        host["trial"] = False
+            if not failed:
+                return response
+            if attempt >= self.max_retries or not self._spend_retry(host):
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            # Full jitter: anywhere up to the exponential step, so clients don't retry in lockstep
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def _send(self, host, url, kwargs):
+        if not host["slots"].acquire(timeout=self.pool_timeout):
+            raise PoolTimeoutError(f"All {self.connections_per_host} connections to {host['name']} "
+                                   f"stayed busy for {self.pool_timeout}s")
+        try:
+            return self.session.get(url, **kwargs)
+        finally:
+            host["slots"].release()
+
+    def stats(self):
+        """Per-host request, failure, retry and rejection counts, breaker state and latency in ms"""
+        now = time.monotonic()
+        with self.lock:
+            stats = {}
+            for name, host in self.hosts.items():
+                latencies = sorted(host["latencies"])
+                if host["opened_at"] is None:
+                    state = "closed"
+                elif host["trial"] or now - host["opened_at"] >= self.open_seconds:
+                    state = "half-open"
+                else:
+                    state = "open"
+                stats[name] = {
+                    "requests": host["requests"], "failures": host["failures"], "retries": host["retries"],
+                    "rejected": host["rejected"], "state": state,
+                    "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+                    "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0.0,
+                }
+            return stats
+
+    def describe_stats(self):
+        """One-line summary per host for logs"""
+        return "; ".join(
+            f"{name}: {stats['requests']} requests, {stats['failures']} failed, {stats['retries']} retried, "
+            f"{stats['rejected']} rejected, {stats['state']}, p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms"
+            for name, stats in self.stats().items()
+        ) or "no requests"
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+    def _host(self, url):
+        name = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            host = self.hosts.get(name)
+            if host is None:
+                host = self.hosts[name] = {
+                    "name": name, "requests": 0, "failures": 0, "retries": 0, "rejected": 0,
+                    "consecutive_failures": 0, "opened_at": None, "trial": False,
+                    "budget": 2.0, "latencies": collections.deque(maxlen=200),
+                    "slots": threading.BoundedSemaphore(self.connections_per_host)
+                }
+            return host
+
+    def _admit(self, host):
+        with self.lock:
+            if host["opened_at"] is not None:
+                if host["trial"] or time.monotonic() - host["opened_at"] < self.open_seconds:
+                    host["rejected"] += 1
+                    raise CircuitOpenError(f"{host['name']} is failing; not trying again for a while")
+                # Half-open: this request is the trial
+                host["trial"] = True
+            host["requests"] += 1
+            host["budget"] = min(10.0, host["budget"] + self.retry_ratio)
+
+    def _spend_retry(self, host):
+        with self.lock:
+            if host["budget"] < 1.0:
+                return False
+            host["budget"] -= 1.0
+            host["retries"] += 1
+            return True
+
+    def _record(self, host, seconds, failed):
+        with self.lock:
+            host["latencies"].append(seconds)
+            if not failed:
+                if host["opened_at"] is not None:
+                    self.logger.info(f"HTTP circuit for {host['name']} closed again")
+                host["consecutive_failures"] = 0
+                host["opened_at"] = None
+                host["trial"] = False
+                return
+            host["failures"] += 1
+            host["consecutive_failures"] += 1
+            if host["trial"] or host["consecutive_failures"] >= self.failure_threshold:
+                if not host["trial"]:
+                    self.logger.error(f"HTTP circuit for {host['name']} opened after "
+                                      f"{host['consecutive_failures']} failures", exc_info=False)
+                host["opened_at"] = time.monotonic()
+                host["trial"] = False
+
+
+class WeatherProvider:
+    """Source of weather data used by WeatherService
+
+    geocode() returns {"name", "lat", "lon"} for a city, or None if there
+    is no such place; current() returns {"temp" (°C), "description"}.
+    Errors reaching the service are raised as is.
+    """
+    name = "base"
+
+    def geocode(self, city):
+        raise NotImplementedError
+
+    def current(self, lat, lon):
+        raise NotImplementedError
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo geocoding and forecast APIs (free, no API key)"""
+    name = "open-meteo"
+    GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
+    FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+    # WMO weather interpretation codes
+    DESCRIPTIONS = {
+        0: "clear sky", 1: "mainly clear", 2: "partly cloudy", 3: "overcast", 45: "fog", 48: "freezing fog",
+        51: "light drizzle", 53: "drizzle", 55: "dense drizzle", 56: "light freezing drizzle", 57: "freezing drizzle",
+        61: "light rain", 63: "rain", 65: "heavy rain", 66: "light freezing rain", 67: "freezing rain",
+        71: "light snow", 73: "snow", 75: "heavy snow", 77: "snow grains",
+        80: "light rain showers", 81: "rain showers", 82: "violent rain showers",
+        85: "light snow showers", 86: "heavy snow showers",
+        95: "thunderstorm", 96: "thunderstorm with hail", 99: "thunderstorm with heavy hail",
+    }
+
+    def __init__(self, http):
+        self.http = http
+
+    def geocode(self, city):
+        response = self.http.get(self.GEOCODE_URL, params={"name": city, "count": 1, "language": "en"})
+        response.raise_for_status()
+        results = response.json().get("results")
+        if not results:
+            return None
+        return {"name": results[0]["name"], "lat": results[0]["latitude"], "lon": results[0]["longitude"]}
+
+    def current(self, lat, lon):
+        response = self.http.get(self.FORECAST_URL, params={
+            "latitude": lat, "longitude": lon, "current": "temperature_2m,weather_code"
+        })
+        response.raise_for_status()
+        current = response.json()["current"]
+        return {"temp": current["temperature_2m"],
+                "description": self.DESCRIPTIONS.get(current["weather_code"], "unknown conditions")}
+
+
+class OpenWeatherMapProvider(WeatherProvider):
+    """OpenWeatherMap geocoding and current weather APIs (needs an API key)"""
+    name = "openweathermap"
+    GEOCODE_URL = "https://api.openweathermap.org/geo/1.0/direct"
+    WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+    def __init__(self, http, api_key):
+        self.http = http
+        self.api_key = api_key
+
+    def geocode(self, city):
+        response = self.http.get(self.GEOCODE_URL, params={"q": city, "limit": 1, "appid": self.api_key})
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return {"name": results[0]["name"], "lat": results[0]["lat"], "lon": results[0]["lon"]}
+
+    def current(self, lat, lon):
+        response = self.http.get(self.WEATHER_URL, params={
+            "lat": lat, "lon": lon, "appid": self.api_key, "units": "metric"
+        })
+        response.raise_for_status()
+        data = response.json()
+        return {"temp": data["main"]["temp"], "description": data["weather"][0]["description"]}
+
+
+def create_weather_provider(name, http, settings, logger):
+    """Build the configured weather provider, falling back to Open-Meteo"""
+    if name == "openweathermap":
+        if settings.get('api_key'):
+            return OpenWeatherMapProvider(http, settings['api_key'])
+        logger.error("OpenWeatherMap needs weather.api_key, falling back to Open-Meteo", exc_info=False)
+    return OpenMeteoProvider(http)
+
+
+class WeatherService:
+    """Current conditions by city name, cached and coalesced
+
+    A city's coordinates never change, so the geocoding result is cached
+    on disk for good and each lookup after the first is one request.
+    Conditions are kept in memory for ttl seconds. Concurrent lookups of
+    the same city share one in-flight request: the first caller fetches
+    and the rest wait on its future.
+    """
+    def __init__(self, provider, logger, geocode_path='jarvis_geocode_cache.json', ttl=600, max_places=500):
+        self.provider = provider
+        self.logger = logger
+        self.places = PersistentLRUCache(geocode_path, logger, max_entries=max_places)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conditions = {}
+        self.inflight = {}
+        self.counters = collections.Counter()
+
+    def current(self, city):
+        """Return {"city", "temp", "description"}; raises LookupError for an unknown city"""
+        key = " ".join(city.lower().split())
+        with self.lock:
+            cached = self.conditions.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                self.counters["cached"] += 1
+                return cached[1]
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = concurrent.futures.Future()
+            else:
+                self.counters["coalesced"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            report = self._fetch(city, key)
+            future.set_result(report)
+            return report
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def describe_stats(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+        counts = ", ".join(f"{name}: {count}" for name, count in counters) or "unused"
+        return f"{self.provider.name}, {len(self.places)} places, {counts}"
+
+    def _fetch(self, city, key):
+        place = self.places.get(key)
+        if place is None:
+            with self.lock:
+                self.counters["geocoded"] += 1
+            place = self.provider.geocode(city)
+            if place is None:
+                raise LookupError(f"Unknown city: {city}")
+            self.places.put(key, place)
+        with self.lock:
+            self.counters["fetched"] += 1
+        report = {"city": place["name"], **self.provider.current(place["lat"], place["lon"])}
+        with self.lock:
+            self.conditions[key] = (time.monotonic(), report)
+        return report
+
+
+class PhraseCache:
+    """Content-addressed on-disk cache of rendered speech
+
+    Audio is keyed by (text, voice, rate, volume), so a phrase is only
+    synthesized once per voice setting and can be replayed through
+    pygame.mixer afterwards. The least recently used files are evicted once
+    the cache grows past max_bytes.
+    """
+    def __init__(self, logger, directory='jarvis_tts_cache', max_bytes=64 * 1024 * 1024):
+        self.logger = logger
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.load()
+
+    def load(self):
+        """Load the cache index, dropping entries whose audio has gone missing"""
+        try:
+            with open(self.index_file, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        for entry in entries:
+            if os.path.exists(self.path(entry["key"])):
+                self.entries[entry["key"]] = entry
+                self.total_bytes += entry["bytes"]
+
+    def save(self):
+        """Persist the cache index in LRU order"""
+        with self.lock:
+            entries = list(self.entries.values())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_file = self.index_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            self.logger.error(f"Failed to save phrase cache index: {e}")
+
+    @staticmethod
+    def key(text, voice, rate, volume):
+        return hashlib.sha256(json.dumps([text, voice, rate, volume]).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, key):
+        """Return the audio file for a key, or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+        return self.path(key)
+
+    def put(self, key, text):
+        """Register a freshly rendered file and evict down to the size budget
+
+        Returns False, without adding an entry, if the render left no audio
+        behind (some pyttsx3 drivers fail save_to_file silently).
+        """
+        try:
+            size = os.path.getsize(self.path(key))
+        except OSError:
+            return False
+        if not size:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            return False
+        evicted = []
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous["bytes"]
+            self.entries[key] = {"key": key, "text": text, "bytes": size}
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, entry = self.entries.popitem(last=False)
+                self.total_bytes -= entry["bytes"]
+                evicted.append(entry["key"])
+        for old_key in evicted:
+            try:
+                os.remove(self.path(old_key))
+            except OSError:
+                pass
+        self.save()
+        return True
+
+    def known_texts(self):
+        """Texts of every cached phrase, most recently used last"""
+        with self.lock:
+            return [entry["text"] for entry in self.entries.values()]
+
+class SpeechQueue:
+    """Single text-to-speech worker that owns the pyttsx3 engine
+
+    Utterances are drained from a priority queue (alerts first, chit-chat
+    last) on a dedicated thread, so callers never block on synthesis and
+    never touch the engine concurrently. Every queued utterance gets a
+    Future that can be waited on or cancelled. Fixed phrases can be served
+    from a PhraseCache instead of being synthesized again.
+    """
+    ALERT = 0
+    NORMAL = 1
+    CHATTER = 2
+    WARMUP = 3
+
+    def __init__(self, logger, rate=180, voice='english+m3', phrase_cache=None, engine_factory=None, audio=None,
+                 tracer=None):
+        self.logger = logger
+        self.tracer = tracer
+        self.engine_factory = engine_factory or (lambda: pyttsx3.init())
+        self.audio = audio or PygameAudio()
+        self.rate = rate
+        self.voice = voice
+        self.phrase_cache = phrase_cache
+        self.voice_settings = None
+        self.heap = []
+        self.counter = itertools.count()
+        self.coalesced = {}
+        self.condition = threading.Condition()
+        self.speaking = False
+        self.stop_requested = False
+        self.running = False
+        self.engine = None
+        self.worker = None
+
+    def start(self):
+        """Start the worker thread; the engine is created on that thread"""
+        if self.worker is None:
+            self.running = True
+            self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self.worker.start()
+
+    def say(self, text, priority=NORMAL, coalesce_key=None, cache=False):
+        """Queue text for speech and return a Future for it
+
+        A queued utterance with the same coalesce_key that hasn't started yet
+        is cancelled and replaced, so e.g. repeated volume changes or
+        resource alerts only get spoken once. With cache set, the rendered
+        audio is kept in the phrase cache and replayed next time.
+        """
+        mode = "cached" if cache and self.phrase_cache is not None else "say"
+        return self._enqueue(text, priority, coalesce_key, mode)
+
+    def warm_up(self, phrases):
+        """Render fixed phrases into the cache whenever the worker is idle"""
+        if self.phrase_cache is None:
+            return []
+        return [self._enqueue(text, self.WARMUP, None, "render") for text in dict.fromkeys(phrases)]
+
+    def _has_pending_speech(self):
+        # Cache warm-up renders are silent and don't count as speech
+        return any(item[0] < self.WARMUP and not item[3].done() for item in self.heap)
+
+    def _enqueue(self, text, priority, coalesce_key, mode):
+        future = concurrent.futures.Future()
+        with self.condition:
+            if coalesce_key is not None:
+                previous = self.coalesced.get(coalesce_key)
+                if previous is not None:
+                    previous.cancel()
+                self.coalesced[coalesce_key] = future
+            # Speech is traced against the command that queued it
+            trace = self.tracer.current.get() if self.tracer is not None and mode != "render" else None
+            heapq.heappush(self.heap, (priority, next(self.counter), text, future, coalesce_key, mode,
+                                       trace, time.perf_counter()))
+            self.condition.notify()
+        return future
+
+    def cancel_pending(self, priority=CHATTER):
+        """Cancel every queued utterance at or below the given priority"""
+        cancelled = 0
+        with self.condition:
+            for item in self.heap:
+                if item[0] >= priority and item[3].cancel():
+                    cancelled += 1
+        return cancelled
+
+    def interrupt(self):
+        """Cut off the current utterance and drop queued replies (alerts survive)"""
+        self.cancel_pending(self.NORMAL)
+        with self.condition:
+            if not self.speaking:
+                return
+            self.stop_requested = True
+        try:
+            self.engine.stop()
+        except Exception as e:
+            self.logger.error(f"Failed to stop speech: {e}")
+
+    def is_busy(self):
+        """True while something is being spoken or waiting to be"""
+        with self.condition:
+            return self.speaking or self._has_pending_speech()
+
+    def wait_idle(self, timeout=None):
+        """Block until the queue has been fully spoken"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.speaking or self._has_pending_speech():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self):
+        """Cancel anything still queued and stop the worker"""
+        with self.condition:
+            self.running = False
+            for item in self.heap:
+                item[3].cancel()
+            self.condition.notify_all()
+        if self.worker is not None:
+            self.worker.join(timeout=5)
+            self.worker = None
+
+    def _worker_loop(self):
+        try:
+            # Cached phrases play through the mixer; initialize it here, off the main thread
+            self.audio.init()
+        except Exception as e:
+            self.logger.error(f"Audio mixer initialization failed: {e}")
+        try:
+            self.engine = self.engine_factory()
+            self.engine.setProperty('rate', self.rate)  # Faster speech rate because I'm always in a hurry
+            self.engine.setProperty('voice', self.voice)
+            self.voice_settings = (self.engine.getProperty('voice'), self.engine.getProperty('rate'),
+                                   self.engine.getProperty('volume'))
+        except Exception as e:
+            self.logger.error(f"Speech engine initialization failed: {e}")
+
+        while True:
+            with self.condition:
+                while self.running and not self.heap:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                priority, _, text, future, coalesce_key, mode, trace, queued_at = heapq.heappop(self.heap)
+                if self.coalesced.get(coalesce_key) is future:
+                    del self.coalesced[coalesce_key]
+                if not future.set_running_or_notify_cancel():
+                    self.condition.notify_all()
+                    continue
+                self.speaking = mode != "render"
+                self.stop_requested = False
+
+            if trace is not None:
+                self.tracer.record("speech.queue", time.perf_counter() - queued_at, trace)
+            try:
+                if mode == "say":
+                    self._speak(text, trace)
+                else:
+                    self._speak_cached(text, play=(mode == "cached"), trace=trace)
+                future.set_result(True)
+            except Exception as e:
+                self.logger.error(f"Speech synthesis failed: {e}")
+                future.set_exception(e)
+            finally:
+                with self.condition:
+                    self.speaking = False
+                    self.condition.notify_all()
+
+    def _speak(self, text, trace=None):
+        if self.engine is None:
+            raise RuntimeError("speech engine unavailable")
+        start = time.perf_counter()
+        self.engine.say(text)
+        self.engine.runAndWait()
+        if trace is not None:
+            # pyttsx3 synthesizes and plays in one call
+            self.tracer.record("speech.live", time.perf_counter() - start, trace, chars=len(text))
+
+    def _speak_cached(self, text, play=True, trace=None):
+        if self.engine is None:
+            raise RuntimeError("speech engine unavailable")
+        key = self.phrase_cache.key(text, *self.voice_settings)
+        path = self.phrase_cache.get(key)
+        if path is None:
+            start = time.perf_counter()
+            os.makedirs(self.phrase_cache.directory, exist_ok=True)
+            path = self.phrase_cache.path(key)
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            if not self.phrase_cache.put(key, text):
+                # Nothing usable was rendered: speak live and leave it uncached
+                self.logger.error(f"Rendering a cached phrase produced no audio: {text}")
+                if play:
+                    self._speak(text, trace)
+                return
+            if trace is not None:
+                self.tracer.record("speech.synthesis", time.perf_counter() - start, trace, chars=len(text))
+        if not play:
+            return
+        start = time.perf_counter()
+        try:
+            channel = self.audio.play(path)
+        except Exception as e:
+            # Mixer unavailable or unreadable file: synthesize live instead
+            self.logger.error(f"Cached phrase playback failed: {e}")
+            self._speak(text, trace)
+            return
+        while channel is not None and channel.get_busy():
+            if self.stop_requested:
+                channel.stop()
+                break
+            time.sleep(0.01)
+        if trace is not None:
+            self.tracer.record("speech.playback", time.perf_counter() - start, trace)
+
+class RecognizerBackend:
+    """Speech-to-text engine used by listen()
+
+    Backends that set streaming return a session from start_stream() that
+    is fed raw audio while the user is still talking and yields partial
+    hypotheses; the rest only see the finished phrase in transcribe().
+    """
+    name = "base"
+    streaming = False
+
+    def start_stream(self, sample_rate, sample_width):
+        return None
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+
+class GoogleRecognizerBackend(RecognizerBackend):
+    """Google Web Speech API (network round trip per phrase)"""
+    name = "google"
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class VoskStream:
+    """One streaming Vosk recognition session"""
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+
+    def feed(self, chunk):
+        """Feed 16-bit mono PCM; returns the current hypothesis"""
+        if self.recognizer.AcceptWaveform(chunk):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            return " ".join(self.segments)
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self.segments + [partial]).strip()
+
+    def finish(self):
+        """Return the final transcript for everything fed so far"""
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        text = " ".join(self.segments + [text]).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class VoskRecognizerBackend(RecognizerBackend):
+    """Offline Kaldi-based recognition with partial results (needs `pip install vosk`)"""
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def start_stream(self, sample_rate, sample_width):
+        return VoskStream(self.vosk.KaldiRecognizer(self.model, sample_rate))
+
+    def transcribe(self, audio):
+        stream = self.start_stream(audio.sample_rate, 2)
+        stream.feed(audio.get_raw_data(convert_width=2))
+        return stream.finish()
+
+
+def create_recognizer_backend(name, recognizer, settings, logger):
+    """Build the configured recognizer backend, falling back to Google"""
+    try:
+        if name == "vosk":
+            return VoskRecognizerBackend(settings.get('vosk_model_path', 'models/vosk-model-small-en-us-0.15'))
+    except Exception as e:
+        logger.error(f"Failed to load {name} recognizer, falling back to Google: {e}")
+    return GoogleRecognizerBackend(recognizer)
+
+
+class MicrophoneStream:
+    """Long-lived microphone capture session
+
+    Keeps one input stream open, calibrates for ambient noise once and then
+    keeps adapting the energy threshold in the background. Audio is read
+    continuously into a short ring buffer and cut into phrases as it
+    arrives, so speech that starts right after JARVIS stops talking (or
+    before listen() is called) isn't clipped.
+
+    A phrase only starts after onset_duration of sustained energy, so clicks
+    and bangs in the workshop never reach the recognizer. In idle mode the
+    stream is read idle_read_chunks chunks at a time until a phrase starts,
+    so the loop wakes up and computes energy far less often overnight; the
+    reads are still split into chunks for the pre-roll. With a streaming
+    backend, each phrase is fed to the recognizer as it is captured and
+    partial hypotheses are passed to on_partial.
+
+    on_speech_start fires whenever a phrase starts - and also while muted,
+    if the input is barge_in_ratio times louder than the threshold, so the
+    user can talk over JARVIS to interrupt it.
+    """
+    def __init__(self, recognizer, logger, is_muted=None, pre_roll=1.0, onset_duration=0.1,
+                 max_queued_phrases=4, backend=None, on_partial=None, on_speech_start=None,
+                 barge_in_ratio=3.0, source_factory=None, tracer=None, idle_read_chunks=4):
+        self.recognizer = recognizer
+        self.tracer = tracer or Tracer()
+        self.source_factory = source_factory or sr.Microphone
+        self.logger = logger
+        self.backend = backend
+        self.on_partial = on_partial
+        self.on_speech_start = on_speech_start
+        self.barge_in_ratio = barge_in_ratio
+        self.is_muted = is_muted or (lambda: False)
+        self.pre_roll = pre_roll
+        self.onset_duration = onset_duration
+        self.idle = False
+        self.idle_read_chunks = max(1, int(idle_read_chunks))
+        self.phrases = queue.Queue(maxsize=max_queued_phrases)
+        self.source = None
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        """Open the input stream, calibrate once and start capturing"""
+        if self.running:
+            return
+        with self.tracer.span("mic.open"):
+            self.source = self.source_factory()
+            self.source.__enter__()
+        with self.tracer.span("mic.calibrate"):
+            self.recognizer.adjust_for_ambient_noise(self.source, duration=1)
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop capturing and close the input stream"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.source is not None:
+            self.source.__exit__(None, None, None)
+            self.source = None
+
+    def set_idle(self, idle):
+        """Switch the cheaper idle-mode (larger, less frequent) reads on or off"""
+        if idle != self.idle:
+            self.logger.debug(f"Microphone {'entering' if idle else 'leaving'} idle mode")
+        self.idle = idle
+
+    def next_phrase(self, timeout=None):
+        """Return (audio, ended_at, stream) for the next phrase
+
+        ended_at is the time.monotonic() at which the speaker stopped, and
+        stream is the backend's streaming session (None for non-streaming
+        backends). Raises sr.WaitTimeoutError if nothing was said within
+        timeout.
+        """
+        try:
+            return self.phrases.get(timeout=timeout)
+        except queue.Empty:
+            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+    def _speech_started(self):
+        if self.on_speech_start is None:
+            return
+        try:
+            self.on_speech_start()
+        except Exception as e:
+            self.logger.error(f"Speech start callback failed: {e}")
+
+    def _start_stream(self, frames):
+        if self.backend is None or not self.backend.streaming or self.source.SAMPLE_WIDTH != 2:
+            return None
+        try:
+            stream = self.backend.start_stream(self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+            for frame in frames:
+                stream.feed(frame)
+            return stream
+        except Exception as e:
+            self.logger.error(f"Streaming recognition failed to start: {e}")
+            return None
+
+    def _feed_stream(self, stream, buffer):
+        if stream is None:
+            return stream
+        try:
+            partial = stream.feed(buffer)
+            if partial and self.on_partial is not None:
+                self.on_partial(partial)
+            return stream
+        except Exception as e:
+            self.logger.error(f"Streaming recognition failed: {e}")
+            return None
+
+    def _energy(self, buffer):
+        samples = np.frombuffer(buffer, dtype=np.int16 if self.source.SAMPLE_WIDTH == 2 else np.int32)
+        if not len(samples):
+            return 0.0
+        return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+    def _capture_loop(self):
+        source = self.source
+        recognizer = self.recognizer
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        chunk_bytes = source.CHUNK * source.SAMPLE_WIDTH
+        pre_roll_chunks = max(1, int(math.ceil(self.pre_roll / seconds_per_buffer)))
+        # Room for a whole idle read on top of the pre-roll
+        ring = collections.deque(maxlen=pre_roll_chunks + self.idle_read_chunks - 1)
+        onset_chunks = max(1, int(math.ceil(self.onset_duration / seconds_per_buffer)))
+        loud_chunks = 0
+        frames = None
+        stream = None
+
+        while self.running:
+            # While idle and waiting for a phrase, read several chunks per
+            # wake-up; once a phrase starts go back to single chunks
+            chunks = self.idle_read_chunks if self.idle and frames is None else 1
+            try:
+                buffer = source.stream.read(source.CHUNK * chunks)
+            except Exception as e:
+                self.logger.error(f"Microphone read failed: {e}")
+                time.sleep(0.5)
+                continue
+            read_time = len(buffer) / chunk_bytes * seconds_per_buffer
+
+            energy = self._energy(buffer)
+            if self.is_muted():
+                # Don't capture or calibrate on our own voice, but let a much
+                # louder voice barge in
+                ring.clear()
+                frames = None
+                stream = None
+                if self.barge_in_ratio and energy > recognizer.energy_threshold * self.barge_in_ratio:
+                    loud_chunks += chunks
+                    if loud_chunks - chunks < onset_chunks <= loud_chunks:
+                        self._speech_started()
+                else:
+                    loud_chunks = 0
+                continue
+
+            if frames is None:
+                if chunks == 1:
+                    ring.append(buffer)
+                else:
+                    ring.extend(buffer[i:i + chunk_bytes] for i in range(0, len(buffer), chunk_bytes))
+                if energy > recognizer.energy_threshold:
+                    loud_chunks += chunks
+                    if loud_chunks >= onset_chunks:
+                        # Phrase starts; keep the pre-roll so the onset isn't clipped
+                        frames = list(ring)[-(pre_roll_chunks + chunks - 1):]
+                        self._speech_started()
+                        stream = self._start_stream(frames)
+                        speech_time = loud_chunks * seconds_per_buffer
+                        pause_time = 0.0
+                        phrase_time = len(frames) * seconds_per_buffer
+                        loud_chunks = 0
+                    continue
+                loud_chunks = 0
+                if recognizer.dynamic_energy_threshold:
+                    # Same adaptive threshold speech_recognition uses while waiting
+                    damping = recognizer.dynamic_energy_adjustment_damping ** read_time
+                    target = energy * recognizer.dynamic_energy_ratio
+                    recognizer.energy_threshold = recognizer.energy_threshold * damping + target * (1 - damping)
+                continue
+
+            frames.append(buffer)
+            stream = self._feed_stream(stream, buffer)
+            phrase_time += seconds_per_buffer
+            if energy > recognizer.energy_threshold:
+                speech_time += seconds_per_buffer
+                pause_time = 0.0
+            else:
+                pause_time += seconds_per_buffer
+
+            if pause_time <= recognizer.pause_threshold and phrase_time < 60:
+                continue
+
+            ended_at = time.monotonic() - pause_time
+            if speech_time >= recognizer.phrase_threshold:
+                # Trim the trailing silence down to non_speaking_duration
+                trailing = int(max(0.0, pause_time - recognizer.non_speaking_duration) / seconds_per_buffer)
+                if trailing:
+                    frames = frames[:-trailing]
+                audio = sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                if self.phrases.full():
+                    # Nobody is listening; keep the most recent phrases
+                    try:
+                        self.phrases.get_nowait()
+                    except queue.Empty:
+                        pass
+                self.phrases.put((audio, ended_at, stream))
+            frames = None
+            stream = None
+            ring.clear()
+
+class PersistentLRUCache:
+    """Size-capped LRU cache with a TTL, persisted as a JSON file
+
+    A fingerprint can be stored alongside the entries; if it no longer
+    matches when the file is loaded (e.g. the prompt or model behind the
+    cached values changed), the whole cache is discarded.
+    """
+    def __init__(self, path, logger, max_entries=500, ttl=None, fingerprint=None):
+        self.path = path
+        self.logger = logger
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fingerprint = fingerprint
+        self.lock = threading.RLock()
+        self.entries = collections.OrderedDict()
+        self.load()
+
+    def load(self):
+        """Load entries from disk, dropping expired ones"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("fingerprint") != self.fingerprint:
+            self.logger.info(f"Discarding stale cache {self.path}")
+            return
+        now = time.time()
+        with self.lock:
+            for key, stored_at, value in data.get("entries", []):
+                if self.ttl is None or now - stored_at < self.ttl:
+                    self.entries[key] = (stored_at, value)
+
+    def save(self):
+        """Write the cache to disk atomically"""
+        with self.lock:
+            data = {
+                "fingerprint": self.fingerprint,
+                "entries": [[key, stored_at, value] for key, (stored_at, value) in self.entries.items()]
+            }
+        try:
+            tmp_file = self.path + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.path)
+        except Exception as e:
+            self.logger.error(f"Failed to save cache {self.path}: {e}")
+
+    def get_entry(self, key):
+        """Return (stored_at, value) for a live entry, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl is not None and time.time() - entry[0] >= self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[1]
+
+    def items(self):
+        """Snapshot of (key, (stored_at, value)) pairs, taken under the lock without touching LRU order"""
+        with self.lock:
+            return list(self.entries.items())
+
+    def put(self, key, value, save=True):
+        """Store a value, evicting the least recently used entries over the cap"""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time(), value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if save:
+            self.save()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        self.save()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class StaleWhileRevalidateCache:
+    """Cache for fetched data that answers from memory and refreshes in the background
+
+    Each source registers a fetch function and a ttl. A fresh value is
+    returned as is; a stale one (older than ttl but within max_stale more)
+    is returned at once while a background refresh replaces it. Only a
+    missing or hopelessly stale value makes the caller wait, and if that
+    fetch fails whatever was cached is served anyway. Concurrent refreshes
+    of one key share a single fetch.
+
+    Keys passed to prefetch() are refreshed ahead of time, at refresh_ahead
+    of their ttl, so they are normally never stale when asked for.
+    Entries live in a PersistentLRUCache, bounded by max_entries and kept
+    across restarts.
+    """
+    def __init__(self, path, logger, max_entries=64, refresh_ahead=0.8):
+        self.logger = logger
+        self.store = PersistentLRUCache(path, logger, max_entries=max_entries)
+        self.refresh_ahead = refresh_ahead
+        self.sources = {}
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.prefetched = {}
+        self.counters = collections.Counter()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        self.stopped = threading.Event()
+        self.wakeup = threading.Event()
+        self.scheduler = None
+
+    def register(self, name, fetch, ttl, max_stale=None):
+        """Add a source; fetch(*args) returns a JSON-serializable value or raises"""
+        self.sources[name] = (fetch, ttl, max_stale)
+
+    def get(self, name, *args):
+        """The cached value for fetch(*args), fetching only if there is nothing usable"""
+        fetch, ttl, max_stale = self.sources[name]
+        entry = self.store.get_entry(self._key(name, args))
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < ttl:
+                self.counters["fresh"] += 1
+                return entry[1]
+            if max_stale is None or age < ttl + max_stale:
+                self.counters["stale"] += 1
+                self.refresh(name, *args)
+                return entry[1]
+        self.counters["miss"] += 1
+        try:
+            return self.refresh(name, *args).result()
+        except Exception:
+            if entry is not None:
+                return entry[1]
+            raise
+
+    def refresh(self, name, *args):
+        """Start a background fetch of a key, or join the one in flight; returns its Future"""
+        key = self._key(name, args)
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is None:
+                future = self.inflight[key] = self.executor.submit(self._fetch, name, args, key)
+        return future
+
+    def prefetch(self, name, *args):
+        """Keep a key refreshed ahead of its expiry from now on"""
+        with self.lock:
+            self.prefetched[self._key(name, args)] = (name, args)
+            if self.scheduler is None:
+                self.scheduler = threading.Thread(target=self._prefetch_loop, name="cache-prefetch", daemon=True)
+                self.scheduler.start()
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def describe_stats(self):
+        return ", ".join(f"{name}: {count}" for name, count in sorted(self.counters.items())) or "unused"
+
+    def _key(self, name, args):
+        return json.dumps([name, *args])
+
+    def _fetch(self, name, args, key):
+        try:
+            value = self.sources[name][0](*args)
+            self.store.put(key, value)
+            self.counters["fetched"] += 1
+            return value
+        except Exception as e:
+            self.counters["errors"] += 1
+            self.logger.error(f"Refreshing {key} failed: {e}", exc_info=False)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def _prefetch_loop(self):
+        while not self.stopped.is_set():
+            now = time.time()
+            next_due = now + 60
+            with self.lock:
+                prefetched = list(self.prefetched.items())
+            # Entries are inserted by other threads; read a copy taken under the store lock
+            entries = dict(self.store.items())
+            for key, (name, args) in prefetched:
+                ttl = self.sources[name][1]
+                entry = entries.get(key)
+                due = entry[0] + ttl * self.refresh_ahead if entry is not None else now
+                if due <= now:
+                    try:
+                        self.refresh(name, *args)
+                    except RuntimeError:
+                        return  # executor shut down
+                    # Don't spin on a failing source; try again in a while
+                    due = now + max(ttl * (1 - self.refresh_ahead), 5)
+                next_due = min(next_due, due)
+            self.wakeup.wait(max(next_due - time.time(), 1))
+            self.wakeup.clear()
+
+
+class ResearchCache:
+    """Persistent cache of research answers that keeps working offline
+
+    Quick lookups are stored under the Wikipedia page title a query
+    resolved to, plus an alias from the normalized query to that title,
+    so "arc reactor", "the arc reactors" and "Arc Reactor" share one
+    entry and a repeat costs no network at all. Queries are normalized by
+    lowercasing, dropping filler words and stripping plurals. Only exact
+    hits on the normalized query are served while online: "mark 43 armor"
+    is close to "mark 42 armor" but is a different page.
+
+    Entries older than their ttl are refetched, but they are only evicted
+    by the LRU cap. When the network is down an old answer still beats
+    none, and so does the answer to the closest known query (difflib,
+    fuzzy_cutoff).
+    """
+    FILLER_WORDS = {"a", "an", "the", "about", "on", "of", "for", "me", "please", "some", "info", "information"}
+
+    def __init__(self, path, logger, max_entries=1000, ttl=30 * 24 * 3600, deep_ttl=7 * 24 * 3600,
+                 fuzzy_cutoff=0.75):
+        self.store = PersistentLRUCache(path, logger, max_entries=max_entries)
+        self.ttl = ttl
+        self.deep_ttl = deep_ttl
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.counters = collections.Counter()
+
+    def normalize(self, query):
+        words = re.findall(r"[a-z0-9]+", query.lower())
+        return " ".join(singular(word) for word in words if word not in self.FILLER_WORDS)
+
+    def summary(self, query, offline=False):
+        """Return (title, summary, fresh) for a query, or None
+
+        offline also accepts the closest known query and is meant for
+        when the lookup itself has failed.
+        """
+        key = self.normalize(query)
+        title = self.store.get(f"query:{key}")
+        if title is None and offline:
+            title = self._fuzzy_title(key, self.fuzzy_cutoff)
+        entry = self.page(title) if title else None
+        if entry is None:
+            self.counters["miss"] += 1
+            return None
+        self.counters["fresh" if entry[1] else "stale"] += 1
+        return title, entry[0], entry[1]
+
+    def page(self, title):
+        """Return (summary, fresh) for a page title, or None"""
+        entry = self.store.get_entry(f"page:{title.lower()}")
+        if entry is None:
+            return None
+        return entry[1]["summary"], time.time() - entry[0] < self.ttl
+
+    def put_summary(self, query, title, summary, save=True):
+        """Cache a page summary and the query that resolved to it"""
+        self.store.put(f"page:{title.lower()}", {"title": title, "summary": summary}, save=False)
+        self.alias(query, title, save=save)
+
+    def alias(self, query, title, save=True):
+        self.store.put(f"query:{self.normalize(query)}", title, save=save)
+
+    def answer(self, model, query, offline=False):
+        """Return (answer, fresh) for a deep research query, or None"""
+        key = self.normalize(query)
+        entry = self.store.get_entry(f"deep:{model}:{key}")
+        if entry is None and offline:
+            prefix = f"deep:{model}:"
+            match = self._closest(key, [k[len(prefix):] for k in self._keys(prefix)], self.fuzzy_cutoff)
+            entry = self.store.get_entry(prefix + match) if match else None
+        if entry is None:
+            self.counters["miss"] += 1
+            return None
+        fresh = time.time() - entry[0] < self.deep_ttl
+        self.counters["fresh" if fresh else "stale"] += 1
+        return entry[1], fresh
+
+    def put_answer(self, model, query, answer, save=True):
+        self.store.put(f"deep:{model}:{self.normalize(query)}", answer, save=save)
+
+    def save(self):
+        self.store.save()
+
+    def describe_stats(self):
+        counts = ", ".join(f"{name}: {count}" for name, count in sorted(self.counters.items())) or "unused"
+        return f"{len(self.store)} entries, {counts}"
+
+    def _keys(self, prefix):
+        with self.store.lock:
+            return [key for key in self.store.entries if key.startswith(prefix)]
+
+    def _fuzzy_title(self, key, cutoff):
+        # Known queries, and the titles themselves, normalized like a query
+        entries = self.store.items()
+        candidates = {k[len("query:"):]: entry[1] for k, entry in entries if k.startswith("query:")}
+        for k, entry in entries:
+            if k.startswith("page:"):
+                candidates.setdefault(self.normalize(entry[1]["title"]), entry[1]["title"])
+        match = self._closest(key, list(candidates), cutoff)
+        return candidates[match] if match else None
+
+    def _closest(self, key, candidates, cutoff):
+        if not key:
+            return None
+        matches = difflib.get_close_matches(key, candidates, n=1, cutoff=cutoff)
+        return matches[0] if matches else None
+
+
+class IntentCache:
+    """Caches parsed LLM intents keyed on a normalized command template
+
+    Commands are lowercased, stripped of polite phrases and have their
+    numbers replaced by placeholders, so "set volume to 40" and "set
+    volume to 60" share one entry; the numbers are substituted back into
+    the cached params on a hit.
+    """
+    POLITE_PHRASES = re.compile(
+        r"\b(?:hey jarvis|jarvis|please|could you|can you|would you|will you|for me|kindly|thanks|thank you)\b"
+    )
+    NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+    def __init__(self, path, logger, max_entries=500, ttl=7 * 24 * 3600, fingerprint=None):
+        self.cache = PersistentLRUCache(path, logger, max_entries=max_entries, ttl=ttl, fingerprint=fingerprint)
+
+    def normalize(self, command):
+        """Return (template, numbers) for a command"""
+        text = self.POLITE_PHRASES.sub(" ", command.lower())
+        text = re.sub(r"[^\w\s.%']", " ", text)
+        numbers = self.NUMBER.findall(text)
+        template = self.NUMBER.sub("#", text)
+        return " ".join(template.replace(" .", " ").split()).strip(" ."), numbers
+
+    def get(self, command):
+        """Return the cached intent for a command, or None"""
+        template, numbers = self.normalize(command)
+        cached = self.cache.get(template)
+        if cached is None:
+            return None
+        return {"intent": cached["intent"], "params": self._fill(cached["params"], numbers)}
+
+    def put(self, command, intent_data):
+        """Cache an intent if every number in it maps back to the command"""
+        if not isinstance(intent_data, dict) or "intent" not in intent_data:
+            return False
+        template, numbers = self.normalize(command)
+        params = intent_data.get("params") or {}
+        templated = {}
+        for name, value in params.items():
+            text = str(value)
+            if numbers and text in numbers:
+                templated[name] = {"$arg": numbers.index(text), "$type": type(value).__name__}
+            elif self.NUMBER.search(text):
+                # A number we can't tie to the command; the entry wouldn't generalize
+                return False
+            else:
+                templated[name] = value
+        self.cache.put(template, {"intent": intent_data["intent"], "params": templated})
+        return True
+
+    def _fill(self, params, numbers):
+        filled = {}
+        for name, value in params.items():
+            if isinstance(value, dict) and "$arg" in value:
+                number = numbers[value["$arg"]]
+                filled[name] = {"int": lambda n: int(float(n)), "float": float}.get(value["$type"], str)(number)
+            else:
+                filled[name] = value
+        return filled
+
+class IntentClassifier:
+    """Local fast path in front of the LLM command interpreter
+
+    Tier 1 is a list of compiled regular expressions for commands with an
+    unambiguous shape ("volume up", "timer 10 minutes for tea"). Tier 2 is a
+    TF-IDF model over word unigrams and bigrams of example utterances;
+    a nearest-example match is only accepted when it is both confident and
+    clearly ahead of every other intent. Anything else returns None and is
+    escalated to the LLM by the caller, which reports its timing back
+    through record().
+    """
+    PATTERNS = [
+        (r"^(?:what(?:'s| is) the )?time(?: is it)?(?: now)?$|^what time is it(?: now)?$", "time", {}),
+        (r"^(?:what(?:'s| is) )?(?:the |today's )?date(?: today)?$|^what day is (?:it|today)$", "date", {}),
+        (r"^(?:set |change )?(?:the )?volume (?:to |at )?(?P<level>\d{1,3})(?: percent|%)?$", "volume", {}),
+        (r"^(?:turn )?(?:the )?volume (?P<action>up|down)$|^turn (?P<action2>up|down) the volume$", "volume", {}),
+        (r"^(?P<action>mute|unmute)(?: (?:the )?(?:volume|sound|audio))?$", "volume", {}),
+        (r"^(?P<action>play|pause|resume|next|previous|skip)(?: (?:the )?(?:track|song|music))?$", "media", {}),
+        (r"^(?:enter|start|activate|enable) (?:the )?workshop(?: mode)?$", "workshop", {"action": "activate"}),
+        (r"^(?:exit|leave|stop|deactivate|disable) (?:the )?workshop(?: mode)?$", "workshop", {"action": "deactivate"}),
+        (r"^(?:toggle )?workshop mode$", "workshop", {"action": "toggle"}),
+        (r"^(?:system (?:status|stats)|status report)$", "system", {}),
+        (r"^(?:set )?(?:a )?timer (?:for )?(?P<duration>\d+) (?:minutes?|mins?)(?: for (?P<label>.+))?$", "timer", {}),
+        (r"^(?:start )?(?:a )?pomodoro(?: timer| session)?$", "pomodoro", {}),
+        (r"^(?:stop|cancel|end) (?:the )?pomodoro(?: timer| session)?$", "pomodoro", {"action": "stop"}),
+        (r"^(?:enable |start |toggle )?focus mode$", "focus", {}),
+        (r"^(?:help|what can you do)$", "help", {}),
+        (r"^(?:motivate me|give me some motivation)$", "motivation", {}),
+        (r"^(?:(?:tell me|read|give me) )?(?:the )?(?:news|headlines|top headlines)(?: today)?$", "news", {}),
+        (r"^what(?:'s| is) trending(?: on social media)?$", "trending", {"location": "worldwide"}),
+        (r"^(?:play (?P<query>.+?) on youtube|youtube (?P<query2>.+))$", "youtube", {"action": "play"}),
+        (r"^(?:add|take) (?:a )?note:? (?P<note>.+)$", "note", {"action": "add"}),
+        (r"^(?:read|list|show)(?: me)? (?:my )?notes$", "note", {"action": "read"}),
+        (r"^(?:list|show)(?: me)? (?:my |all )?projects$", "project", {"action": "list"}),
+        (r"^(?:what did (?:i|we) (?:say|talk about|discuss|note) about|remind me what (?:i|we) said about|recall) "
+         r"(?P<query>.+?)(?: (?P<period>today|yesterday|(?:last|this) (?:week|month)|in the last \d+ days))?$", "recall", {}),
+        (r"^(?:what(?:'s| is) the )?weather(?: like)?(?: in (?P<city>[a-z .'-]+))?$", "weather", {}),
+        (r"^(?:run |show )?(?:latency )?diagnostics(?: (?:for|over) (?:the )?last (?P<commands>\d+)(?: commands)?)?$"
+         r"|^what(?:'s| is) (?:been )?slow(?:ing you down)?$", "diagnostics", {}),
+        (r"^remind me (?:to |about )?(?P<message>.+?) in (?P<minutes>\d+) (?:minutes?|mins?)$"
+         r"|^remind me in (?P<minutes2>\d+) (?:minutes?|mins?) (?:to |about )?(?P<message2>.+)$", "reminder", {"action": "set"}),
+        (r"^remind me (?:to |about )?(?P<message>.+?) at (?P<at>\d{1,2}(?::\d{2})? ?(?:[ap]\.? ?m\.?)?)$", "reminder", {"action": "set"}),
+        (r"^(?:list|show|what are)(?: me)? (?:my |the )?(?:reminders|timers)$", "reminder", {"action": "list"}),
+        (r"^(?:cancel|delete|remove) (?P<message>all) (?:(?:my|the) )?(?:reminders|timers)$"
+         r"|^(?:cancel|delete|remove) (?:the |my )?(?:last )?(?:reminder|timer)(?: (?:to |about |for )?(?P<message2>.+))?$",
+         "reminder", {"action": "cancel"}),
+        (r"^snooze(?: (?:it|that|the reminder|the timer))?(?: for)?(?: (?:another )?(?P<minutes>\d+) (?:minutes?|mins?))?$",
+         "reminder", {"action": "snooze"}),
+        (r"^(?:prefetch|cache|prepare) research (?:on |for |about )?(?P<query>.+)$", "research", {"action": "prefetch"}),
+        (r"^(?:deep research|research in depth)(?: on| about| into)? (?P<query>.+)$", "research", {"action": "deep"}),
+        (r"^(?:quick research|research|look up)(?: on| about| into)? (?P<query>.+)$", "research", {"action": "quick"}),
+    ]
+    MEDIA_ALIASES = {"resume": "play", "skip": "next"}
+
+    # Utterances for the n-gram tier; params are fixed per example, so only
+    # intents whose parameters can be read off the wording belong here
+    EXAMPLES = [
+        ("what time is it", {"intent": "time", "params": {}}),
+        ("tell me the time", {"intent": "time", "params": {}}),
+        ("what's the current time", {"intent": "time", "params": {}}),
+        ("what is today's date", {"intent": "date", "params": {}}),
+        ("tell me the date", {"intent": "date", "params": {}}),
+        ("which day is it today", {"intent": "date", "params": {}}),
+        ("turn the volume up", {"intent": "volume", "params": {"action": "up"}}),
+        ("make it louder", {"intent": "volume", "params": {"action": "up"}}),
+        ("crank up the volume", {"intent": "volume", "params": {"action": "up"}}),
+        ("turn the volume down", {"intent": "volume", "params": {"action": "down"}}),
+        ("make it quieter", {"intent": "volume", "params": {"action": "down"}}),
+        ("lower the volume", {"intent": "volume", "params": {"action": "down"}}),
+        ("mute the sound", {"intent": "volume", "params": {"action": "mute"}}),
+        ("silence the speakers", {"intent": "volume", "params": {"action": "mute"}}),
+        ("unmute the sound", {"intent": "volume", "params": {"action": "unmute"}}),
+        ("pause the music", {"intent": "media", "params": {"action": "pause"}}),
+        ("stop the music", {"intent": "media", "params": {"action": "pause"}}),
+        ("resume the music", {"intent": "media", "params": {"action": "play"}}),
+        ("skip this song", {"intent": "media", "params": {"action": "next"}}),
+        ("next track please", {"intent": "media", "params": {"action": "next"}}),
+        ("go back to the previous song", {"intent": "media", "params": {"action": "previous"}}),
+        ("let's get to work in the workshop", {"intent": "workshop", "params": {"action": "activate"}}),
+        ("activate workshop systems", {"intent": "workshop", "params": {"action": "activate"}}),
+        ("shut down the workshop", {"intent": "workshop", "params": {"action": "deactivate"}}),
+        ("how is the system doing", {"intent": "system", "params": {}}),
+        ("check cpu and memory usage", {"intent": "system", "params": {}}),
+        ("give me a system status report", {"intent": "system", "params": {}}),
+        ("start a pomodoro session", {"intent": "pomodoro", "params": {}}),
+        ("let's do pomodoro", {"intent": "pomodoro", "params": {}}),
+        ("help me focus", {"intent": "focus", "params": {}}),
+        ("turn on focus mode", {"intent": "focus", "params": {}}),
+        ("what commands do you know", {"intent": "help", "params": {}}),
+        ("show me the help", {"intent": "help", "params": {}}),
+        ("i need some motivation", {"intent": "motivation", "params": {}}),
+        ("inspire me", {"intent": "motivation", "params": {}}),
+        ("what's in the news", {"intent": "news", "params": {}}),
+        ("read me the latest headlines", {"intent": "news", "params": {}}),
+        ("what's trending right now", {"intent": "trending", "params": {"location": "worldwide"}}),
+        ("show me the trending topics", {"intent": "trending", "params": {"location": "worldwide"}}),
+        ("read my notes", {"intent": "note", "params": {"action": "read"}}),
+        ("list my projects", {"intent": "project", "params": {"action": "list"}}),
+        ("back up my files", {"intent": "backup", "params": {}}),
+        ("run a backup", {"intent": "backup", "params": {}}),
+        ("take a screenshot", {"intent": "pc", "params": {"action": "screenshot"}}),
+        ("lock the computer", {"intent": "pc", "params": {"action": "lock"}}),
+        ("minimize all windows", {"intent": "window", "params": {"action": "minimize_all"}}),
+        ("arrange my windows", {"intent": "window", "params": {"action": "arrange"}}),
+    ]
+    TIERS = ("pattern", "ngram", "cache", "llm", "fallback")
+
+    def __init__(self, min_score=0.6, min_margin=0.15):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.patterns = [(re.compile(pattern), intent, params) for pattern, intent, params in self.PATTERNS]
+        self.lock = threading.Lock()
+        self.counters = {tier: {"hits": 0, "seconds": 0.0} for tier in self.TIERS}
+        self.misses = 0
+        self._train(self.EXAMPLES)
+
+    def classify(self, command, record=True):
+        """Resolve a command locally, or return None to escalate it"""
+        start = time.perf_counter()
+        text = self._clean(command)
+        result = self._match_pattern(text)
+        tier = "pattern"
+        if result is None:
+            result = self._match_ngram(text)
+            tier = "ngram"
+        if record:
+            if result is None:
+                with self.lock:
+                    self.misses += 1
+            else:
+                self.record(tier, time.perf_counter() - start)
+        return result
+
+    def record(self, tier, seconds):
+        """Count a resolved command against a tier"""
+        with self.lock:
+            self.counters[tier]["hits"] += 1
+            self.counters[tier]["seconds"] += seconds
+
+    def stats(self):
+        """Per-tier hit counts, hit rates and mean latency in microseconds"""
+        with self.lock:
+            total = sum(counter["hits"] for counter in self.counters.values()) or 1
+            return {
+                tier: {
+                    "hits": counter["hits"],
+                    "hit_rate": counter["hits"] / total,
+                    "mean_us": counter["seconds"] / counter["hits"] * 1e6 if counter["hits"] else 0.0
+                }
+                for tier, counter in self.counters.items()
+            }
+
+    def describe_stats(self):
+        """One-line summary of the tier counters for logs"""
+        return ", ".join(
+            f"{tier}: {stats['hits']} hits ({stats['hit_rate']:.0%}, {stats['mean_us']:.0f}us)"
+            for tier, stats in self.stats().items()
+        )
+
+    def _clean(self, command):
+        text = command.lower().strip()
+        text = re.sub(r"^(?:hey |ok |okay )?jarvis[, ]+", "", text)
+        text = re.sub(r"^(?:please |can you |could you |would you )+|(?: please| for me| now)+$", "", text)
+        return re.sub(r"[?!.,]+$", "", text).strip()
+
+    def _match_pattern(self, text):
+        for pattern, intent, fixed in self.patterns:
+            match = pattern.match(text)
+            if not match:
+                continue
+            params = dict(fixed)
+            for name, value in match.groupdict().items():
+                if value is None:
+                    continue
+                # Alternatives share a parameter via a numeric suffix (action2)
+                name = name.rstrip("0123456789")
+                params[name] = int(value) if name in ("level", "duration", "commands", "minutes") else value.strip()
+            if intent == "media":
+                params["action"] = self.MEDIA_ALIASES.get(params["action"], params["action"])
+            return {"intent": intent, "params": params}
+        return None
+
+    def _tokens(self, text):
+        words = re.findall(r"[a-z0-9']+", text)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _vectorize(self, text):
+        counts = collections.Counter(token for token in self._tokens(text) if token in self.idf)
+        vector = {token: count * self.idf[token] for token, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {token: weight / norm for token, weight in vector.items()} if norm else {}
+
+    def _train(self, examples):
+        document_frequency = collections.Counter()
+        for text, _ in examples:
+            document_frequency.update(set(self._tokens(text)))
+        count = len(examples)
+        self.idf = {token: math.log((1 + count) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        # Inverted index: token -> [(example, weight)], so scoring only
+        # touches examples that share a token with the command
+        self.examples = []
+        self.postings = collections.defaultdict(list)
+        for text, result in examples:
+            key = (result["intent"], json.dumps(result["params"], sort_keys=True))
+            for token, weight in self._vectorize(text).items():
+                self.postings[token].append((len(self.examples), weight))
+            self.examples.append((key, result))
+
+    def _match_ngram(self, text):
+        vector = self._vectorize(text)
+        if not vector:
+            return None
+        scores = collections.defaultdict(float)
+        for token, weight in vector.items():
+            for index, example_weight in self.postings[token]:
+                scores[index] += weight * example_weight
+
+        # Best example per distinct result, then compare the top two results
+        best_by_result = {}
+        for index, score in scores.items():
+            key, result = self.examples[index]
+            if score > best_by_result.get(key, (0.0, None))[0]:
+                best_by_result[key] = (score, result)
+        ranked = sorted(best_by_result.values(), key=lambda item: item[0], reverse=True)
+        if not ranked or ranked[0][0] < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < self.min_margin:
+            return None
+        best = ranked[0][1]
+        return {"intent": best["intent"], "params": dict(best["params"])}
+
+class IntentSpec:
+    """One registered command intent"""
+    def __init__(self, name, handler, params=None, section=None, description="", example=None,
+                 help_section=None, help=None, run_async=False, workshop_only=False):
+        self.name = name
+        self.handler = handler
+        self.params = params or {}
+        self.section = section
+        self.description = description
+        self.example = example if example is not None else {
+            param: default for param, (_, default) in self.params.items() if default is not IntentRegistry.COMMAND
+        }
+        self.help_section = help_section
+        self.help = help
+        self.run_async = run_async
+        self.workshop_only = workshop_only
+
+
+class IntentRegistry:
+    """Table-driven dispatcher for command intents
+
+    Handlers register with a parameter schema of {name: (type, default)}
+    and are called with the coerced values positionally, in schema order;
+    dispatch is a dict lookup followed by coercing the LLM's params to
+    that schema. The same table generates the LLM interpreter prompt and
+    the spoken help text, so adding an intent is one register() call.
+    """
+    COMMAND = object()  # Default that stands for the raw command text
+
+    PROMPT_HEADER = "You are JARVIS's command interpreter. You MUST respond in valid JSON format.\n\n" \
+                    "Available Intents and Parameters:\n"
+    PROMPT_FOOTER = "Remove any polite phrases or extra words from parameters.\n" \
+                    "Only respond with the JSON object, nothing else."
 
-class JarvisLogger:
-    """Advanced logging system for JARVIS"""
     def __init__(self):
-        self.logger = logging.getLogger('JARVIS')
-        self.logger.setLevel(logging.DEBUG)
-        
-        # File handler for detailed logs
-        fh = logging.FileHandler('jarvis_debug.log')
-        fh.setLevel(logging.DEBUG)
-        
-        # Console handler for important messages
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.INFO)
-        
-        # Formatting
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        self.intents = {}
+        self.aliases = {}
+        self.phrases = {}
+        self.fallback = None
+        self.tracer = None  # Times every handler as a "handler" span when set
+
+    def register(self, name, handler, params=None, aliases=(), phrases=(), fallback=False, **options):
+        """Register a handler under an intent name
+
+        phrases are exact commands that skip intent recognition entirely
+        (the workshop shortcuts); fallback marks the intent that receives
+        anything the registry doesn't know.
+        """
+        spec = IntentSpec(name, handler, params=params, **options)
+        self.intents[name] = spec
+        for alias in aliases:
+            self.aliases[alias] = name
+        for phrase in phrases:
+            self.phrases[phrase] = name
+        if fallback:
+            self.fallback = spec
+        return spec
+
+    def resolve(self, name):
+        """Return the spec for an intent name or alias, or None"""
+        return self.intents.get(name) or self.intents.get(self.aliases.get(name))
+
+    def match_phrase(self, command, workshop_mode=False):
+        """Return the intent name for an exact shortcut phrase, or None"""
+        name = self.phrases.get(command)
+        if name is None or (self.intents[name].workshop_only and not workshop_mode):
+            return None
+        return name
+
+    def coerce(self, spec, params, command):
+        """Fill defaults and coerce LLM params to the handler's schema"""
+        params = params if isinstance(params, dict) else {}
+        kwargs = {}
+        for name, (kind, default) in spec.params.items():
+            value = params.get(name)
+            if value is None or value == "":
+                kwargs[name] = command if default is self.COMMAND else default
+                continue
+            try:
+                if kind is int and not isinstance(value, int):
+                    value = int(float(value))
+                elif kind is str:
+                    value = str(value).strip()
+                kwargs[name] = kind(value)
+            except (TypeError, ValueError, OverflowError):
+                kwargs[name] = command if default is self.COMMAND else default
+        return kwargs
+
+    def dispatch(self, intent_data, command, workshop_mode=False):
+        """Run the handler for an intent dict; returns the intent name used
+
+        Workshop-only intents go to the fallback outside workshop mode,
+        whether they came from a shortcut phrase, the LLM or the cache.
+        """
+        spec = self.resolve(intent_data.get('intent'))
+        if spec is None or (spec.workshop_only and not workshop_mode):
+            spec = self.fallback
+        args = list(self.coerce(spec, intent_data.get('params'), command).values())
+        handler = spec.handler
+        if self.tracer is not None:
+            handler = self.tracer.wrap("handler", handler, intent=spec.name)
+        if spec.run_async:
+            # The handler thread carries on the command's trace
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=[handler, *args], daemon=True).start()
+        else:
+            handler(*args)
+        return spec.name
+
+    def build_prompt(self):
+        """Generate the LLM interpreter prompt from the registered intents"""
+        sections = collections.OrderedDict()
+        for spec in self.intents.values():
+            if spec.section is not None and spec is not self.fallback:
+                sections.setdefault(spec.section, []).append(spec)
+
+        lines = [self.PROMPT_HEADER]
+        for number, (section, specs) in enumerate(sections.items(), 1):
+            lines.append(f"{number}. {section}:")
+            for spec in specs:
+                lines.append(f"- {spec.description}")
+                lines.append(self._prompt_example(spec))
+            lines.append("")
+        if self.fallback is not None:
+            lines.append("For general questions or AI responses:")
+            lines.append(self._prompt_example(self.fallback))
+            lines.append("")
+        lines.append(self.PROMPT_FOOTER)
+        return "\n".join(lines)
+
+    def help_text(self, extra=None, footer=""):
+        """Generate the spoken help text from the registered intents
+
+        extra maps help sections to lines for commands handled outside the
+        registry.
+        """
+        sections = collections.OrderedDict()
+        for spec in self.intents.values():
+            if spec.help:
+                sections.setdefault(spec.help_section, []).append(spec.help)
+        for section, entries in (extra or {}).items():
+            sections.setdefault(section, []).extend(entries)
+        lines = ["Available commands:", ""]
+        for section, entries in sections.items():
+            lines.append(f"{section}:")
+            lines.extend(f"- {entry}" for entry in entries)
+            lines.append("")
+        if footer:
+            lines.append(footer)
+        return "\n".join(lines)
+
+    def _prompt_example(self, spec):
+        example = {"intent": spec.name, "params": spec.example}
+        return json.dumps(example, indent=4)
+
+class ModelManager:
+    """Owns the Ollama client and keeps the configured models resident
+
+    Callers address models by role ("chat", "intent", "code") instead of
+    hard-coding names. Every role shares one client, whose httpx pool keeps
+    the connection to the server open between calls. start() loads each
+    model in the background so the first command does not pay for it, and
+    every call asks the server to keep the model loaded for keep_alive.
+    """
+    DEFAULT_MODELS = {"chat": "llama3.2:3b", "intent": "tinyllama", "code": "llama3.2:3b",
+                      "embed": "nomic-embed-text"}
+    # Roles served by embedding models, which cannot generate text
+    EMBEDDING_ROLES = ("embed",)
+
+    def __init__(self, logger, settings=None, client_factory=None):
+        settings = settings or {}
+        self.logger = logger
+        self.models = {**self.DEFAULT_MODELS, **settings.get('models', {})}
+        self.keep_alive = settings.get('keep_alive', '30m')
+        self.refresh_interval = settings.get('refresh_interval', 240)
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.counters = {
+            name: {"calls": 0, "errors": 0, "seconds": 0.0, "streams": 0, "first_chunk": 0.0,
+                   "load_seconds": None, "last_used": 0.0}
+            for name in set(self.models.values())
+        }
+        self.embedding_models = {self.models[role] for role in self.EMBEDDING_ROLES if role in self.models}
+        self.settings = settings
+        self.client_factory = client_factory or self._create_client
+        self.client = None
+        self.supports_keep_alive = False
+
+    @staticmethod
+    def _create_client(settings):
+        return ollama.Client(
+            host=settings.get('host'),
+            timeout=settings.get('timeout', 120),
+            limits=httpx.Limits(max_keepalive_connections=4,
+                                keepalive_expiry=settings.get('connection_keepalive', 300))
         )
-        fh.setFormatter(formatter)
-        ch.setFormatter(formatter)
-        
-        self.logger.addHandler(fh)
-        self.logger.addHandler(ch)
 
-    def debug(self, msg):
-        self.logger.debug(msg)
+    def connect(self):
+        """Create the shared client on first use; importing ollama is not free"""
+        with self.lock:
+            if self.client is None:
+                client = self.client_factory(self.settings)
+                # keep_alive is a request parameter from ollama 0.1.6 on; with older
+                # clients idle models are pinged before the server's 5 minute default
+                self.supports_keep_alive = 'keep_alive' in inspect.signature(client.chat).parameters
+                self.client = client
+        return self.client
 
-    def info(self, msg):
-        self.logger.info(msg)
+    def model(self, role):
+        """Model name configured for a role"""
+        return self.models[role]
+
+    def start(self):
+        """Warm every model on a background thread"""
+        threading.Thread(target=self._keep_warm, name="ollama-warmup", daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def chat(self, role, messages, stream=False, **kwargs):
+        """ollama.chat with the role's model, keep-alive and latency accounting"""
+        name = self.models[role]
+        client = self.connect()
+        if self.supports_keep_alive:
+            kwargs['keep_alive'] = self.keep_alive
+        start = time.perf_counter()
+        try:
+            response = client.chat(model=name, messages=messages, stream=stream, **kwargs)
+        except Exception:
+            self._record(name, error=True)
+            raise
+        if stream:
+            return self._timed_stream(name, response, start)
+        self._record(name, time.perf_counter() - start, response)
+        return response
+
+    def embeddings(self, role, prompt):
+        """ollama.embeddings with the role's model and latency accounting"""
+        name = self.models[role]
+        client = self.connect()
+        kwargs = {'keep_alive': self.keep_alive} if self.supports_keep_alive else {}
+        start = time.perf_counter()
+        try:
+            response = client.embeddings(model=name, prompt=prompt, **kwargs)
+        except Exception:
+            self._record(name, error=True)
+            raise
+        self._record(name, time.perf_counter() - start)
+        return response
+
+    def warm(self, name):
+        """Load a model with an empty prompt; returns False if the server is unreachable"""
+        start = time.perf_counter()
+        try:
+            client = self.connect()
+            kwargs = {'keep_alive': self.keep_alive} if self.supports_keep_alive else {}
+            if name in self.embedding_models:
+                response = client.embeddings(model=name, prompt='', **kwargs)
+            else:
+                response = client.generate(model=name, prompt='', **kwargs)
+        except Exception as e:
+            self.logger.error(f"Warming {name} failed: {e}", exc_info=False)
+            return False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            counter = self.counters[name]
+            counter["load_seconds"] = response.get('load_duration', 0) / 1e9 or elapsed
+            counter["last_used"] = time.monotonic()
+        self.logger.info(f"Model {name} warm after {elapsed:.1f}s")
+        return True
+
+    def _keep_warm(self):
+        # Warm every model even if one is missing, e.g. an embedding model never pulled
+        if not [self.warm(name) for name in self.counters].count(True):
+            return
+        if self.supports_keep_alive:
+            return
+        while not self.stopped.wait(self.refresh_interval / 4):
+            now = time.monotonic()
+            for name, counter in self.counters.items():
+                if now - counter["last_used"] >= self.refresh_interval:
+                    self.warm(name)
+
+    def _timed_stream(self, name, chunks, start):
+        first_chunk = None
+        final = None
+        try:
+            for chunk in chunks:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                if chunk.get('done'):
+                    final = chunk
+                yield chunk
+        finally:
+            chunks.close()
+            self._record(name, time.perf_counter() - start, final, first_chunk)
+
+    def _record(self, name, seconds=0.0, response=None, first_chunk=None, error=False):
+        with self.lock:
+            counter = self.counters[name]
+            counter["last_used"] = time.monotonic()
+            if error:
+                counter["errors"] += 1
+                return
+            counter["calls"] += 1
+            counter["seconds"] += seconds
+            if first_chunk is not None:
+                counter["streams"] += 1
+                counter["first_chunk"] += first_chunk
+            # A load time well above zero on a regular call means the model had been unloaded
+            if response and response.get('load_duration', 0) > 1e9:
+                self.logger.info(f"Model {name} was cold ({response['load_duration'] / 1e9:.1f}s load)")
+
+    def stats(self):
+        """Per-model call counts, errors, warm-up load time and mean latencies in milliseconds"""
+        with self.lock:
+            return {
+                name: {
+                    "calls": counter["calls"],
+                    "errors": counter["errors"],
+                    "load_ms": counter["load_seconds"] * 1000 if counter["load_seconds"] is not None else None,
+                    "mean_ms": counter["seconds"] / counter["calls"] * 1000 if counter["calls"] else 0.0,
+                    "first_chunk_ms": counter["first_chunk"] / counter["streams"] * 1000 if counter["streams"] else 0.0
+                }
+                for name, counter in self.counters.items()
+            }
+
+    def describe_stats(self):
+        """One-line summary of the model counters for logs"""
+        summary = []
+        for name, stats in self.stats().items():
+            load = "not loaded" if stats['load_ms'] is None else f"load {stats['load_ms']:.0f}ms"
+            summary.append(f"{name}: {stats['calls']} calls, {stats['errors']} errors, {load}, "
+                           f"mean {stats['mean_ms']:.0f}ms, first chunk {stats['first_chunk_ms']:.0f}ms")
+        return ", ".join(summary)
+
+
+SENTENCE_END = re.compile(r'([.!?]+["\')\]]*)\s+')
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "etc.", "approx.", "no."}
+
+
+def split_sentences(fragments, min_length=8):
+    """Re-chunk a stream of text fragments into whole sentences
+
+    A sentence is emitted once its terminating punctuation is followed by
+    whitespace, so nothing is spoken before it is complete. Very short
+    sentences are merged into the next one, and common abbreviations
+    don't count as sentence ends.
+    """
+    buffer = ""
+    for fragment in fragments:
+        buffer += fragment
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            sentence = buffer[start:match.end()].strip()
+            last_word = sentence.rsplit(None, 1)[-1].lower()
+            if len(sentence) < min_length or last_word in ABBREVIATIONS:
+                continue
+            yield sentence
+            start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
 
-    def error(self, msg, exc_info=True):
-        self.logger.error(msg, exc_info=exc_info)
 
 class JarvisAssistant:
-    def __init__(self):
+    # Fixed lines that are rendered into the phrase cache at startup
+    STARTUP_PHRASES = [
+        "JARVIS Mark 1 online. Ready to assist you in the workshop, boss.",
+        "AI systems connected. You can now talk to me conversationally.",
+        "Ollama AI connection failed. Voice commands limited to basic functionality."
+    ]
+    # Enhanced system prompt for more conversational and helpful responses
+    CHAT_SYSTEM_PROMPT = """You are JARVIS, an advanced AI assistant created by Tony Stark.
+            
+            Personality traits:
+            - Efficient and helpful, always seeking to assist your creator
+            - Slightly witty and occasionally sarcastic, but always respectful
+            - Knowledgeable about engineering, science, and technology
+            - Brief and concise in your responses - no more than 1-3 sentences unless absolutely necessary
+            - You refer to the user as "boss" or "sir" occasionally
+            
+            When responding to general conversation:
+            - Keep responses friendly but relatively brief
+            - Maintain the Tony Stark / JARVIS dynamic from Iron Man
+            - If you don't know something, admit it but offer to help in another way
+            - For greetings and small talk, be warm but concise
+            
+            Current capabilities:
+            - Media control and YouTube searches
+            - Workshop mode for focused engineering work
+            - System monitoring and PC control
+            - Research assistance and web searches
+            - Productivity tools including timers, notes, and focus mode
+            
+            Example responses:
+            "Hello boss. Systems online and ready to assist."
+            "The repulsor calibration should be complete in approximately 15 minutes, sir."
+            "I don't have access to that information. Would you like me to perform a web search?"
+            """
+    MOTIVATION_QUOTES = [
+        "The only way to do great work is to love what you do. - Steve Jobs",
+        "I am Iron Man! Oh wait, wrong timeline...",
+        "Even DUM-E started as a simple code. Keep going!",
+        "Success is 1% inspiration, 99% not getting distracted by cat videos.",
+        "Your future self will thank you for working hard today!"
+    ]
+
+    def __init__(self, drivers=None):
+        self.logger = JarvisLogger()
+        # Devices and external services; fakes in jarvis_sim.py
+        self.drivers = drivers or Drivers()
+        self.startup = StartupReport(self.logger, started=_import_started)
+        # Telemetry and the semantic index need numpy; import it while config loads
+        self.startup.preload(np)
+        with self.startup.measure("config"):
+            self.config = self.load_config()
+        self.logger.configure(self.config.get('logging', {}))
+        # Per-stage latency spans for every command
+        tracing_settings = self.config.get('tracing', {})
+        self.tracer = Tracer(
+            self.logger, tracing_settings.get('path', 'jarvis_trace.jsonl'),
+            window=tracing_settings.get('window', 200),
+            max_bytes=tracing_settings.get('max_mb', 10) * 1024 * 1024
+        )
+        self.pending_trace = None  # opened by listen(), continued by process_command()
+        # One pooled HTTP client with timeouts, retries and circuit breakers for every web feature
+        self.http = HttpClient(self.logger, self.config.get('http', {}), session=self.drivers.http)
+        research_settings = self.config.get('research', {})
+        self.research_cache = ResearchCache(
+            research_settings.get('cache_path', 'jarvis_research_cache.json'), self.logger,
+            max_entries=research_settings.get('max_entries', 1000),
+            ttl=research_settings.get('ttl_days', 30) * 24 * 3600,
+            deep_ttl=research_settings.get('deep_ttl_days', 7) * 24 * 3600,
+            fuzzy_cutoff=research_settings.get('fuzzy_cutoff', 0.75)
+        )
+        weather_settings = self.config.get('weather', {})
+        self.weather = WeatherService(
+            self.drivers.weather or create_weather_provider(
+                weather_settings.get('provider', 'open-meteo'), self.http, weather_settings, self.logger
+            ),
+            self.logger,
+            geocode_path=weather_settings.get('geocode_cache_path', 'jarvis_geocode_cache.json'),
+            ttl=weather_settings.get('ttl', 600)
+        )
         self.recognizer = sr.Recognizer()
-        self.speaker = pyttsx3.init()
-        self.speaker.setProperty('rate', 180)  # Faster speech rate because I'm always in a hurry
-        self.speaker.setProperty('voice', 'english+m3')
-        pygame.mixer.init()
+        # Ollama models by role, shared client and background warm-up
+        self.models = ModelManager(self.logger, self.config.get('ollama', {}), client_factory=self.drivers.llm)
+        self.previous_volume = 50
+        self.is_muted = False
+
+        # Speech output with a cache of pre-rendered fixed phrases; the
+        # engine and audio mixer start on the speech worker thread
+        cache_settings = self.config.get('tts_cache', {})
+        self.phrase_cache = PhraseCache(
+            self.logger,
+            directory=cache_settings.get('directory', 'jarvis_tts_cache'),
+            max_bytes=cache_settings.get('max_mb', 64) * 1024 * 1024
+        )
+        self.speech = SpeechQueue(self.logger, rate=180, voice='english+m3', phrase_cache=self.phrase_cache,
+                                  engine_factory=self.drivers.speech_engine, audio=self.drivers.audio,
+                                  tracer=self.tracer)
+        self.speech.start()
+        self.speech.warm_up(self.STARTUP_PHRASES + self.MOTIVATION_QUOTES + self.phrase_cache.known_texts())
+
+        # Speech recognition backend and speculative intent matching on partials
+        recognition_settings = self.config.get('speech_recognition', {})
+        with self.startup.measure("recognizer backend"):
+            self.recognizer_backend = create_recognizer_backend(
+                recognition_settings.get('backend', 'google'), self.recognizer, recognition_settings, self.logger
+            )
+        # Command intents, including the workshop quick access shortcuts
+        with self.startup.measure("intents"):
+            self.intent_registry = self.build_intent_registry()
+            self.intent_registry.tracer = self.tracer
+            self.intent_prompt = self.intent_registry.build_prompt()
+            self.intent_classifier = IntentClassifier()
+            # Changing the intent model or the generated prompt invalidates the cache
+            intent_fingerprint = f"{self.models.model('intent')}\n{self.intent_prompt}"
+            cache_settings = self.config.get('intent_cache', {})
+            self.intent_cache = IntentCache(
+                cache_settings.get('path', 'jarvis_intent_cache.json'), self.logger,
+                max_entries=cache_settings.get('max_entries', 500),
+                ttl=cache_settings.get('ttl_hours', 168) * 3600,
+                fingerprint=hashlib.sha256(intent_fingerprint.encode('utf-8')).hexdigest()
+            )
+        self.intent_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.speculative_intent = None
+        self.interrupted = threading.Event()
+        self.replying = False
+
+        # Keep the microphone open for the whole session. It is opened and
+        # calibrated first, in the background, so it is listening as early
+        # as possible; the volume endpoint starts alongside
+        self.microphone = MicrophoneStream(
+            self.recognizer, self.logger, is_muted=lambda: self.speech.speaking,
+            onset_duration=self.config.get('listening', {}).get('onset_duration', 0.1),
+            backend=self.recognizer_backend, on_partial=self._on_partial_transcript,
+            on_speech_start=self._on_user_speech, source_factory=self.drivers.microphone,
+            tracer=self.tracer,
+            idle_read_chunks=self.config.get('listening', {}).get('idle_read_chunks', 4)
+        )
+        self.startup.run_in_background("microphone", self.microphone.start)
+        self.startup.run_in_background("volume", self._start_volume_control)
         
         # Initialize memory system
-        self.memory = self.initialize_memory()
-        
-        # Initialize volume control
-        devices = AudioUtilities.GetSpeakers()
-        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-        self.volume = cast(interface, POINTER(IAudioEndpointVolume))
-        
-        # Track previous volume for mute/unmute functionality
-        self.previous_volume = self.volume.GetMasterVolumeLevelScalar() * 100
-        self.is_muted = False
+        memory_settings = self.config.get('memory', {})
+        with self.startup.measure("memory"):
+            self.store = JarvisStore(memory_settings.get('database', 'jarvis.db'))
+            self.memory = self.initialize_memory()
+            self.retention = ConversationRetention(
+                self.store, self.memory, self.logger,
+                max_conversations=memory_settings.get('max_conversations', 100),
+                expiry_days=memory_settings.get('conversation_expiry_days', 30),
+                archive_dir=memory_settings.get('archive_dir', 'jarvis_archive')
+            )
+            self.retention.attach()
+        self.last_user_turn = None  # id of the turn being answered, which recall leaves out
+        # Timers and reminders live in the store; scheduling starts with the assistant below
+        self.reminders = ReminderScheduler(self.store, self.logger, self._reminder_due)
+        self.last_reminder = None  # the one "snooze" applies to
+        context_settings = self.config.get('conversation', {})
+        self.context = ConversationContext(
+            self.retention, self.CHAT_SYSTEM_PROMPT,
+            max_tokens=context_settings.get('context_tokens', 1024),
+            recent_turns=context_settings.get('recent_turns', 8),
+            relevant_turns=context_settings.get('relevant_turns', 4)
+        )
+        recall_settings = self.config.get('recall', {})
+        embedders = [HashingEmbedder(recall_settings.get('hashing_dim', 384))]
+        if recall_settings.get('embedding', 'auto') != 'hashing':
+            embedders.insert(0, OllamaEmbedder(self.models))
+        self.semantic_index = SemanticIndex(
+            self.logger, recall_settings.get('directory', 'jarvis_semantic_index'), embedders
+        )
+        self.semantic_index.start(backfill=self._recall_backfill)
+        # Ollama announces itself, so it starts once replies can be remembered
+        self.startup.run_in_background("ollama", self._start_ollama)
         
         # Workshop mode settings
         self.workshop_mode = False
@@ -89,115 +3716,239 @@ class JarvisAssistant:
         
         # Initialize workshop camera
         self.camera = None
+
+        # Initialize function registry
+        self.function_registry = {}
+        # Enable self-improvement mode
+        self.self_improvement_enabled = True
         
-        # Quick access commands
-        self.shortcuts = {
-            "specs": self.show_armor_specs,
-            "calculations": self.run_calculations,
-            "music": self.toggle_workshop_music,
-            "lights": self.toggle_workshop_lights
-        }
-        
-        # Initialize Ollama
+        # Initialize additional modules; trends and headlines are
+        # prefetched in the background from the start
+        with self.startup.measure("social media"):
+            self.social_media = SocialMediaMonitor(self)
+            self.social_media.start()
+        with self.startup.measure("telemetry"):
+            telemetry_settings = self.config.get('telemetry', {})
+            workshop_settings = self.config.get('workshop_mode', {})
+            self.telemetry = TelemetrySampler(
+                self.logger,
+                interval=telemetry_settings.get('interval', 2),
+                history=telemetry_settings.get('history', 1800),
+                top_count=telemetry_settings.get('top_processes', 3),
+                max_overhead=telemetry_settings.get('max_overhead', 0.005),
+                thresholds={
+                    "cpu": workshop_settings.get('alert_cpu_threshold', 80),
+                    "memory": workshop_settings.get('alert_memory_threshold', 85),
+                    "memory_trend": workshop_settings.get('alert_memory_trend', 2.0),
+                    "trend_window": telemetry_settings.get('trend_window', 300),
+                },
+                on_alert=self._telemetry_alert,
+                cooldown=workshop_settings.get('alert_cooldown', 300)
+            )
+            if telemetry_settings.get('enabled', True):
+                self.telemetry.start()
+        with self.startup.measure("reminders"):
+            restored = self.reminders.start()
+            if restored:
+                self.logger.info(f"Rescheduled {restored} pending reminders and timers")
+        self.startup.finish()
+
+    @property
+    def ollama(self):
+        """Shared Ollama client once it has started in the background, else None"""
+        return self.startup.result("ollama")
+
+    @property
+    def volume(self):
+        """pycaw endpoint volume once it has started in the background, else None"""
+        return self.startup.result("volume")
+
+    def _start_ollama(self):
         try:
-            self.ollama = ollama.Client()
+            client = self.models.connect()
+            self.models.start()
             self.speak("Ollama AI backup systems initialized")
+            return client
         except Exception as e:
             self.speak("Warning: Ollama backup systems offline")
-            self.ollama = None
+            return None
 
-        self.logger = JarvisLogger()
+    def _start_volume_control(self):
+        volume = self.drivers.volume()
+        # Track previous volume for mute/unmute functionality
+        self.previous_volume = volume.GetMasterVolumeLevelScalar() * 100
+        return volume
 
-        # Initialize function registry
-        self.function_registry = {}
-        # Enable self-improvement mode
-        self.self_improvement_enabled = True
-        
-        # Initialize additional modules
-        self.social_media = None  # Will be initialized on first use
+    def load_config(self):
+        """Load configuration from jarvis_config.yaml"""
+        try:
+            with open('jarvis_config.yaml', 'r') as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            self.logger.error(f"Failed to load config: {e}")
+            return {}
 
     def initialize_memory(self):
         """Initialize the memory system for JARVIS"""
+        # The first run on the database brings over the old JSON files
         try:
-            with open('jarvis_memory.json', 'r') as f:
-                memory = json.load(f)
-            return memory
-        except (FileNotFoundError, json.JSONDecodeError):
-            # Create a new memory structure if file doesn't exist or is corrupted
-            memory = {
-                "conversations": [],
-                "user_preferences": {},
-                "tasks": [],
-                "reminders": [],
-                "last_active": str(datetime.datetime.now())
-            }
-            self.save_memory(memory)
-            return memory
-            
-    def save_memory(self, memory=None):
-        """Save the current memory state to file"""
-        if memory is None:
-            memory = self.memory
-        try:
-            with open('jarvis_memory.json', 'w') as f:
-                json.dump(memory, f, indent=2)
-            return True
+            imported = self.store.import_json()
+            if imported and any(imported.values()):
+                self.logger.info(f"Imported JSON memory into {self.store.path}: {imported}")
         except Exception as e:
-            self.logger.error(f"Failed to save memory: {e}")
-            return False
+            self.logger.error(f"Failed to import JSON memory: {e}")
+        return {
+            "conversations": collections.deque(),  # loaded by ConversationRetention.attach()
+            "user_preferences": self.store.get("user_preferences", {}),
+            "tasks": self.store.get("tasks", []),
+            "last_active": self.store.get("last_active", str(datetime.datetime.now()))
+        }
 
-    def speak(self, text):
-        print(f"JARVIS: {text}")
-        # Store conversation in memory
+    def save_memory(self):
+        """Save the current memory state to file"""
+        # Every change is already committed; this folds the WAL into the database
+        self.store.checkpoint()
+        return True
+
+    def remember_turn(self, speaker, text):
+        """Store a conversation turn in memory and the database"""
         try:
-            self.memory.setdefault("conversations", []).append({
-                "speaker": "jarvis",
+            entry = {
+                "speaker": speaker,
                 "text": text,
-                "timestamp": str(datetime.datetime.now())
-            })
-            self.save_memory()
+                "timestamp": str(datetime.datetime.now()),
+                "tokens": ConversationContext.estimate_tokens(text)
+            }
+            self.retention.add(entry)
+            if speaker == "user":
+                self.last_user_turn = entry["id"]
+            self.semantic_index.add("conversation", text, speaker=speaker, turn_id=entry["id"])
         except Exception as e:
             self.logger.error(f"Failed to store memory: {e}")
-        self.speaker.say(text)
-        self.speaker.runAndWait()
+
+    def _recall_backfill(self):
+        """Existing conversations, archives, notes and projects for a new semantic index"""
+        def seconds(timestamp):
+            try:
+                return datetime.datetime.fromisoformat(timestamp).timestamp()
+            except (TypeError, ValueError):
+                return None
+
+        archive_dir = self.retention.archive_dir
+        archives = sorted(os.listdir(archive_dir)) if os.path.isdir(archive_dir) else []
+        for name in archives:
+            with gzip.open(os.path.join(archive_dir, name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    yield ("conversation", entry.get("text"), seconds(entry.get("timestamp")),
+                           {"speaker": entry.get("speaker")})
+        with self.retention.lock:
+            conversations = list(self.memory.get("conversations", ()))
+        for entry in conversations:
+            yield ("conversation", entry.get("text"), seconds(entry.get("timestamp")), {"speaker": entry.get("speaker")})
+
+        for note in self.store.notes():
+            yield ("note", note["note"], seconds(note["timestamp"]), {})
+        for name, details in self.store.projects().items():
+            yield ("project", f"{name}: {details['status']}", seconds(details["last_updated"]), {"project": name})
+
+    def speak(self, text, priority=SpeechQueue.NORMAL, coalesce_key=None, wait=False, cache=False, remember=True):
+        """Queue text for speech and return its Future
+
+        Set wait to block until it has been spoken, and cache for fixed
+        phrases that should be replayed from the phrase cache.
+        """
+        print(f"JARVIS: {text}")
+        # Store conversation in memory
+        if remember:
+            self.remember_turn("jarvis", text)
+        future = self.speech.say(text, priority=priority, coalesce_key=coalesce_key, cache=cache)
+        if wait:
+            concurrent.futures.wait([future])
+        return future
 
     def listen(self):
-        """Enhanced listening with extended timeout and dynamic noise adjustment"""
-        try:
-            with sr.Microphone() as source:
+        """Wait for the next command, backing off while the workshop is quiet
+
+        Runs as a loop rather than recursing: every timeout without speech
+        stretches the next wait (up to listening.max_timeout) and, after
+        listening.idle_after seconds, drops the microphone into its low-CPU
+        idle mode. The "still listening" line is only spoken once per quiet
+        spell.
+        """
+        settings = self.config.get('listening', {})
+        timeout = settings.get('timeout', 30)
+        max_timeout = settings.get('max_timeout', 300)
+        backoff = settings.get('backoff_factor', 2)
+        idle_after = settings.get('idle_after', 120)
+
+        # The microphone opens in the background at startup
+        self.startup.result("microphone")
+        quiet_since = time.monotonic()
+        nagged = False
+        while True:
+            try:
+                if not self.microphone.running:
+                    self.microphone.start()
                 print("Listening...")
-                # Dynamically adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                try:
-                    # Extended timeout and phrase time limit
-                    audio = self.recognizer.listen(source, timeout=30, phrase_time_limit=60)
-                    text = self.recognizer.recognize_google(audio)
-                    print(f"Boss said: {text}")
-                    
-                    # Store user conversation in memory
-                    try:
-                        self.memory.setdefault("conversations", []).append({
-                            "speaker": "user",
-                            "text": text,
-                            "timestamp": str(datetime.datetime.now())
-                        })
-                        self.save_memory()
-                    except Exception as e:
-                        self.logger.error(f"Failed to store user input in memory: {e}")
-                    
-                    return text.lower()
-                except sr.WaitTimeoutError:
-                    self.speak("Still listening, boss. Take your time.")
-                    return self.listen()  # Recursively continue listening
-                except sr.UnknownValueError:
-                    self.speak("Could you repeat that? My audio processing isn't as good as it will be in Mark 2.")
-                    return ""
-                except sr.RequestError as e:
-                    self.speak(f"Network issues. Error: {e}")
-                    return ""
-        except Exception as e:
-            self.speak(f"Sorry boss, having some technical difficulties: {e}")
-            return ""
+                audio, ended_at, stream = self.microphone.next_phrase(timeout=timeout)
+            except sr.WaitTimeoutError:
+                if not nagged:
+                    self.speak("Still listening, boss. Take your time.", priority=SpeechQueue.CHATTER, cache=True)
+                    nagged = True
+                timeout = min(timeout * backoff, max_timeout)
+                if time.monotonic() - quiet_since >= idle_after:
+                    self.microphone.set_idle(True)
+                continue
+            except Exception as e:
+                self.speak(f"Sorry boss, having some technical difficulties: {e}")
+                return ""
+
+            self.microphone.set_idle(False)
+            try:
+                if stream is not None:
+                    text = stream.finish()
+                else:
+                    text = self.recognizer_backend.transcribe(audio)
+                recognition = time.monotonic() - ended_at
+                self.pending_trace = self.tracer.begin()
+                self.tracer.record("recognition", recognition)
+                self.logger.debug(f"End of speech to transcript: {recognition * 1000:.0f} ms")
+                print(f"Boss said: {text}")
+
+                # Store user conversation in memory
+                self.remember_turn("user", text)
+
+                return text.lower()
+            except sr.UnknownValueError:
+                self.speak("Could you repeat that? My audio processing isn't as good as it will be in Mark 2.")
+                return ""
+            except sr.RequestError as e:
+                self.speak(f"Network issues. Error: {e}")
+                return ""
+            except Exception as e:
+                self.speak(f"Sorry boss, having some technical difficulties: {e}")
+                return ""
+
+    def _on_partial_transcript(self, text):
+        """Start resolving the intent of a partial transcript in the background
+
+        Called from the capture thread, so it never waits for Ollama to
+        finish starting. At most one speculative lookup runs at a time and
+        it leaves the intent cache alone; process_command reuses it, and
+        caches it, if the final transcript matches.
+        """
+        text = text.lower().strip()
+        ollama = self.startup.tasks.get("ollama")
+        if len(text.split()) < 2 or ollama is None or not ollama.done() or not self.ollama:
+            return
+        if self.intent_classifier.classify(text, record=False) is not None or self.intent_cache.get(text):
+            # Resolved locally in microseconds; nothing to speculate on
+            return
+        speculative = self.speculative_intent
+        if speculative is not None and (speculative[0] == text or not speculative[1].done()):
+            return
+        self.speculative_intent = (text, self.intent_executor.submit(self.get_command_intent, text, cache=False))
 
     def add_function(self, function_name, code_string):
         """Dynamically add new functions to JARVIS"""
@@ -229,7 +3980,7 @@ class JarvisAssistant:
             The function should be part of the JarvisAssistant class.
             Keep it simple and safe. No imports allowed."""
             
-            response = self.ollama.chat(model='llama3.2:3b', messages=[{
+            response = self.models.chat('code', [{
                 'role': 'system',
                 'content': 'You are a Python expert. Respond only with valid Python function code.'
             }, {
@@ -253,7 +4004,7 @@ class JarvisAssistant:
                 current_code = f.read()
 
             # Ask Ollama for improvements
-            response = self.ollama.chat(model='llama3.2:3b', messages=[{
+            response = self.models.chat('code', [{
                 'role': 'system',
                 'content': 'You are a Python expert. Analyze code and suggest improvements.'
             }, {
@@ -285,17 +4036,17 @@ class JarvisAssistant:
             level = int(level)
             
             if not 0 <= level <= 100:
-                self.speak("Come on boss, volume needs to be between 0 and 100!")
+                self.speak("Come on boss, volume needs to be between 0 and 100!", cache=True)
                 return False
             
             vol = level / 100
             self.volume.SetMasterVolumeLevelScalar(vol, None)
             self.is_muted = False
             self.previous_volume = level
-            self.speak(f"Volume set to {level}%")
+            self.speak(f"Volume set to {level}%", coalesce_key="volume")
             return True
         except Exception as e:
-            self.speak("Houston, we have a problem with the volume controls!")
+            self.speak("Houston, we have a problem with the volume controls!", cache=True)
             return False
 
     def mute_volume(self):
@@ -305,11 +4056,11 @@ class JarvisAssistant:
                 self.previous_volume = self.volume.GetMasterVolumeLevelScalar() * 100
                 self.volume.SetMute(1, None)  # Actually mute the system
                 self.is_muted = True
-                self.speak("Muted. Finally, some peace and quiet!")
+                self.speak("Muted. Finally, some peace and quiet!", cache=True)
             else:
-                self.speak("Already muted, boss!")
+                self.speak("Already muted, boss!", cache=True)
         except Exception as e:
-            self.speak("Muting system malfunction. Have you been tinkering with my code again?")
+            self.speak("Muting system malfunction. Have you been tinkering with my code again?", cache=True)
 
     def unmute_volume(self):
         """Unmute with state tracking and error handling"""
@@ -349,7 +4100,7 @@ class JarvisAssistant:
             }
             
             if action in media_actions:
-                keyboard.send(media_actions[action])
+                self.drivers.media_keys.send(media_actions[action])
                 self.speak(f"Media {action} command executed")
                 return True
             
@@ -363,11 +4114,95 @@ class JarvisAssistant:
     def quick_research(self, query):
         """Quick Wikipedia lookup for technical stuff"""
         try:
-            result = wikipedia.summary(query, sentences=2)
-            self.speak(result)
-        except:
+            _, summary = self.lookup_summary(query)
+            self.speak(summary)
+        except Exception:
             self.speak("Sorry boss, couldn't find that in my database.")
 
+    def lookup_summary(self, query, sentences=2, save=True):
+        """Return (title, summary) of the Wikipedia page for a query, cached
+
+        A fresh cached answer needs no network. Otherwise the query is
+        resolved to a page title first, which may already be cached under
+        another wording; only then is the summary fetched. If Wikipedia
+        can't be reached, any cached answer is used. Raises LookupError
+        when there is no such page.
+        """
+        cached = self.research_cache.summary(query)
+        if cached and cached[2]:
+            return cached[0], cached[1]
+        try:
+            results = wikipedia.search(query, results=1)
+            if not results:
+                raise LookupError(f"No Wikipedia page for {query}")
+            title = results[0]
+            page = self.research_cache.page(title)
+            if page and page[1]:
+                self.research_cache.alias(query, title, save=save)
+                return title, page[0]
+            summary = wikipedia.summary(title, sentences=sentences, auto_suggest=False)
+        except LookupError:
+            raise
+        except Exception as e:
+            if isinstance(e, (wikipedia.PageError, wikipedia.DisambiguationError)):
+                raise LookupError(str(e)) from e
+            cached = cached or self.research_cache.summary(query, offline=True)
+            if cached is None:
+                raise
+            self.logger.info(f"Wikipedia unavailable ({e}); using cached research on {cached[0]}")
+            return cached[0], cached[1]
+        self.research_cache.put_summary(query, title, summary, save=save)
+        return title, summary
+
+    def deep_research(self, query):
+        """Speak a detailed answer from Ollama, cached per query; False if there is none"""
+        model = self.models.model('chat')
+        cached = self.research_cache.answer(model, query)
+        answer = cached[0] if cached and cached[1] else None
+        if answer is None and self.ollama:
+            answer = self.ask_ollama(f"Research and provide detailed information about: {query}")
+            if answer:
+                self.research_cache.put_answer(model, query, answer)
+        if answer is None:
+            # Ollama is down; an old answer, or one to a similar question, will do
+            cached = cached or self.research_cache.answer(model, query, offline=True)
+            answer = cached[0] if cached else None
+        if answer:
+            self.speak(answer)
+        return bool(answer)
+
+    def research_topics(self):
+        """Topics worth having offline: configured ones plus the names of unfinished projects"""
+        topics = list(self.config.get('research', {}).get('topics', []))
+        for name, details in self.store.projects().items():
+            if details['status'].lower() not in ("done", "complete", "completed", "finished"):
+                topics.append(name)
+        return list(dict.fromkeys(topics))
+
+    def prefetch_research(self, topics=None):
+        """Warm the research cache for a list of topics in the background"""
+        topics = [topic for topic in (topics if topics is not None else self.research_topics()) if topic.strip()]
+        if topics:
+            threading.Thread(target=self._prefetch_research, args=(topics,), name="research-prefetch",
+                             daemon=True).start()
+        return topics
+
+    def _prefetch_research(self, topics):
+        def fetch(topic):
+            try:
+                self.lookup_summary(topic, save=False)
+                return True
+            except Exception as e:
+                self.logger.info(f"Research prefetch of {topic} failed: {e}")
+                return False
+
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="research") as pool:
+            fetched = sum(pool.map(fetch, topics))
+        self.research_cache.save()
+        self.logger.info(f"Prefetched research on {fetched}/{len(topics)} topics "
+                         f"in {time.perf_counter() - started:.1f}s")
+
     def toggle_workshop_mode(self, activate=None):
         """Toggle workshop mode with specific settings"""
         if activate is None:
@@ -383,23 +4218,43 @@ class JarvisAssistant:
             self.start_workshop_camera()
             # Play workshop music
             self.toggle_workshop_music()
-            # Enable system monitoring
-            threading.Thread(target=self._monitor_system_resources, daemon=True).start()
+            # Speak up about resource alerts from the telemetry sampler
+            self.telemetry.alerts_enabled = self.config.get('workshop_mode', {}).get('auto_monitor', True)
+            # Have research on the current projects ready, and available offline
+            self.prefetch_research()
         else:
             self.speak("Exiting workshop mode. Shutting down workshop systems.")
             # Stop workshop camera
             self.stop_workshop_camera()
+            self.telemetry.alerts_enabled = False
             # Stop music if playing
-            if pygame.mixer.music.get_busy():
-                pygame.mixer.music.stop()
+            if self.drivers.audio.music_busy():
+                self.drivers.audio.stop_music()
 
     def get_system_stats(self):
-        cpu_usage = psutil.cpu_percent()
-        memory = psutil.virtual_memory()
-        memory_usage = memory.percent
         battery = psutil.sensors_battery()
         battery_percent = battery.percent if battery else "N/A"
-        return f"CPU usage is at {cpu_usage}%. Memory usage is at {memory_usage}%. Battery is at {battery_percent}%."
+        cpu = self.telemetry.stats("cpu", 60)
+        memory = self.telemetry.stats("memory", 60)
+        if cpu is None or memory is None:
+            # Nothing sampled yet
+            cpu_usage = psutil.cpu_percent()
+            memory_usage = psutil.virtual_memory().percent
+            return f"CPU usage is at {cpu_usage}%. Memory usage is at {memory_usage}%. Battery is at {battery_percent}%."
+
+        report = [f"CPU usage is at {cpu['last']:.0f}%, averaging {cpu['avg']:.0f}% over the last minute "
+                  f"with a peak of {cpu['max']:.0f}%."]
+        slope = self.telemetry.trend("memory")
+        if slope is not None and abs(slope) >= 0.5:
+            direction = "climbing" if slope > 0 else "falling"
+            report.append(f"Memory usage is at {memory['last']:.0f}% and {direction} {abs(slope):.1f}% a minute.")
+        else:
+            report.append(f"Memory usage is at {memory['last']:.0f}%.")
+        top = self.telemetry.top_processes()
+        if top and top[0][1] >= 1:
+            report.append(f"Busiest process is {top[0][0]} at {top[0][1]:.0f}%.")
+        report.append(f"Battery is at {battery_percent}%.")
+        return " ".join(report)
 
     def show_armor_specs(self):
         """Display current armor specifications"""
@@ -443,24 +4298,18 @@ class JarvisAssistant:
 
     def search_web(self, query):
         """Open web search for a query"""
-        webbrowser.open(f"https://www.google.com/search?q={query}")
+        self.drivers.browser.open(f"https://www.google.com/search?q={query}")
 
     def get_weather(self, city):
         """Get weather information for a city"""
         try:
-            api_key = "YOUR_OPENWEATHERMAP_API_KEY"  # Replace with actual API key
-            base_url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-            response = requests.get(base_url)
-            data = response.json()
-            
-            if data["cod"] != 200:
-                return f"Sorry, couldn't find weather information for {city}"
-            
-            temp = data['main']['temp']
-            description = data['weather'][0]['description']
-            return f"Weather in {city}: {description}, Temperature: {temp}°C"
+            report = self.weather.current(city)
+            return f"Weather in {report['city']}: {report['description']}, Temperature: {round(report['temp'])}°C"
+        except LookupError:
+            return f"Sorry, couldn't find weather information for {city}"
         except Exception as e:
-            return f"Error retrieving weather: {str(e)}"
+            self.logger.error(f"Weather lookup for {city} failed: {e}", exc_info=False)
+            return "Sorry boss, the weather service isn't responding right now."
 
     def ask_ollama(self, query):
         """Use Ollama for conversational responses and general knowledge"""
@@ -469,39 +4318,7 @@ class JarvisAssistant:
                 self.logger.error("Ollama not initialized")
                 return None
             
-            # Enhanced system prompt for more conversational and helpful responses
-            system_prompt = """You are JARVIS, an advanced AI assistant created by Tony Stark.
-            
-            Personality traits:
-            - Efficient and helpful, always seeking to assist your creator
-            - Slightly witty and occasionally sarcastic, but always respectful
-            - Knowledgeable about engineering, science, and technology
-            - Brief and concise in your responses - no more than 1-3 sentences unless absolutely necessary
-            - You refer to the user as "boss" or "sir" occasionally
-            
-            When responding to general conversation:
-            - Keep responses friendly but relatively brief
-            - Maintain the Tony Stark / JARVIS dynamic from Iron Man
-            - If you don't know something, admit it but offer to help in another way
-            - For greetings and small talk, be warm but concise
-            
-            Current capabilities:
-            - Media control and YouTube searches
-            - Workshop mode for focused engineering work
-            - System monitoring and PC control
-            - Research assistance and web searches
-            - Productivity tools including timers, notes, and focus mode
-            
-            Example responses:
-            "Hello boss. Systems online and ready to assist."
-            "The repulsor calibration should be complete in approximately 15 minutes, sir."
-            "I don't have access to that information. Would you like me to perform a web search?"
-            """
-            
-            response = self.ollama.chat(model='llama3.2:3b', messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': query}
-            ])
+            response = self.models.chat('chat', self.context.build(query))
             
             if 'message' in response and 'content' in response['message']:
                 return response['message']['content']
@@ -513,166 +4330,39 @@ class JarvisAssistant:
             self.logger.error(f"Ollama query failed: {e}")
             return None
 
-    def get_command_intent(self, command):
-        """Advanced command interpretation using Ollama"""
-        try:
-            if not self.ollama:
-                return None
-            
-            system_prompt = """You are JARVIS's command interpreter. You MUST respond in valid JSON format.
-            
-            Available Intents and Parameters:
-
-            1. media:
-            - YouTube commands
-            {
-                "intent": "youtube",
-                "params": {"action": "play", "query": "Back in Black"}
-            }
-            
-            - Volume commands
-            {
-                "intent": "volume",
-                "params": {"action": "up/down/mute/unmute", "level": 50}
-            }
-            
-            - Media control commands
-            {
-                "intent": "media",
-                "params": {"action": "play/pause/next/previous"}
-            }
-
-            2. system:
-            - System commands
-            {
-                "intent": "pc",
-                "params": {"action": "sleep/lock/screenshot/shutdown/restart"}
-            }
-
-            3. files:
-            - File operations
-            {
-                "intent": "file",
-                "params": {"action": "create/open/delete", "filename": "test.txt"}
-            }
-
-            4. applications:
-            - Launch applications
-            {
-                "intent": "app",
-                "params": {"name": "firefox"}
-            }
-
-            5. workspace:
-            - Window management
-            {
-                "intent": "window",
-                "params": {"action": "arrange/maximize/minimize"}
-            }
-            
-            - Save workspace
-            {
-                "intent": "backup",
-                "params": {}
-            }
+    def stream_ollama(self, query):
+        """Yield Ollama's reply sentence by sentence while it is generated
 
-            6. productivity:
-            - Focus mode
-            {
-                "intent": "focus",
-                "params": {}
-            }
-            
-            - Pomodoro timer
-            {
-                "intent": "pomodoro",
-                "params": {}
-            }
-            
-            - Timer
-            {
-                "intent": "timer",
-                "params": {"duration": 30, "label": "suit calibration"}
-            }
-            
-            - Notes
-            {
-                "intent": "note",
-                "params": {"action": "add/list/delete", "note": "need to optimize thrusters"}
-            }
-            
-            - Project tracking
-            {
-                "intent": "project",
-                "params": {"action": "add/update/list", "project": "Mark 1 Suit", "status": "Testing"}
-            }
+        Stops early (and closes the HTTP stream, which aborts generation)
+        as soon as self.interrupted is set.
+        """
+        if not self.ollama:
+            self.logger.error("Ollama not initialized")
+            return
+        stream = self.models.chat('chat', self.context.build(query), stream=True)
+        fragments = (chunk.get('message', {}).get('content', '') for chunk in stream)
+        try:
+            for sentence in split_sentences(fragments):
+                if self.interrupted.is_set():
+                    break
+                yield sentence
+        finally:
+            stream.close()
 
-            7. information:
-            - Web search
-            {
-                "intent": "search",
-                "params": {"query": "quantum physics"}
-            }
-            
-            - Weather
-            {
-                "intent": "weather",
-                "params": {"city": "New York"}
-            }
-            
-            - Research
-            {
-                "intent": "research",
-                "params": {"action": "quick/deep", "query": "fusion reactors"}
-            }
-            
-            - Time
-            {
-                "intent": "time",
-                "params": {}
-            }
-            
-            - Date
-            {
-                "intent": "date",
-                "params": {}
-            }
-            
-            - Social media trends
-            {
-                "intent": "trending",
-                "params": {"location": "worldwide"}
-            }
-            
-            - News headlines
-            {
-                "intent": "news",
-                "params": {}
-            }
+    def get_command_intent(self, command, cache=True):
+        """Advanced command interpretation using Ollama
 
-            8. workshop:
-            - Workshop mode
-            {
-                "intent": "workshop",
-                "params": {"action": "toggle/activate/deactivate"}
-            }
+        With cache=False (speculation on a partial transcript) nothing is
+        written to the intent cache and unparseable replies give None
+        instead of the keyword fallback.
+        """
+        try:
+            if not self.ollama:
+                return None
             
-            - System stats
-            {
-                "intent": "system",
-                "params": {}
-            }
-
-            For general questions or AI responses:
-            {
-                "intent": "ollama",
-                "params": {"query": "original question"}
-            }
+            system_prompt = self.intent_prompt
 
-            Remove any polite phrases or extra words from parameters.
-            Only respond with the JSON object, nothing else."""
-
-            response = self.ollama.chat(model='tinyllama', messages=[
+            response = self.models.chat('intent', [
                 {'role': 'system', 'content': system_prompt},
                 {'role': 'user', 'content': f"Interpret this command: {command}"}
             ])
@@ -685,9 +4375,13 @@ class JarvisAssistant:
                 
                 result = json.loads(content)
                 print(f"AI Interpretation: {result}")  # Debug print
+                if cache:
+                    self.intent_cache.put(command, result)
                 return result
             except Exception as e:
                 print(f"JSON parsing error: {e}")
+                if not cache:
+                    return None
                 # Try to extract intent directly from command
                 return self.fallback_intent_extraction(command)
 
@@ -796,10 +4490,7 @@ class JarvisAssistant:
         return {"intent": "ollama", "params": {"query": command}}
 
     def get_social_media_monitor(self):
-        """Lazy initialization of the social media monitor"""
-        if self.social_media is None:
-            self.social_media = SocialMediaMonitor(self)
-            self.speak("Social media monitoring activated")
+        """The social media monitor, started with JARVIS"""
         return self.social_media
         
     def check_trending_topics(self, location="worldwide"):
@@ -812,229 +4503,512 @@ class JarvisAssistant:
         monitor = self.get_social_media_monitor()
         return monitor.get_news()
 
+    def build_intent_registry(self):
+        """Register every command intent with its handler and parameter schema"""
+        registry = IntentRegistry()
+        COMMAND = IntentRegistry.COMMAND
+
+        # Media
+        registry.register('youtube', self._handle_youtube,
+                          params={'action': (str, 'play'), 'query': (str, '')},
+                          section='media', description='YouTube commands',
+                          example={'action': 'play', 'query': 'Back in Black'},
+                          help_section='MEDIA & SOUND', help='YouTube: play youtube [song], search youtube [query]')
+        registry.register('volume', self._handle_volume,
+                          params={'action': (str, ''), 'level': (int, 50)},
+                          section='media', description='Volume commands',
+                          example={'action': 'up/down/mute/unmute', 'level': 50},
+                          help_section='MEDIA & SOUND', help='Volume: mute, unmute, volume up/down, set volume [0-100]')
+        registry.register('media', self.media_control,
+                          params={'action': (str, '')},
+                          section='media', description='Media control commands',
+                          example={'action': 'play/pause/next/previous'},
+                          help_section='MEDIA & SOUND', help='Media: play, pause, next, previous')
+
+        # System
+        registry.register('pc', self.pc_control,
+                          params={'action': (str, '')},
+                          section='system', description='System commands',
+                          example={'action': 'sleep/lock/screenshot/shutdown/restart'},
+                          help_section='SYSTEM & PC CONTROL', help='PC: pc sleep, pc restart, pc shutdown, pc lock, screenshot')
+
+        # Files and applications
+        registry.register('file', self._handle_file,
+                          params={'action': (str, 'open'), 'filename': (str, '')},
+                          section='files', description='File operations',
+                          example={'action': 'create/open/delete', 'filename': 'test.txt'},
+                          help_section='FILES & APPLICATIONS', help='Files: create file [name], open file [name]')
+        registry.register('app', self.quick_launch,
+                          params={'name': (str, '')},
+                          section='applications', description='Launch applications',
+                          example={'name': 'firefox'},
+                          help_section='FILES & APPLICATIONS', help='Apps: open [chrome/code/fusion/spotify]')
+
+        # Workspace
+        registry.register('window', self.window_management,
+                          params={'action': (str, '')},
+                          section='workspace', description='Window management',
+                          example={'action': 'arrange/maximize/minimize'},
+                          help_section='SYSTEM & PC CONTROL', help='Windows: minimize all, maximize, arrange windows')
+        registry.register('backup', self.auto_backup,
+                          section='workspace', description='Save workspace',
+                          help_section='SYSTEM & PC CONTROL', help='Backup: backup', run_async=True)
+
+        # Productivity
+        registry.register('focus', self.toggle_focus_mode,
+                          section='productivity', description='Focus mode',
+                          help_section='WORKSHOP & PRODUCTIVITY', help='Focus: focus mode')
+        registry.register('pomodoro', self.pomodoro_timer,
+                          params={'action': (str, 'start')},
+                          section='productivity', description='Pomodoro timer',
+                          example={'action': 'start/stop'},
+                          help_section='WORKSHOP & PRODUCTIVITY', help='Pomodoro: pomodoro, stop pomodoro')
+        registry.register('timer', self.timer,
+                          params={'duration': (int, 5), 'label': (str, '')},
+                          section='productivity', description='Timer',
+                          example={'duration': 30, 'label': 'suit calibration'},
+                          help_section='WORKSHOP & PRODUCTIVITY', help='Timer: timer [minutes] for [label]')
+        registry.register('reminder', self._handle_reminder,
+                          params={'action': (str, 'set'), 'message': (str, ''), 'minutes': (int, 0), 'at': (str, '')},
+                          section='productivity', description='Reminders',
+                          example={'action': 'set/list/cancel/snooze', 'message': 'check the 3D printer',
+                                   'minutes': 20, 'at': '17:30'},
+                          help_section='WORKSHOP & PRODUCTIVITY',
+                          help='Reminders: remind me to [task] in [minutes] / at [time], list reminders, '
+                               'cancel reminder [task], snooze')
+        registry.register('note', self.quick_notes,
+                          params={'action': (str, 'add'), 'note': (str, '')},
+                          section='productivity', description='Notes',
+                          example={'action': 'add/read', 'note': 'need to optimize thrusters'},
+                          help_section='WORKSHOP & PRODUCTIVITY', help='Notes: add note [text], read notes')
+        registry.register('project', self.project_tracker,
+                          params={'action': (str, 'list'), 'project': (str, ''), 'status': (str, None)},
+                          section='productivity', description='Project tracking',
+                          example={'action': 'add/update/list', 'project': 'Mark 1 Suit', 'status': 'Testing'},
+                          help_section='WORKSHOP & PRODUCTIVITY',
+                          help='Projects: add project [name], update project [name] to [status], list projects')
+
+        # Information
+        registry.register('search', self._handle_search,
+                          params={'query': (str, '')},
+                          section='information', description='Web search',
+                          example={'query': 'quantum physics'},
+                          help_section='WORKSPACE & RESEARCH', help='Web: search [query]')
+        registry.register('weather', self._handle_weather,
+                          params={'city': (str, 'New York')},
+                          section='information', description='Weather',
+                          help_section='WORKSPACE & RESEARCH', help='Weather: weather [city]', run_async=True)
+        registry.register('research', self._handle_research,
+                          params={'action': (str, 'quick'), 'query': (str, '')},
+                          section='information', description='Research',
+                          example={'action': 'quick/deep/prefetch', 'query': 'fusion reactors'},
+                          help_section='WORKSPACE & RESEARCH',
+                          help='Research: research [topic], look up [topic], deep research [topic], '
+                               'prefetch research on [topics or projects]',
+                          run_async=True)
+        registry.register('recall', self._handle_recall,
+                          params={'query': (str, COMMAND), 'period': (str, '')},
+                          section='information', description='Recall past conversations, notes and projects',
+                          example={'query': 'thrusters', 'period': 'last week'},
+                          help_section='WORKSPACE & RESEARCH', help='Recall: what did I say about [topic] last week',
+                          run_async=True)
+        registry.register('time', self._handle_time,
+                          section='information', description='Time',
+                          help_section='SYSTEM & PC CONTROL', help='Clock: time, date')
+        registry.register('date', self._handle_date,
+                          section='information', description='Date')
+        registry.register('trending', self.check_trending_topics, aliases=('social_media',),
+                          params={'location': (str, 'worldwide')},
+                          section='information', description='Social media trends',
+                          help_section='WORKSPACE & RESEARCH', help="Social: what's trending", run_async=True)
+        registry.register('news', self.check_news_headlines,
+                          section='information', description='News headlines',
+                          help_section='WORKSPACE & RESEARCH', help='News: tell me the news', run_async=True)
+
+        # Workshop
+        registry.register('workshop', self._handle_workshop,
+                          params={'action': (str, 'toggle')},
+                          section='workshop', description='Workshop mode',
+                          example={'action': 'toggle/activate/deactivate'},
+                          help_section='WORKSHOP & PRODUCTIVITY', help='Workshop: workshop mode')
+        registry.register('system', self._handle_system,
+                          section='workshop', description='System stats',
+                          help_section='SYSTEM & PC CONTROL', help='System: system status')
+        registry.register('diagnostics', self._handle_diagnostics,
+                          params={'commands': (int, 20)},
+                          section='workshop', description='Latency diagnostics: the slowest stage of recent commands',
+                          example={'commands': 20},
+                          help_section='SYSTEM & PC CONTROL', help="Diagnostics: diagnostics, what's slow")
+
+        # Workshop shortcuts, only recognized as exact phrases in workshop mode
+        for phrase, handler in [("specs", self.show_armor_specs), ("calculations", self.run_calculations),
+                                ("music", self.toggle_workshop_music), ("lights", self.toggle_workshop_lights)]:
+            registry.register(phrase, handler, phrases=(phrase,), workshop_only=True)
+        registry.intents['specs'].help_section = 'WORKSHOP & PRODUCTIVITY'
+        registry.intents['specs'].help = 'Workshop shortcuts: specs, calculations, music, lights'
+
+        # Miscellaneous
+        registry.register('help', self.show_help, help_section='MISCELLANEOUS', help='Help: help, what can you do')
+        registry.register('motivation', self.random_motivation, help_section='MISCELLANEOUS', help='Motivation: motivate me')
+
+        # Everything else is conversation for Ollama
+        registry.register('ollama', self._handle_ollama, fallback=True,
+                          params={'query': (str, COMMAND)},
+                          description='General questions', example={'query': 'original question'})
+        return registry
+
     def process_command(self, command):
         """Process user command with intent recognition"""
         if not command:
             return
             
-        # Log the command
+        # Log the command and trace it, continuing the trace listen() opened
         self.logger.info(f"Processing command: {command}")
+        self.tracer.begin(command, trace=self.pending_trace)
+        self.pending_trace = None
         
         # Check for direct workshop shortcuts first
-        if self.workshop_mode and command in self.shortcuts:
-            self.shortcuts[command]()
+        shortcut = self.intent_registry.match_phrase(command, self.workshop_mode)
+        if shortcut:
+            self.intent_registry.dispatch({'intent': shortcut}, command, self.workshop_mode)
             return
             
-        # Extract intent and parameters from command
-        intent_data = self.get_command_intent(command)
+        # Extract intent and parameters from command: local fast path first,
+        # then the intent cache, then the LLM (reusing a lookup that was
+        # started on a matching partial transcript), then keyword fallback
+        speculative, self.speculative_intent = self.speculative_intent, None
+        with self.tracer.span("intent.local"):
+            intent_data = self.intent_classifier.classify(command)
+        if not intent_data:
+            start = time.perf_counter()
+            intent_data = self.intent_cache.get(command)
+            seconds = time.perf_counter() - start
+            self.tracer.record("intent.cache", seconds, hit=bool(intent_data))
+            if intent_data:
+                self.intent_classifier.record("cache", seconds)
+        if not intent_data:
+            start = time.perf_counter()
+            if speculative is not None and speculative[0] == command:
+                intent_data = speculative[1].result()
+                if intent_data:
+                    # The partial turned out to be the whole command
+                    self.intent_cache.put(command, intent_data)
+            else:
+                intent_data = self.get_command_intent(command)
+            seconds = time.perf_counter() - start
+            self.tracer.record("intent.llm", seconds, hit=bool(intent_data))
+            if intent_data:
+                self.intent_classifier.record("llm", seconds)
         
         if not intent_data:
             # Use fallback intent extraction
+            start = time.perf_counter()
             intent_data = self.fallback_intent_extraction(command)
+            seconds = time.perf_counter() - start
+            self.tracer.record("intent.fallback", seconds)
+            self.intent_classifier.record("fallback", seconds)
             
         if not intent_data:
             self.speak("I'm not sure what you want me to do. Could you be more specific?")
             return
-            
-        intent = intent_data.get('intent')
-        params = intent_data.get('params', {})
+
+        # Unknown intents fall through to Ollama for general conversation
+        intent = self.intent_registry.dispatch(intent_data, command, self.workshop_mode)
         
-        # Process based on intent
-        if intent == 'time':
-            self.speak(f"The current time is {self.get_time()}")
-            
-        elif intent == 'date':
-            self.speak(f"Today is {self.get_date()}")
-            
-        elif intent == 'search':
-            query = params.get('query', '')
-            if query:
-                self.search_web(query)
+        # Log completion
+        self.logger.info(f"Command '{command}' processed with intent: {intent}")
+        self.logger.debug(f"Intent tiers: {self.intent_classifier.describe_stats()}")
+
+    def _handle_time(self):
+        self.speak(f"The current time is {self.get_time()}")
+
+    def _handle_date(self):
+        self.speak(f"Today is {self.get_date()}")
+
+    def _handle_search(self, query):
+        if query:
+            self.search_web(query)
+        else:
+            self.speak("What would you like me to search for?")
+
+    def _handle_weather(self, city):
+        self.speak(self.get_weather(city))
+
+    def _handle_reminder(self, action, message, minutes, at):
+        """Handle reminder and timer commands"""
+        if action == 'set':
+            if not message:
+                self.speak("What should I remind you about, boss?")
+                return
+            now = datetime.datetime.now()
+            if minutes > 0:
+                due = now + datetime.timedelta(minutes=minutes)
+            elif at:
+                due = self._parse_clock(at, now)
+                if due is None:
+                    self.speak(f"Sorry boss, I don't know when {at} is.")
+                    return
             else:
-                self.speak("What would you like me to search for?")
-                
-        elif intent == 'weather':
-            city = params.get('city', 'New York')
-            self.get_weather(city)
-            
-        elif intent == 'volume':
-            action = params.get('action', '')
-            level = params.get('level', 50)
-            
-            if action == 'up':
-                self.set_volume(min(self.previous_volume + 10, 100))
-            elif action == 'down':
-                self.set_volume(max(self.previous_volume - 10, 0))
-            elif action == 'mute':
-                self.mute_volume()
-            elif action == 'unmute':
-                self.unmute_volume()
+                self.speak("When should I remind you, boss?")
+                return
+            self.reminders.add(message, due)
+            when = f"in {minutes} minutes" if minutes > 0 else f"at {due:%H:%M}"
+            self.speak(f"I'll remind you to {message} {when}.")
+
+        elif action == 'list':
+            pending = self.reminders.pending()
+            if not pending:
+                self.speak("No reminders or timers pending, boss.")
+                return
+            self.speak(f"You have {len(pending)} pending:")
+            for reminder in pending[:5]:
+                label = f"Timer {reminder['message']}".strip() if reminder['kind'] == 'timer' else reminder['message']
+                self.speak(f"{label} at {reminder['due']:%H:%M}")
+
+        elif action == 'cancel':
+            pending = self.reminders.pending()
+            if message.lower() == 'all':
+                targets = pending
+            elif message and message.lower() not in ('last', 'latest'):
+                messages = [reminder['message'].lower() for reminder in pending]
+                matches = difflib.get_close_matches(message.lower(), messages, n=1, cutoff=0.5)
+                targets = [pending[messages.index(matches[0])]] if matches else []
             else:
-                self.set_volume(level)
-                
-        elif intent == 'media':
-            action = params.get('action', '')
-            self.media_control(action)
-            
-        elif intent == 'workshop':
-            action = params.get('action', 'toggle')
-            
-            if action == 'toggle':
-                self.toggle_workshop_mode()
-            elif action == 'activate':
-                self.toggle_workshop_mode(True)
-            elif action == 'deactivate':
-                self.toggle_workshop_mode(False)
-                
-        elif intent == 'system':
-            self.speak(self.get_system_stats())
-            
-        elif intent == 'research':
-            query = params.get('query', '')
-            action = params.get('action', 'quick')
-            self._handle_research(action, params)
-            
-        elif intent == 'timer':
-            duration = params.get('duration', 5)
-            label = params.get('label', '')
-            self.timer(duration, label)
-            
-        elif intent == 'pomodoro':
-            self.pomodoro_timer()
-            
-        elif intent == 'focus':
-            self.toggle_focus_mode()
-            
-        elif intent == 'motivation':
-            self.random_motivation()
-            
-        elif intent == 'help':
-            self.show_help()
-            
-        elif intent == 'project':
-            action = params.get('action', 'status')
-            project = params.get('project', '')
-            self.project_tracker(action, project)
-            
-        elif intent == 'app':
-            app_name = params.get('name', '')
-            self.quick_launch(app_name)
-            
-        elif intent == 'pc':
-            action = params.get('action', '')
-            self.pc_control(action)
-            
-        elif intent == 'window':
-            action = params.get('action', '')
-            self.window_management(action)
-            
-        elif intent == 'note':
-            action = params.get('action', 'add')
-            note = params.get('note', '')
-            self.quick_notes(action, note)
-            
-        elif intent == 'file':
-            action = params.get('action', 'open')
-            filename = params.get('filename', '')
-            self.file_operations(action, filename)
-            
-        elif intent == 'backup':
-            self.auto_backup()
-            
-        elif intent == 'youtube':
-            query = params.get('query', '')
-            action = params.get('action', 'play')
-            
-            if action == 'play':
-                self.play_youtube(query)
-            elif action == 'search':
-                self.search_youtube(query)
-                
-        elif intent == 'ollama':
-            query = params.get('query', command)
+                # The one set most recently
+                targets = sorted(pending, key=lambda reminder: reminder['created'])[-1:]
+            for reminder in targets:
+                self.reminders.cancel(reminder['id'])
+            if not targets:
+                self.speak("Couldn't find that reminder, boss.")
+            elif len(targets) == 1:
+                self.speak(f"Cancelled {'timer' if targets[0]['kind'] == 'timer' else 'reminder'} {targets[0]['message']}")
+            else:
+                self.speak(f"Cancelled {len(targets)} reminders and timers")
+
+        elif action == 'snooze':
+            if self.last_reminder is None:
+                self.speak("Nothing to snooze, boss.")
+                return
+            minutes = minutes or self.config.get('reminders', {}).get('snooze_minutes', 10)
+            if self.reminders.snooze(self.last_reminder['id'], minutes):
+                self.speak(f"Snoozed for {minutes} minutes.")
+            else:
+                self.speak("That reminder is gone, boss.")
+
+    @staticmethod
+    def _parse_clock(text, now):
+        """Next datetime after now at a spoken clock time ("5pm", "17:30", "7"); None if unreadable"""
+        match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*(?:([ap])\.?\s*m\.?)?", text.strip().lower())
+        if not match:
+            return None
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if hour > 23 or minute > 59 or (match.group(3) and not 1 <= hour <= 12):
+            return None
+        if match.group(3):
+            hour = hour % 12 + (12 if match.group(3) == 'p' else 0)
+        due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if due <= now and not match.group(3) and hour < 12 and due + datetime.timedelta(hours=12) > now:
+            # "at 5" in the afternoon means 5pm
+            return due + datetime.timedelta(hours=12)
+        return due if due > now else due + datetime.timedelta(days=1)
+
+    def _handle_volume(self, action, level):
+        if action == 'up':
+            self.set_volume(min(self.previous_volume + 10, 100))
+        elif action == 'down':
+            self.set_volume(max(self.previous_volume - 10, 0))
+        elif action == 'mute':
+            self.mute_volume()
+        elif action == 'unmute':
+            self.unmute_volume()
+        else:
+            self.set_volume(level)
+
+    def _handle_workshop(self, action):
+        if action == 'toggle':
+            self.toggle_workshop_mode()
+        elif action == 'activate':
+            self.toggle_workshop_mode(True)
+        elif action == 'deactivate':
+            self.toggle_workshop_mode(False)
+
+    def _handle_system(self):
+        self.speak(self.get_system_stats())
+
+    def _handle_diagnostics(self, commands):
+        self.speak(self.tracer.describe_slowest(max(commands, 1)))
+        self.logger.info(self.tracer.describe(max(commands, 1)))
+
+    def _handle_file(self, action, filename):
+        self.file_operations(action, filename)
+
+    def _handle_youtube(self, action, query):
+        if action == 'play':
+            self.play_youtube(query)
+        elif action == 'search':
+            self.search_youtube(query)
+
+    def _handle_ollama(self, query):
+        """General conversation through Ollama"""
+        if not self.ollama:
+            self.speak("I'm not sure how to help with that yet, boss. Ollama AI is not connected.")
+            return
+        if self.config.get('conversation', {}).get('stream_responses', True):
+            response = self.speak_streamed(self.stream_ollama(query))
+        else:
             response = self.ask_ollama(query)
             if response:
                 self.speak(response)
-        
-        elif intent == 'social_media' or intent == 'trending':
-            location = params.get('location', 'worldwide')
-            self.check_trending_topics(location)
-            
-        elif intent == 'news':
-            self.check_news_headlines()
-            
-        else:
-            # For general conversation, send to Ollama
-            if self.ollama:
-                response = self.ask_ollama(command)
-                if response:
-                    self.speak(response)
-                else:
-                    self.speak("I'm not sure how to respond to that. Could you try asking differently?")
-            else:
-                self.speak("I'm not sure how to help with that yet, boss. Ollama AI is not connected.")
-        
-        # Log completion
-        self.logger.info(f"Command '{command}' processed with intent: {intent}")
+        if not response and not self.interrupted.is_set():
+            self.speak("I'm not sure how to respond to that. Could you try asking differently?")
+
+    def speak_streamed(self, sentences):
+        """Speak sentences as they arrive; returns the full text spoken
+
+        Each sentence is queued for speech while the next one is still being
+        generated. If the user starts talking, the rest of the reply is
+        dropped: queued sentences are cancelled and generation is stopped.
+        """
+        self.interrupted.clear()
+        self.replying = True
+        spoken = []
+        try:
+            for sentence in sentences:
+                self.speak(sentence, remember=False)
+                spoken.append(sentence)
+        except Exception as e:
+            self.logger.error(f"Streaming response failed: {e}")
+        finally:
+            self.replying = False
+        if spoken:
+            self.remember_turn("jarvis", " ".join(spoken))
+        return " ".join(spoken)
+
+    def _on_user_speech(self):
+        """Called by the microphone when the user starts talking"""
+        if not self.interrupted.is_set() and (self.replying or self.speech.is_busy()):
+            self.logger.debug("User interrupted; dropping the rest of the reply")
+            self.interrupted.set()
+            self.speech.interrupt()
 
-    def _handle_research(self, action, params):
+    def _handle_research(self, action, query):
         """Handle research-related commands"""
-        query = params.get('query', '')
         if not query:
             self.speak("What would you like me to research?")
             return
             
         if action == 'quick':
             self.quick_research(query)
-        elif action == 'deep' and self.ollama:
-            self.ask_ollama(f"Research and provide detailed information about: {query}")
+        elif action == 'deep':
+            if not self.deep_research(query):
+                self.search_web(query)
+        elif action == 'prefetch':
+            if re.fullmatch(r"(?:my |the |current |active )*projects?", query.strip().lower()):
+                topics = self.prefetch_research()
+            else:
+                topics = self.prefetch_research(re.split(r"\s*(?:,|\band\b)\s*", query))
+            self.speak(f"Caching research on {len(topics)} topics for offline use" if topics
+                       else "Nothing to prefetch, boss")
         else:
             self.search_web(query)
 
+    def _handle_recall(self, query, period):
+        """Answer "what did I say about X last week" from the semantic index"""
+        now = datetime.datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        period = period.lower()
+        days = re.search(r"(\d+) days?", period)
+        if period == "today":
+            since = midnight
+        elif period == "yesterday":
+            since = midnight - datetime.timedelta(days=1)
+        elif "week" in period:
+            since = now - datetime.timedelta(days=7)
+        elif "month" in period:
+            since = now - datetime.timedelta(days=30)
+        elif days:
+            since = now - datetime.timedelta(days=int(days.group(1)))
+        else:
+            since = None
+
+        # Whatever was said or noted just before has to be searchable, but
+        # the question itself is not an answer to it
+        self.semantic_index.flush()
+        results = [(score, entry) for score, entry in
+                   self.semantic_index.search(query, k=4, since=since.timestamp() if since else None)
+                   if self.last_user_turn is None or entry.get("turn_id") != self.last_user_turn][:3]
+        if not results:
+            self.speak(f"I don't recall anything about {query}, boss.")
+            return
+        for _, entry in results:
+            when = datetime.datetime.fromtimestamp(entry["time"]).strftime("%A %B %d")
+            if entry["kind"] == "note":
+                self.speak(f"On {when} you noted: {entry['text']}", remember=False)
+            elif entry["kind"] == "project":
+                self.speak(f"On {when} the project log said: {entry['text']}", remember=False)
+            elif entry.get("speaker") == "jarvis":
+                self.speak(f"On {when} I told you: {entry['text']}", remember=False)
+            else:
+                self.speak(f"On {when} you said: {entry['text']}", remember=False)
+
     def run(self):
         try:
-            self.speak("JARVIS Mark 1 online. Ready to assist you in the workshop, boss.")
+            self.speak("JARVIS Mark 1 online. Ready to assist you in the workshop, boss.", cache=True)
             
             # Check if Ollama is available
             if self.ollama:
-                self.speak("AI systems connected. You can now talk to me conversationally.")
+                self.speak("AI systems connected. You can now talk to me conversationally.", cache=True)
             else:
-                self.speak("Ollama AI connection failed. Voice commands limited to basic functionality.")
+                self.speak("Ollama AI connection failed. Voice commands limited to basic functionality.", cache=True)
             
             # Update last active time
-            self.memory["last_active"] = str(datetime.datetime.now())
-            self.save_memory()
+            self.store.set("last_active", str(datetime.datetime.now()))
             
             while True:
                 command = self.listen()
                 if command:
                     if "goodbye" in command or "power down" in command or "shutdown" in command:
-                        self.speak("Powering down systems. Don't stay up too late working on the suit, boss.")
-                        
-                        # Update memory before shutdown
-                        self.memory["last_active"] = str(datetime.datetime.now())
-                        self.save_memory()
-                        
+                        self.speak("Powering down systems. Don't stay up too late working on the suit, boss.", wait=True)
+                        self.shutdown()
                         break
                     self.process_command(command)
         except KeyboardInterrupt:
             print("\nJARVIS: Shutting down gracefully. Goodbye, boss.")
-            
-            # Update memory before shutdown
-            self.memory["last_active"] = str(datetime.datetime.now())
-            self.save_memory()
+            self.shutdown()
             
             # Clean up resources if needed
             if self.camera:
                 self.camera.release()
-            pygame.mixer.quit()
+            self.drivers.audio.quit()
+
+    def shutdown(self):
+        """Stop every background worker, save state and log session stats"""
+        # Stop everything that can still write to the store before closing it
+        self.microphone.stop()
+        self.reminders.stop()
+        self.models.stop()
+        self.semantic_index.stop()
+        self.social_media.stop()
+        self.telemetry.stop()
+        self.speech.stop()
+        self.retention.close()
+        self.store.set("last_active", str(datetime.datetime.now()))
+        self.store.close()
+        self.logger.info(f"Ollama models: {self.models.describe_stats()}")
+        self.logger.info(self.tracer.describe())
+        self.logger.info(f"HTTP: {self.http.describe_stats()}")
+        self.logger.info(f"Social media cache: {self.social_media.cache.describe_stats()}")
+        self.logger.info(f"Research cache: {self.research_cache.describe_stats()}")
+        self.logger.info(f"Weather: {self.weather.describe_stats()}")
+        self.logger.info(f"Telemetry: {self.telemetry.count} samples, {self.telemetry.overhead():.3%} of a CPU")
+        self.tracer.close()
 
     def start_workshop_camera(self):
         """Initialize workshop camera feed"""
         try:
             if not self.camera:
                 self.camera = cv2.VideoCapture(0)
-                self.speak("Workshop camera activated")
+                self.speak("Workshop camera activated", cache=True)
         except Exception as e:
             self.speak("Camera initialization failed. Check the connections, boss.")
 
@@ -1064,75 +5038,30 @@ class JarvisAssistant:
 
     def show_help(self):
         """Display available commands"""
-        help_text = """
-        Available commands:
-
-        MEDIA & SOUND:
-        - Volume: mute, unmute, volume up/down, set volume [0-100]
-        - Media: play, pause, next, previous
-        - YouTube: play youtube [song], search youtube [query]
-        - Music: playlist [workshop/study]
-
-        WORKSHOP & PRODUCTIVITY:
-        - Workshop: workshop mode, camera on/off, specs, calculations
-        - Focus: focus mode, pomodoro, start working
-        - Timer: timer [minutes] for [label]
-        - Notes: add note [text], read notes
-        - Projects: add project [name], update project [name] to [status], list projects
-
-        SYSTEM & PC CONTROL:
-        - System: time, date, system status, diagnostics
-        - PC: pc sleep, pc restart, pc shutdown, pc lock, screenshot
-        - Windows: minimize all, maximize, arrange windows
-        - Backup: backup, auto backup
-
-        FILES & APPLICATIONS:
-        - Files: create file [name] in [folder], open file [name] in [folder]
-        - Apps: open [freecad/firefox/chrome/code/fusion360/spotify/vlc/blender]
-        - Launch: launch [app_name]
-
-        WORKSPACE & RESEARCH:
-        - Workspace: load workspace [study/engineering], save workspace
-        - Web: search [query], browse [url]
-        - Weather: weather [city]
-        - Research: research [topic], look up [topic]
-
-        MISCELLANEOUS:
-        - Help: help, what can you do
-        - Motivation: motivate me
-        - System: shutdown, goodbye
-
-        You can also ask me general questions and I'll try my best to help!
-        For example: "Who is Benjamin Franklin?" or "When did Back to the Future release?"
-        
-        Need more specific help with any command? Just ask!
-        """
-        self.speak(help_text)
+        help_text = self.intent_registry.help_text(
+            extra={"MISCELLANEOUS": ["System: shutdown, goodbye"]},
+            footer="""You can also ask me general questions and I'll try my best to help!
+For example: "Who is Benjamin Franklin?" or "When did Back to the Future release?"
+
+Need more specific help with any command? Just ask!"""
+        )
+        self.speak(help_text, priority=SpeechQueue.CHATTER)
 
     def quick_notes(self, action, note=None):
         """Quick note-taking system"""
-        notes_file = 'jarvis_notes.json'
         try:
             if action == "add" and note:
-                with open(notes_file, 'r+') as f:
-                    try:
-                        notes = json.load(f)
-                    except:
-                        notes = []
-                    notes.append({
-                        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "note": note
-                    })
-                    f.seek(0)
-                    json.dump(notes, f)
-                self.speak("Note saved, boss")
+                self.store.add_note(note)
+                self.semantic_index.add("note", note)
+                self.speak("Note saved, boss", cache=True)
             elif action == "read":
-                with open(notes_file, 'r') as f:
-                    notes = json.load(f)
-                    recent_notes = notes[-3:]  # Get last 3 notes
-                    self.speak("Here are your recent notes:")
-                    for note in recent_notes:
-                        self.speak(note["note"])
+                recent_notes = self.store.notes(limit=3)
+                if not recent_notes:
+                    self.speak("No notes yet, boss")
+                    return
+                self.speak("Here are your recent notes:")
+                for note in recent_notes:
+                    self.speak(note["note"])
         except Exception as e:
             self.speak("Had trouble with the notes system, boss")
 
@@ -1159,26 +5088,34 @@ class JarvisAssistant:
 
     def random_motivation(self):
         """Generate random motivational quote"""
-        quotes = [
-            "The only way to do great work is to love what you do. - Steve Jobs",
-            "I am Iron Man! Oh wait, wrong timeline...",
-            "Even DUM-E started as a simple code. Keep going!",
-            "Success is 1% inspiration, 99% not getting distracted by cat videos.",
-            "Your future self will thank you for working hard today!"
-        ]
-        self.speak(random.choice(quotes))
+        self.speak(random.choice(self.MOTIVATION_QUOTES), priority=SpeechQueue.CHATTER, cache=True)
 
     def timer(self, duration, label=""):
         """Set a timer with optional label"""
-        def timer_done():
-            self.speak(f"Time's up, boss! {label}")
-            pygame.mixer.music.load('alert.wav')
-            pygame.mixer.music.play()
-
         minutes = int(duration)
-        threading.Timer(minutes * 60, timer_done).start()
+        self.reminders.add(label, datetime.datetime.now() + datetime.timedelta(minutes=minutes), kind="timer")
         self.speak(f"Timer set for {minutes} minutes. {label}")
 
+    def _reminder_due(self, reminder):
+        """Announce a timer or reminder the scheduler has fired"""
+        self.last_reminder = reminder
+        if reminder["kind"] == "timer":
+            text = f"Time's up, boss! {reminder['message']}"
+        elif datetime.datetime.now() - reminder["due"] > datetime.timedelta(minutes=1):
+            # Came due while JARVIS was off
+            text = f"Missed reminder from {reminder['due']:%H:%M}: {reminder['message']}"
+        else:
+            text = f"Reminder, boss: {reminder['message']}"
+        self.speak(text, priority=SpeechQueue.ALERT)
+        self._play_alert()
+
+    def _play_alert(self):
+        # The chime is a nicety; a missing file or mixer must not stop what comes next
+        try:
+            self.drivers.audio.play_music('alert.wav')
+        except Exception as e:
+            self.logger.error(f"Alert sound failed: {e}")
+
     def quick_launch(self, app_name):
         """Quick launch applications with fuzzy matching"""
         app_paths = {
@@ -1192,7 +5129,7 @@ class JarvisAssistant:
         matches = difflib.get_close_matches(app_name.lower(), app_paths.keys(), n=1)
         if matches:
             try:
-                os.startfile(app_paths[matches[0]])
+                self.drivers.launcher(app_paths[matches[0]])
                 self.speak(f"Launching {matches[0]}")
             except:
                 self.speak("Couldn't launch the application. Is it installed, boss?")
@@ -1203,16 +5140,16 @@ class JarvisAssistant:
         """Advanced PC control functions"""
         try:
             if action == "sleep":
-                self.speak("Putting PC to sleep. Good night, boss!")
+                self.speak("Putting PC to sleep. Good night, boss!", wait=True)
                 os.system("rundll32.exe powrprof.dll,SetSuspendState 0,1,0")
             elif action == "restart":
-                self.speak("Restarting system. Back in a flash!")
+                self.speak("Restarting system. Back in a flash!", wait=True)
                 os.system("shutdown /r /t 1")
             elif action == "shutdown":
-                self.speak("Shutting down. Don't work too hard, boss!")
+                self.speak("Shutting down. Don't work too hard, boss!", wait=True)
                 os.system("shutdown /s /t 1")
             elif action == "lock":
-                self.speak("Locking your workstation. Stay safe!")
+                self.speak("Locking your workstation. Stay safe!", wait=True)
                 os.system("rundll32.exe user32.dll,LockWorkStation")
             elif action == "screenshot":
                 import pyautogui
@@ -1223,69 +5160,68 @@ class JarvisAssistant:
         except Exception as e:
             self.speak("PC control command failed. Did DUM-E mess with the wiring again?")
 
-    def pomodoro_timer(self):
+    def pomodoro_timer(self, action='start'):
         """Pomodoro timer with work/break tracking"""
-        def pomodoro_cycle():
-            work_time = 25  # minutes
-            short_break = 5  # minutes
-            long_break = 15  # minutes
-            sessions = 0
-
-            while sessions < 4:
-                # Work session
-                self.speak(f"Starting work session {sessions + 1}. Let's get productive!")
-                self.timer(work_time, "work session")
-                sessions += 1
-
-                # Break time
-                if sessions < 4:
-                    self.speak("Time for a short break. Stretch those muscles!")
-                    self.timer(short_break, "short break")
-                else:
-                    self.speak("Great job! Take a longer break, you've earned it!")
-                    self.timer(long_break, "long break")
-                    sessions = 0
+        if action == 'stop':
+            if self.reminders.unschedule("pomodoro"):
+                self.speak("Pomodoro stopped. Back to free-form tinkering, boss.")
+            else:
+                self.speak("No pomodoro running, boss.")
+            return
+
+        settings = self.config.get('pomodoro', {})
+        sessions = settings.get('sessions', 4)
+        phases = []
+        for session in range(1, sessions + 1):
+            phases.append((settings.get('work_minutes', 25), f"Starting work session {session}. Let's get productive!"))
+            if session < sessions:
+                phases.append((settings.get('short_break_minutes', 5), "Time for a short break. Stretch those muscles!"))
+            else:
+                phases.append((settings.get('long_break_minutes', 15), "Great job! Take a longer break, you've earned it!"))
+        self._pomodoro_phase(phases, first=True)
 
-        threading.Thread(target=pomodoro_cycle, daemon=True).start()
+    def _pomodoro_phase(self, phases, first=False):
+        # Each phase schedules the next when it starts, so they run back to back, never at once
+        if not phases:
+            self.speak("Pomodoro complete. Ready for another round when you are, boss.", priority=SpeechQueue.ALERT)
+            self._play_alert()
+            return
+        minutes, announcement = phases[0]
+        self.reminders.schedule("pomodoro", datetime.datetime.now() + datetime.timedelta(minutes=minutes),
+                                self._pomodoro_phase, phases[1:])
+        if first:
+            self.speak(announcement)
+        else:
+            self.speak(announcement, priority=SpeechQueue.ALERT)
+            self._play_alert()
 
     def project_tracker(self, action, project_name=None, status=None):
         """Track project progress and deadlines"""
-        projects_file = 'jarvis_projects.json'
         try:
+            project_name = (project_name or "").strip()
+            if action in ("add", "update") and not project_name:
+                self.speak("Which project, boss?")
+                return
+
             if action == "add":
-                with open(projects_file, 'r+') as f:
-                    try:
-                        projects = json.load(f)
-                    except:
-                        projects = {}
-                    
-                    projects[project_name] = {
-                        "status": status or "In Progress",
-                        "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "last_updated": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    f.seek(0)
-                    json.dump(projects, f)
+                self.store.save_project(project_name, status or "In Progress")
+                self.semantic_index.add("project", f"{project_name}: {status or 'In Progress'}", project=project_name)
                 self.speak(f"Project {project_name} added to tracking system")
+                self.prefetch_research([project_name])
             
             elif action == "update":
-                with open(projects_file, 'r+') as f:
-                    projects = json.load(f)
-                    if project_name in projects:
-                        projects[project_name]["status"] = status
-                        projects[project_name]["last_updated"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        f.seek(0)
-                        json.dump(projects, f)
-                        self.speak(f"Project {project_name} updated to {status}")
-                    else:
-                        self.speak(f"Project {project_name} not found in tracking system")
+                if not status:
+                    self.speak(f"What's the new status for {project_name}, boss?")
+                elif self.store.update_project(project_name, status):
+                    self.semantic_index.add("project", f"{project_name}: {status}", project=project_name)
+                    self.speak(f"Project {project_name} updated to {status}")
+                else:
+                    self.speak(f"Project {project_name} not found in tracking system")
             
             elif action == "list":
-                with open(projects_file, 'r') as f:
-                    projects = json.load(f)
-                    self.speak("Current projects:")
-                    for name, details in projects.items():
-                        self.speak(f"{name}: {details['status']}")
+                self.speak("Current projects:")
+                for name, details in self.store.projects().items():
+                    self.speak(f"{name}: {details['status']}")
         
         except Exception as e:
             self.speak("Project tracking system malfunction. Better add error handling to my code, boss!")
@@ -1372,7 +5308,7 @@ class JarvisAssistant:
                     
                 filepath = os.path.join(target_folder, filename)
                 if os.path.exists(filepath):
-                    os.startfile(filepath)
+                    self.drivers.launcher(filepath)
                     self.speak(f"Opening {filename}")
                 else:
                     self.speak(f"Couldn't find {filename}. Did DUM-E move it again?")
@@ -1399,7 +5335,7 @@ class JarvisAssistant:
             # Fuzzy match the app name
             matches = difflib.get_close_matches(app_name.lower(), app_paths.keys(), n=1)
             if matches:
-                os.startfile(app_paths[matches[0]])
+                self.drivers.launcher(app_paths[matches[0]])
                 self.speak(f"Launching {matches[0]}")
             else:
                 self.speak("Application not found. Want me to add it to the list?")
@@ -1415,9 +5351,9 @@ class JarvisAssistant:
                 url = f"https://www.youtube.com/results?search_query={search_query.replace(' ', '+')}"
             
             if browser.lower() == "firefox":
-                webbrowser.get('firefox').open(url)
+                self.drivers.browser.get('firefox').open(url)
             else:
-                webbrowser.open(url)
+                self.drivers.browser.open(url)
             
             self.speak(f"Opening {url} in {browser}")
         except Exception as e:
@@ -1463,14 +5399,14 @@ class JarvisAssistant:
                     # Try multiple browser methods
                     try:
                         # Try Firefox first
-                        webbrowser.get('firefox').open_new(video_url)
+                        self.drivers.browser.get('firefox').open_new(video_url)
                     except:
                         try:
                             # Try Chrome next
-                            webbrowser.get('chrome').open_new(video_url)
+                            self.drivers.browser.get('chrome').open_new(video_url)
                         except:
                             # Fall back to default browser
-                            webbrowser.open(video_url)
+                            self.drivers.browser.open(video_url)
                     return
                     
             except ImportError:
@@ -1479,7 +5415,7 @@ class JarvisAssistant:
             # Fallback: Open YouTube search results
             search_url = f"https://www.youtube.com/results?search_query={query.replace(' ', '+')}"
             try:
-                webbrowser.open(search_url)
+                self.drivers.browser.open(search_url)
                 self.speak("Opening YouTube search results")
             except Exception as e:
                 self.speak(f"Failed to open browser. Error: {str(e)}")
@@ -1503,12 +5439,12 @@ class JarvisAssistant:
             search_url = f"https://www.youtube.com/results?search_query={query.replace(' ', '+')}"
             
             try:
-                webbrowser.get('firefox').open_new(search_url)
+                self.drivers.browser.get('firefox').open_new(search_url)
             except:
                 try:
-                    webbrowser.get('chrome').open_new(search_url)
+                    self.drivers.browser.get('chrome').open_new(search_url)
                 except:
-                    webbrowser.open(search_url)
+                    self.drivers.browser.open(search_url)
                     
             self.speak(f"Opening YouTube search results for {query}")
         
@@ -1583,47 +5519,37 @@ class JarvisAssistant:
             self.speak(f"Project operation failed: {str(e)}")
             return False
 
-    def _monitor_system_resources(self):
-        """Monitor system resources in workshop mode"""
-        try:
-            # Load monitoring settings from config
-            with open('jarvis_config.yaml', 'r') as f:
-                config = yaml.safe_load(f)
-            
-            monitoring_settings = config.get('workshop_mode', {})
-            cpu_threshold = monitoring_settings.get('alert_cpu_threshold', 80)
-            mem_threshold = monitoring_settings.get('alert_memory_threshold', 85)
-            interval = monitoring_settings.get('monitoring_interval', 60)
-            
-            last_alert_time = 0
-            
-            while self.workshop_mode:
-                # Get CPU and memory usage
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory_percent = psutil.virtual_memory().percent
-                
-                # Alert if thresholds exceeded
-                current_time = time.time()
-                if (cpu_percent > cpu_threshold or memory_percent > mem_threshold) and current_time - last_alert_time > 300:
-                    self.speak(f"Warning: System resources running high. CPU: {cpu_percent}%, Memory: {memory_percent}%")
-                    last_alert_time = current_time
-                
-                # Sleep for the configured interval
-                time.sleep(interval)
-                
-        except Exception as e:
-            self.logger.error(f"System monitoring error: {e}")
-            # Don't crash the monitoring thread, just log the error
+    def _telemetry_alert(self, kind, message):
+        self.speak(f"Warning: {message}.", priority=SpeechQueue.ALERT, coalesce_key="resource_alert")
 
 class SocialMediaMonitor:
-    """Social media monitoring and interaction"""
+    """Social media monitoring and interaction
+
+    Trends and headlines come from a stale-while-revalidate cache that is
+    prefetched in the background, so they are read out from memory
+    instead of waiting on Nitter or NewsAPI.
+    """
     def __init__(self, jarvis_instance):
         self.jarvis = jarvis_instance
         self.logger = jarvis_instance.logger
-        self.cache = {}
-        self.cache_duration = 300  # 5 minutes
         self.config = self.load_config()
-        
+        social_settings = self.config.get("social_media", {})
+        news_settings = self.config.get("news_api", {})
+        self.default_location = social_settings.get("default_location", "worldwide")
+        self.news_country = news_settings.get("default_country", "us")
+        self.headlines_count = news_settings.get("headlines_count", 5)
+        self.cache = StaleWhileRevalidateCache(
+            social_settings.get("cache_path", "jarvis_social_cache.json"), self.logger,
+            max_entries=social_settings.get("cache_entries", 32),
+            refresh_ahead=social_settings.get("refresh_ahead", 0.8)
+        )
+        trends_ttl = social_settings.get("trending_cache_duration", 300)
+        news_ttl = news_settings.get("cache_duration", 900)
+        self.cache.register("trends", self._fetch_trends, ttl=trends_ttl,
+                            max_stale=social_settings.get("trending_max_stale", 6 * trends_ttl))
+        self.cache.register("news", self._fetch_news, ttl=news_ttl,
+                            max_stale=news_settings.get("max_stale", 6 * news_ttl))
+
     def load_config(self):
         """Load configuration from jarvis_config.yaml"""
         try:
@@ -1638,37 +5564,19 @@ class SocialMediaMonitor:
                 "twitter_api_secret": os.environ.get("TWITTER_API_SECRET", "")
             }
 
+    def start(self):
+        """Keep the default trends and headlines fresh in the background"""
+        self.cache.prefetch("trends", self.default_location)
+        if self._news_api_key():
+            self.cache.prefetch("news", self.news_country)
+
+    def stop(self):
+        self.cache.stop()
+
     def get_trending_topics(self, location="worldwide"):
         """Get trending topics from Twitter/X"""
         try:
-            # Check cache first
-            cache_key = f"trends_{location}"
-            if cache_key in self.cache:
-                cache_time, cached_data = self.cache[cache_key]
-                if time.time() - cache_time < self.cache_duration:
-                    return cached_data
-
-            # If no cache, fetch from web
-            import requests
-            from bs4 import BeautifulSoup
-            
-            # Use Nitter as an alternative to Twitter API
-            url = "https://nitter.net/trending"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            
-            response = requests.get(url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            trends = []
-            trend_items = soup.find_all('div', {'class': 'trending-card'})
-            
-            for item in trend_items[:10]:  # Get top 10 trends
-                trend_text = item.get_text().strip()
-                if trend_text:
-                    trends.append(trend_text)
-            
-            # Cache the results
-            self.cache[cache_key] = (time.time(), trends)
+            trends = self.cache.get("trends", location)
             
             # Speak the trends
             self.jarvis.speak("Here are the current trending topics:")
@@ -1684,52 +5592,71 @@ class SocialMediaMonitor:
 
     def get_news(self):
         """Fallback method to get news headlines"""
+        if not self._news_api_key():
+            self.jarvis.speak("News API key not configured. Please check your configuration.")
+            return None
         try:
-            # Check for cached news first
-            cache_key = "news_headlines"
-            if cache_key in self.cache:
-                cache_time, cached_data = self.cache[cache_key]
-                if time.time() - cache_time < self.cache_duration:
-                    self.jarvis.speak("Here are the top news headlines:")
-                    for i, article in enumerate(cached_data, 1):
-                        self.jarvis.speak(f"{i}. {article['title']}")
-                    return cached_data
-                    
-            import requests
-            
-            url = "https://newsapi.org/v2/top-headlines"
-            params = {
-                "country": "us",
-                "apiKey": self.config.get("news_api", {}).get("api_key", "")
-            }
-            
-            if not params["apiKey"]:
-                self.jarvis.speak("News API key not configured. Please check your configuration.")
-                return None
-                
-            response = requests.get(url, params=params)
-            news = response.json()
+            articles = self.cache.get("news", self.news_country)
             
-            if news.get("status") == "ok":
-                articles = news.get("articles", [])[:5]
+            self.jarvis.speak("Here are the top news headlines:")
+            for i, article in enumerate(articles, 1):
+                self.jarvis.speak(f"{i}. {article['title']}")
                 
-                # Cache the results
-                self.cache[cache_key] = (time.time(), articles)
-                
-                self.jarvis.speak("Here are the top news headlines:")
-                for i, article in enumerate(articles, 1):
-                    self.jarvis.speak(f"{i}. {article['title']}")
-                    
-                return articles
-            else:
-                self.jarvis.speak(f"Error retrieving news: {news.get('message', 'Unknown error')}")
-                return None
+            return articles
                 
+        except RuntimeError as e:
+            self.jarvis.speak(str(e))
+            return None
         except Exception as e:
             self.logger.error(f"Failed to fetch news: {e}")
             self.jarvis.speak("I'm having trouble accessing the news right now.")
             return None
 
+    def _news_api_key(self):
+        return self.config.get("news_api", {}).get("api_key", "")
+
+    def _fetch_trends(self, location):
+        # Use Nitter as an alternative to Twitter API
+        from bs4 import BeautifulSoup
+        url = "https://nitter.net/trending"
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        
+        response = self.jarvis.http.get(url, headers=headers)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'html.parser')
+        
+        trends = []
+        trend_items = soup.find_all('div', {'class': 'trending-card'})
+        
+        for item in trend_items[:10]:  # Get top 10 trends
+            trend_text = item.get_text().strip()
+            if trend_text:
+                trends.append(trend_text)
+        return trends
+
+    def _fetch_news(self, country):
+        url = "https://newsapi.org/v2/top-headlines"
+        params = {
+            "country": country,
+            "apiKey": self._news_api_key()
+        }
+        news = self.jarvis.http.get(url, params=params).json()
+        if news.get("status") != "ok":
+            raise RuntimeError(f"Error retrieving news: {news.get('message', 'Unknown error')}")
+        # Only what is read out is cached
+        return [{"title": article.get("title", ""), "url": article.get("url", "")}
+                for article in news.get("articles", [])[:self.headlines_count]]
+
 if __name__ == "__main__":
-    jarvis = JarvisAssistant()
-    jarvis.run()
\ No newline at end of file
+    if sys.argv[1:2] == ["diagnostics"]:
+        # Stage latency of recent commands from the trace file, without starting JARVIS
+        parser = argparse.ArgumentParser(prog="main.py diagnostics")
+        parser.add_argument("--last", type=int, default=20, help="commands to look at")
+        parser.add_argument("--trace", default="jarvis_trace.jsonl", help="trace file")
+        args = parser.parse_args(sys.argv[2:])
+        tracer = Tracer.load(args.trace)
+        print(tracer.describe_slowest(args.last))
+        print(tracer.describe(args.last))
+    else:
+        jarvis = JarvisAssistant()
+        jarvis.run()
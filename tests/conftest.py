@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jarvis_sim import Simulation  # noqa: E402
+from main import JarvisLogger  # noqa: E402
+
+
+@pytest.fixture
+def logger(tmp_path):
+    """JarvisLogger writing its debug log under tmp_path, not the working directory"""
+    yield JarvisLogger({'path': str(tmp_path / 'jarvis_debug.log'), 'console_level': 'WARNING'})
+    JarvisLogger.shutdown()
+
+
+@pytest.fixture
+def make_sim():
+    """Simulation factory; intents maps commands to what the fake intent model returns"""
+    simulations = []
+
+    def make(**kwargs):
+        simulations.append(Simulation(**kwargs))
+        return simulations[-1]
+    yield make
+    for simulation in simulations:
+        simulation.close()
+
+
+@pytest.fixture
+def sim(make_sim):
+    return make_sim()
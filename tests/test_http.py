@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+import requests
+
+from main import HttpClient, PoolTimeoutError
+
+
+class ScriptedSession:
+    """requests.Session stand-in whose get() runs the next scripted step"""
+    def __init__(self, *steps):
+        self.steps = list(steps)
+
+    def get(self, url, **kwargs):
+        return self.steps.pop(0)()
+
+
+class Response:
+    status_code = 200
+
+
+def fail():
+    raise requests.exceptions.ConnectionError("refused")
+
+
+def test_unexpected_error_during_trial_does_not_reject_the_host_for_good(logger):
+    def bug():
+        raise ValueError("bad response body")
+    session = ScriptedSession(fail, bug, Response)
+    http = HttpClient(logger, {'failure_threshold': 1, 'open_seconds': 0, 'max_retries': 0}, session=session)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http.get("http://example.test/")
+    # The breaker is open; this request is the half-open trial and hits a bug
+    with pytest.raises(ValueError):
+        http.get("http://example.test/")
+    assert http.get("http://example.test/").status_code == 200
+    assert http.stats()["example.test"]["state"] == "closed"
+
+
+def test_callers_wait_a_bounded_time_for_a_busy_host(logger):
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return Response()
+    session = ScriptedSession(slow, Response)
+    http = HttpClient(logger, {'connections_per_host': 1, 'pool_timeout': 0.1}, session=session)
+
+    worker = threading.Thread(target=http.get, args=("http://example.test/slow",))
+    worker.start()
+    try:
+        with pytest.raises(PoolTimeoutError):
+            http.get("http://example.test/")
+    finally:
+        release.set()
+        worker.join(5)
+    assert http.get("http://example.test/").status_code == 200
@@ -0,0 +1,49 @@
+import concurrent.futures
+
+from main import IntentRegistry
+
+
+def make_registry(calls):
+    registry = IntentRegistry()
+    registry.register('volume', lambda level: calls.append(('volume', level)), params={'level': (int, 50)})
+    registry.register('lights', lambda: calls.append(('lights',)), phrases=('lights',), workshop_only=True)
+    registry.register('ollama', lambda query: calls.append(('ollama', query)),
+                      params={'query': (str, IntentRegistry.COMMAND)}, fallback=True)
+    return registry
+
+
+def test_int_params_are_parsed_as_numbers():
+    registry = make_registry([])
+    spec = registry.resolve('volume')
+    assert registry.coerce(spec, {'level': "2.5"}, "")['level'] == 2
+    assert registry.coerce(spec, {'level': "-10"}, "")['level'] == -10
+    assert registry.coerce(spec, {'level': "loud"}, "")['level'] == 50
+
+
+def test_workshop_only_intent_falls_back_outside_workshop_mode():
+    calls = []
+    registry = make_registry(calls)
+    assert registry.dispatch({'intent': 'lights'}, "lights") == 'ollama'
+    assert registry.dispatch({'intent': 'lights'}, "lights", workshop_mode=True) == 'lights'
+    assert calls == [('ollama', "lights"), ('lights',)]
+
+
+def test_partial_transcripts_are_not_cached(sim):
+    jarvis = sim.jarvis
+    jarvis._on_partial_transcript("tell me about")
+    text, future = jarvis.speculative_intent
+    assert text == "tell me about" and future.result(5)
+    assert jarvis.intent_cache.get("tell me about") is None
+
+    # The partial was the whole command: the speculative intent is reused and cached
+    sim.say("tell me about")
+    assert jarvis.intent_cache.get("tell me about")
+
+
+def test_partial_transcripts_do_not_wait_for_ollama(sim):
+    # Ollama still starting: the capture thread must not block on it
+    starting = concurrent.futures.Future()
+    started, sim.jarvis.startup.tasks["ollama"] = sim.jarvis.startup.tasks["ollama"], starting
+    sim.jarvis._on_partial_transcript("tell me about")
+    assert sim.jarvis.speculative_intent is None
+    starting.set_result(started.result())
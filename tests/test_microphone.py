@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+import speech_recognition as sr
+
+from main import MicrophoneStream
+
+
+class ScriptedSource:
+    """Input stream that plays back silence, then a burst of speech, then silence"""
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+    CHUNK = 1024
+
+    def __init__(self, silent_chunks, loud_chunks):
+        samples = [0] * silent_chunks * self.CHUNK + [8000] * loud_chunks * self.CHUNK
+        self.audio = np.array(samples, dtype=np.int16).tobytes()
+        self.reads = []
+        self.stream = self
+
+    def read(self, size):
+        self.reads.append(size)
+        buffer = self.audio[:size * self.SAMPLE_WIDTH]
+        self.audio = self.audio[size * self.SAMPLE_WIDTH:]
+        return buffer or b'\x00' * size * self.SAMPLE_WIDTH
+
+
+def capture(logger, idle):
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = 300
+    recognizer.dynamic_energy_threshold = False
+    microphone = MicrophoneStream(recognizer, logger, pre_roll=0.5, idle_read_chunks=4)
+    microphone.set_idle(idle)
+    microphone.source = ScriptedSource(silent_chunks=16, loud_chunks=16)
+    microphone.running = True
+    thread = threading.Thread(target=microphone._capture_loop, daemon=True)
+    thread.start()
+    try:
+        audio, _, _ = microphone.next_phrase(timeout=5)
+    finally:
+        microphone.running = False
+        thread.join(timeout=2)
+    return microphone.source.reads, audio
+
+
+def test_idle_mode_reads_larger_blocks_until_onset(logger):
+    reads, audio = capture(logger, idle=True)
+    chunk = ScriptedSource.CHUNK
+    onset = reads.index(chunk)
+    assert onset == 5 and set(reads[:onset]) == {4 * chunk}
+    # Single chunks for the rest of the phrase
+    assert set(reads[onset:onset + 20]) == {chunk}
+    assert len(audio.frame_data) >= len(capture(logger, idle=False)[1].frame_data)
+
+
+def test_idle_mode_keeps_the_pre_roll(logger):
+    _, audio = capture(logger, idle=True)
+    samples = np.frombuffer(audio.frame_data, dtype=np.int16)
+    # 0.5s of pre-roll is 8 chunks, as much silence as a single-chunk read keeps
+    # ahead of its one loud onset chunk, followed by the 4-chunk onset block
+    assert not samples[:7 * ScriptedSource.CHUNK].any()
+    assert samples[7 * ScriptedSource.CHUNK:11 * ScriptedSource.CHUNK].all()
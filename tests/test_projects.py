@@ -0,0 +1,20 @@
+def project(action, name="", status=None):
+    return {"intent": "project", "params": {"action": action, "project": name, "status": status}}
+
+
+def test_update_without_status_asks_for_one(make_sim):
+    sim = make_sim(intents={
+        "add project mark 2": project("add", "Mark 2"),
+        "update project mark 2": project("update", "Mark 2"),
+    })
+    sim.say("add project mark 2")
+    _, _, replies = sim.say("update project mark 2")
+    assert replies == ["What's the new status for Mark 2, boss?"]
+    assert sim.jarvis.store.projects()["Mark 2"]["status"] == "In Progress"
+
+
+def test_add_without_name_is_rejected(make_sim):
+    sim = make_sim(intents={"add a project": project("add")})
+    _, _, replies = sim.say("add a project")
+    assert replies == ["Which project, boss?"]
+    assert sim.jarvis.store.projects() == {}
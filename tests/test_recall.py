@@ -0,0 +1,12 @@
+def test_recall_finds_note_added_just_before(sim):
+    sim.say("add note check the thruster alignment")
+    intent, _, replies = sim.say("what did I say about the thrusters")
+    assert intent == "recall"
+    assert any("check the thruster alignment" in reply for reply in replies), replies
+
+
+def test_recall_leaves_out_the_question_itself(sim):
+    question = "what did I say about the flux capacitor"
+    sim.jarvis.remember_turn("user", question)
+    _, _, replies = sim.say(question)
+    assert replies == ["I don't recall anything about the flux capacitor, boss."]
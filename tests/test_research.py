@@ -0,0 +1,28 @@
+import logging
+
+from main import ResearchCache
+
+
+def make_cache(tmp_path):
+    return ResearchCache(str(tmp_path / "research.json"), logging.getLogger("test"))
+
+
+def test_plural_and_filler_words_hit_the_same_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_summary("arc reactor", "Arc reactor", "Arc reactor summary")
+    assert cache.summary("the arc reactors") == ("Arc reactor", "Arc reactor summary", True)
+
+
+def test_similar_query_is_not_served_online(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_summary("mark 42 armor", "Iron Man Mark 42", "Mark 42 summary")
+    assert cache.summary("mark 43 armor") is None
+    # Offline, the closest answer beats none
+    assert cache.summary("mark 43 armor", offline=True)[0] == "Iron Man Mark 42"
+
+
+def test_similar_deep_question_is_not_served_online(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_answer("llama3", "mark 42 armor", "Mark 42 details")
+    assert cache.answer("llama3", "mark 43 armor") is None
+    assert cache.answer("llama3", "mark 43 armor", offline=True)[0] == "Mark 42 details"
@@ -0,0 +1,70 @@
+import datetime
+import time
+
+from jarvis_sim import DEFAULT_SCRIPT
+
+
+def wait_for(sim, predicate, timeout=5.0):
+    """Wait until predicate(spoken) holds, for replies spoken off the command path"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate(sim.spoken):
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_default_script(sim):
+    replies = {command: (intent, spoken) for command, intent, _, spoken in sim.run(DEFAULT_SCRIPT)}
+
+    intent, spoken = replies["what did I say about the thrusters"]
+    assert intent == "recall"
+    assert "On " in spoken[0] and "check the thruster alignment" in " ".join(spoken)
+
+    intent, spoken = replies["weather in malibu"]
+    assert intent == "weather"
+    assert spoken == ["Weather in Malibu: clear sky, Temperature: 22°C"]
+
+    intent, spoken = replies["add note check the thruster alignment"]
+    assert intent == "note" and spoken
+    assert all(intent != "unknown" for intent, _ in replies.values())
+
+
+def test_reminder_fires(sim):
+    _, _, spoken = sim.say("remind me to check the printer in 20 minutes")
+    assert spoken == ["I'll remind you to check the printer in 20 minutes."]
+    sim.jarvis.reminders.add("call pepper", datetime.datetime.now() + datetime.timedelta(seconds=0.2))
+    assert wait_for(sim, lambda spoken: "Reminder, boss: call pepper" in spoken)
+    assert [reminder["message"] for reminder in sim.jarvis.reminders.pending()] == ["check the printer"]
+
+
+def test_pomodoro_phases_run_in_sequence(sim):
+    sim.jarvis.config['pomodoro'] = {
+        'work_minutes': 0.005, 'short_break_minutes': 0.005, 'long_break_minutes': 0.005, 'sessions': 2
+    }
+    _, _, spoken = sim.say("start pomodoro")
+    # Only the first phase starts straight away
+    assert spoken == ["Starting work session 1. Let's get productive!"]
+    done = "Pomodoro complete. Ready for another round when you are, boss."
+    assert wait_for(sim, lambda spoken: done in spoken)
+    start = sim.spoken.index(spoken[0])
+    assert sim.spoken[start:sim.spoken.index(done) + 1] == [
+        "Starting work session 1. Let's get productive!",
+        "Time for a short break. Stretch those muscles!",
+        "Starting work session 2. Let's get productive!",
+        "Great job! Take a longer break, you've earned it!",
+        done,
+    ]
+
+
+def test_alerts_survive_a_broken_audio_driver(sim, monkeypatch):
+    def play_music(path):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(sim.audio, 'play_music', play_music)
+    sim.jarvis.config['pomodoro'] = {
+        'work_minutes': 0.005, 'short_break_minutes': 0.005, 'long_break_minutes': 0.005, 'sessions': 2
+    }
+    sim.say("start pomodoro")
+    assert wait_for(sim, lambda spoken: "Pomodoro complete. Ready for another round when you are, boss." in spoken)
+    sim.jarvis.reminders.add("call pepper", datetime.datetime.now() + datetime.timedelta(seconds=0.2))
+    assert wait_for(sim, lambda spoken: "Reminder, boss: call pepper" in spoken)
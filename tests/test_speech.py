@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.mark.parametrize("rendered", [None, b""], ids=["missing", "empty"])
+def test_cached_phrase_falls_back_to_live_speech_when_render_fails(sim, monkeypatch, rendered):
+    def save_to_file(text, path):
+        # A driver that fails silently: no file, or an empty one
+        if rendered is not None:
+            with open(path, 'wb') as f:
+                f.write(rendered)
+    monkeypatch.setattr(sim.jarvis.speech.engine, 'save_to_file', save_to_file)
+
+    sim.jarvis.speak("Systems nominal, boss.", cache=True, wait=True)
+    assert sim.spoken == ["Systems nominal, boss."]
+    assert "Systems nominal, boss." not in sim.jarvis.phrase_cache.known_texts()
@@ -0,0 +1,26 @@
+import contextvars
+
+from main import Tracer
+
+
+def trace_commands(tracer, commands):
+    # As listen() and process_command() do: recognition is timed before the command is known
+    for command in commands:
+        trace = tracer.begin()
+        tracer.record("recognition", 0.2)
+        tracer.begin(command, trace=trace)
+        tracer.record("handler", 0.01)
+
+
+def test_load_matches_the_live_tracer(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    live = Tracer(path=path)
+    # A fresh context, so the live tracer's current trace doesn't hide a command
+    contextvars.Context().run(trace_commands, live, ["what time is it", "volume up"])
+    live.close()
+
+    live_stats, live_commands = live.summary()
+    loaded_stats, loaded_commands = Tracer.load(path).summary()
+    assert live_commands == loaded_commands == 2
+    assert set(loaded_stats) == set(live_stats) == {"recognition", "handler"}
+    assert loaded_stats["recognition"]["count"] == 2
@@ -0,0 +1,34 @@
+import threading
+import time
+
+from main import WeatherProvider, WeatherService
+
+
+class SlowProvider(WeatherProvider):
+    name = "slow"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def geocode(self, city):
+        return {"name": city.title(), "lat": 0.0, "lon": 0.0}
+
+    def current(self, lat, lon):
+        self.release.wait(5)
+        return {"temp": 22, "description": "clear sky"}
+
+
+def test_concurrent_lookups_share_one_request(tmp_path, logger):
+    provider = SlowProvider()
+    weather = WeatherService(provider, logger, geocode_path=str(tmp_path / "geocode.json"))
+    threads = [threading.Thread(target=weather.current, args=("Malibu",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Hold the first request until every other caller has joined it
+    deadline = time.monotonic() + 5
+    while weather.counters["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    provider.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert weather.counters == {"geocoded": 1, "fetched": 1, "coalesced": 7}